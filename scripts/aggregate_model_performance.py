@@ -4,9 +4,10 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 from pathlib import Path
 
-from budgetbench.aggregate import collect_correct_milestones, write_milestones_csv
+from budgetbench.aggregate import iter_correct_milestones, write_milestones_csv
 
 
 def main() -> None:
@@ -23,13 +24,19 @@ def main() -> None:
         default="correct_attempts.csv",
         help="Path to write aggregated CSV table",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Parse run logs on this many processes (default: serially)",
+    )
     args = parser.parse_args()
 
-    milestones = collect_correct_milestones(Path(args.log_dir))
-    if not milestones:
+    milestones = iter_correct_milestones(Path(args.log_dir), workers=args.workers)
+    first = next(milestones, None)
+    if first is None:
         print("No attempt logs found.")
         return
-    write_milestones_csv(milestones, Path(args.output))
+    write_milestones_csv(itertools.chain([first], milestones), Path(args.output))
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
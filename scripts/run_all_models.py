@@ -3,52 +3,47 @@
 
 Each model is evaluated with ``run_humaneval_until_budget`` and logs are
 stored under ``logs/humaneval/<model>/<run-id>`` where ``run-id`` is a
-UTC timestamp.  After each run a ``summary.json`` and ``metadata.json``
-are written alongside the per-attempt JSON logs produced by the runner.
-An ``attempts.jsonl`` file is also generated to provide a compact view of
-all attempts in chronological order.
+UTC timestamp.  The runner streams every attempt into ``attempts.jsonl``
+in order; after each run a ``summary.json`` and ``metadata.json`` are
+written alongside it.
 """
 from __future__ import annotations
 
 import argparse
+import contextlib
 import json
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
 from budgetbench.llm_cost import LLM_COSTS
+from budgetbench.ratelimit import RateLimits, configure_rate_limits
 from budgetbench.runner import run_humaneval_until_budget
+from budgetbench.sandbox import SandboxPool
 
 
-def _build_attempts_jsonl(log_dir: Path) -> None:
-    """Create ``attempts.jsonl`` by concatenating individual attempt logs."""
-    attempt_files = [
-        p
-        for p in log_dir.glob("*.json")
-        if p.name not in {"summary.json", "metadata.json", "attempts.jsonl"}
-    ]
-    attempt_files.sort(key=lambda p: p.stat().st_mtime)
-    jsonl = log_dir / "attempts.jsonl"
-    with jsonl.open("w") as out:
-        for path in attempt_files:
-            with path.open() as fh:
-                out.write(fh.read().strip())
-                out.write("\n")
-
-
-def _run_model(model: str, budget: float, base_dir: Path, show_progress: bool) -> None:
+def _run_model(
+    model: str,
+    budget: float,
+    base_dir: Path,
+    show_progress: bool,
+    pool: SandboxPool | None = None,
+) -> None:
     """Evaluate ``model`` and write logs to ``base_dir``."""
     run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     model_dir = model.replace("/", "_")
     log_dir = base_dir / "humaneval" / model_dir / run_id
     summary = run_humaneval_until_budget(
-        model=model, budget=budget, log_dir=log_dir, show_progress=show_progress
+        model=model,
+        budget=budget,
+        log_dir=log_dir,
+        show_progress=show_progress,
+        pool=pool,
     )
     log_dir.mkdir(parents=True, exist_ok=True)
     (log_dir / "summary.json").write_text(json.dumps(summary, indent=2))
     metadata = {"model": model, "budget": budget, "run_id": run_id}
     (log_dir / "metadata.json").write_text(json.dumps(metadata, indent=2))
-    _build_attempts_jsonl(log_dir)
     print(
         f"{model}: attempts={summary['attempts']} correct={summary['correct']} cost=${summary['total_cost']:.4f}"
     )
@@ -73,28 +68,71 @@ def main() -> None:
         default=1,
         help="Number of models to evaluate concurrently",
     )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        help="Requests per minute allowed per model (or in total with --shared-limits)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        help="Tokens per minute allowed per model (or in total with --shared-limits)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Upper bound for the adaptive number of requests in flight",
+    )
+    parser.add_argument(
+        "--shared-limits",
+        action="store_true",
+        help="Apply the rate limits to all models together, for providers "
+        "that limit per API key",
+    )
+    parser.add_argument(
+        "--sandbox-workers",
+        type=int,
+        default=0,
+        help="Share a pool of this many pre-forked sandbox workers across runs",
+    )
     args = parser.parse_args()
 
     base_dir = Path(args.log_dir)
     models = list(LLM_COSTS)
+    if args.rpm or args.tpm or args.max_in_flight:
+        # One limiter per model (or one for all) shared by every run thread.
+        configure_rate_limits(
+            RateLimits(
+                requests_per_minute=args.rpm,
+                tokens_per_minute=args.tpm,
+                max_in_flight=args.max_in_flight or RateLimits.max_in_flight,
+                per_model=not args.shared_limits,
+            )
+        )
+
+    with contextlib.ExitStack() as stack:
+        pool = None
+        if args.sandbox_workers > 0:
+            pool = stack.enter_context(SandboxPool(workers=args.sandbox_workers))
 
-    if args.threads <= 1:
-        for model in models:
-            _run_model(model, args.budget, base_dir, show_progress=True)
-    else:
-        with ThreadPoolExecutor(max_workers=args.threads) as executor:
-            futures = [
-                executor.submit(
-                    _run_model,
-                    model,
-                    args.budget,
-                    base_dir,
-                    False,
-                )
-                for model in models
-            ]
-            for future in futures:
-                future.result()
+        if args.threads <= 1:
+            for model in models:
+                _run_model(model, args.budget, base_dir, show_progress=True, pool=pool)
+        else:
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                futures = [
+                    executor.submit(
+                        _run_model,
+                        model,
+                        args.budget,
+                        base_dir,
+                        False,
+                        pool,
+                    )
+                    for model in models
+                ]
+                for future in futures:
+                    future.result()
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
@@ -1,5 +1,26 @@
-"""Public API for BudgetBench."""
+"""Public API for BudgetBench.
 
-from .runner import run_humaneval_task, run_humaneval_until_budget
+The runners are imported on first access so that ``import budgetbench`` and
+tools that only read logs do not pay for the LLM client and dataset stacks.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .runner import run_humaneval_task, run_humaneval_until_budget
 
 __all__ = ["run_humaneval_task", "run_humaneval_until_budget"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        from . import runner
+
+        return getattr(runner, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
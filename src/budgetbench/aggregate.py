@@ -3,9 +3,12 @@ from __future__ import annotations
 """Utilities for aggregating HumanEval attempt logs."""
 
 import csv
-import json
+import heapq
 from pathlib import Path
-from typing import Iterable, List, TypedDict
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, TypedDict
+
+from .attempt_log import ATTEMPTS_FILE, read_attempt_log
+from .scan import map_runs
 
 
 class Milestone(TypedDict):
@@ -17,49 +20,86 @@ class Milestone(TypedDict):
     correct: int
 
 
-def collect_correct_milestones(log_dir: Path) -> List[Milestone]:
-    """Scan ``log_dir`` for ``attempts.jsonl`` files and collect milestones.
+# A milestone as a ``(model, attempts, total_cost, correct)`` tuple, which
+# sorts in merge order and is far smaller than its dictionary.
+_Row = Tuple[str, int, float, int]
+
+
+def _file_milestones(attempts_file: Path) -> List[_Row]:
+    """Return the milestones of one ``attempts.jsonl`` in ``(model, attempts)`` order.
+
+    Running totals are kept per model, so a file holding several models'
+    attempts yields each model's own progress.  The whole file's milestones
+    are returned as one list, sorted because a mixed log interleaves models.
+    """
+    totals: Dict[str, List[Any]] = {}
+    rows: List[_Row] = []
+    for data in read_attempt_log(attempts_file):
+        model = data.get("model", "")
+        counts = totals.setdefault(model, [0, 0.0, 0])
+        counts[0] += 1
+        counts[1] += float(data.get("cost", {}).get("total", 0.0))
+        if data.get("correct"):
+            counts[2] += 1
+            rows.append((model, counts[0], counts[1], counts[2]))
+    rows.sort(key=lambda row: (row[0], row[1]))
+    return rows
+
+
+def iter_correct_milestones(log_dir: Path, workers: int | None = None) -> Iterator[Milestone]:
+    """Stream the milestones of every ``attempts.jsonl`` under ``log_dir``.
 
     Each line in ``attempts.jsonl`` is expected to be a JSON object describing
-    a single task attempt.  The function keeps running totals of attempts and
-    cost per model.  Whenever a correct attempt is encountered, a milestone
-    is recorded containing the model name, number of attempts, total cost and
-    number of correct answers observed so far.
+    a single task attempt.  Running totals of attempts and cost are kept per
+    file and model, and whenever a correct attempt is encountered a
+    milestone is yielded containing the model name, number of attempts,
+    total cost and number of correct answers observed so far.
+
+    Milestones are buffered per file, not streamed from the logs: each file
+    is read line by line and closed before the next is opened, and its
+    milestones (one compact tuple per correct attempt) are kept in a list
+    sorted by ``(model, attempts)``.  Once every file has been read, the
+    lists are combined with a k-way merge.  Memory therefore grows with the
+    number of correct attempts under ``log_dir``, and no log's file
+    descriptor stays open during the merge.
+
+    With ``workers`` above one, files are parsed on a process pool of that
+    size instead and merged in the same order, so the result is identical
+    to a serial scan.
     """
+    paths = sorted(Path(log_dir).rglob(ATTEMPTS_FILE))
+    streams = list(map_runs(_file_milestones, paths, workers))
+    for model, attempts, total_cost, correct in heapq.merge(
+        *streams, key=lambda row: (row[0], row[1])
+    ):
+        yield {
+            "model": model,
+            "attempts": attempts,
+            "total_cost": total_cost,
+            "correct": correct,
+        }
+
+
+def collect_correct_milestones(log_dir: Path, workers: int | None = None) -> List[Milestone]:
+    """Return all milestones under ``log_dir``; see :func:`iter_correct_milestones`."""
+    return list(iter_correct_milestones(log_dir, workers=workers))
 
-    milestones: List[Milestone] = []
-    for attempts_file in sorted(Path(log_dir).rglob("attempts.jsonl")):
-        attempts = 0
-        total_cost = 0.0
-        correct = 0
-        for line in attempts_file.read_text().splitlines():
-            if not line.strip():
-                continue
-            data = json.loads(line)
-            attempts += 1
-            total_cost += float(data.get("cost", {}).get("total", 0.0))
-            if data.get("correct"):
-                correct += 1
-                milestones.append(
-                    {
-                        "model": data.get("model", ""),
-                        "attempts": attempts,
-                        "total_cost": total_cost,
-                        "correct": correct,
-                    }
-                )
-    milestones.sort(key=lambda m: (m["model"], m["attempts"]))
-    return milestones
-
-
-def write_milestones_csv(milestones: Iterable[Milestone], output_file: Path) -> None:
-    """Write ``milestones`` to ``output_file`` as CSV."""
+
+def write_milestones_csv(milestones: Iterable[Milestone], output_file: Path) -> int:
+    """Write ``milestones`` to ``output_file`` as CSV and return how many.
+
+    ``milestones`` is consumed incrementally, so it may be the iterator
+    returned by :func:`iter_correct_milestones`.
+    """
 
     output_file.parent.mkdir(parents=True, exist_ok=True)
     with output_file.open("w", newline="") as fh:
         writer = csv.writer(fh)
         writer.writerow(["model", "attempts", "total_cost", "correct"])
+        count = 0
         for row in milestones:
             writer.writerow(
                 [row["model"], row["attempts"], f"{row['total_cost']:.4f}", row["correct"]]
             )
+            count += 1
+    return count
@@ -0,0 +1,168 @@
+"""Concurrent budget runner keeping several LLM requests in flight."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict
+
+from .attempt_log import ATTEMPTS_FILE, AttemptLog
+from .budget import BudgetLedger
+from .llm import achat_completion, calls_per_request
+from .llm_cost import estimate_max_cost
+from .problems import as_problem_store
+from .runner import (
+    _log_attempt,
+    _next_task,
+    _observe_tokens,
+    _score_completion,
+    _stream_options,
+    _token_limit,
+    load_humaneval_dataset,
+)
+from .testplan import get_test_plan
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .cache import CompletionCache
+    from .sandbox import SandboxPool
+    from .tokens import TokenPolicy
+
+
+async def run_humaneval_until_budget_async(
+    model: str,
+    budget: float,
+    log_dir: Path = Path("logs"),
+    max_tokens: int = 10_240,
+    concurrency: int = 4,
+    show_progress: bool = False,
+    pool: SandboxPool | None = None,
+    plan_cache_dir: Path | None = None,
+    fail_fast: bool = True,
+    cache: CompletionCache | None = None,
+    attempt_log: AttemptLog | None = None,
+    stream: bool = False,
+    token_policy: TokenPolicy | None = None,
+) -> Dict[str, Any]:
+    """Run HumanEval tasks until ``budget`` (USD) is exhausted, concurrently.
+
+    Behaves like :func:`~budgetbench.runner.run_humaneval_until_budget` but
+    keeps up to ``concurrency`` requests in flight, dispatching round-robin
+    over the unsolved tasks and never running two requests for the same task
+    at once.  Before a request is sent its worst-case cost
+    (:func:`~budgetbench.llm_cost.estimate_max_cost`) is reserved on a
+    :class:`~budgetbench.budget.BudgetLedger` and the reservation is settled
+    to the actual cost when the response arrives, so concurrency never lets
+    spending exceed what the sequential runner could spend.  While hedging is
+    configured the reservation covers both calls of a hedged request.  Evaluation runs
+    in worker threads so it does not block the event loop.
+
+    Attempts are logged and summarised, and ``cache``, ``stream`` and
+    ``token_policy`` are used, exactly as by the sequential runner.  The
+    policy's limit also bounds the cost reserved for each request.
+    """
+    problems = as_problem_store(load_humaneval_dataset())
+    for problem in problems:
+        get_test_plan(problem, cache_dir=plan_cache_dir)
+    tasks = list(problems.task_ids)
+    unsolved = tasks.copy()
+    attempts = 0
+    solved = set()
+    problem_stats = {task_id: {"attempts": 0, "correct": False} for task_id in tasks}
+    dispatched = {task_id: 0 for task_id in tasks}
+    replayed_cost = 0.0
+    log_dir.mkdir(parents=True, exist_ok=True)
+    ledger = BudgetLedger(budget)
+    owns_log = attempt_log is None
+    if attempt_log is None:
+        attempt_log = AttemptLog(log_dir / ATTEMPTS_FILE)
+    cursor = 0
+    in_flight: Dict[asyncio.Task, tuple] = {}
+
+    async def attempt(problem: Dict[str, Any], sample: int, limit: int) -> Dict[str, Any]:
+        completion = await achat_completion(
+            problem["prompt"],
+            model=model,
+            max_tokens=limit,
+            cache=cache,
+            sample=sample,
+            **_stream_options(problem, stream),
+        )
+        return await asyncio.to_thread(
+            _score_completion, problem, completion, pool, fail_fast
+        )
+
+    progress = None
+    if show_progress:
+        from tqdm.auto import tqdm
+
+        progress = tqdm(total=budget, unit="USD", desc="Budget spent")
+
+    try:
+        while True:
+            busy = {task_id for task_id, _ in in_flight.values()}
+            while len(in_flight) < concurrency and unsolved:
+                idx = _next_task(unsolved, cursor, busy)
+                if idx is None:
+                    break
+                task_id = unsolved[idx]
+                problem = problems[task_id]
+                limit = _token_limit(token_policy, model, task_id, max_tokens)
+                estimate = estimate_max_cost(problem["prompt"], model, limit)
+                estimate *= calls_per_request()
+                if not ledger.try_reserve(estimate):
+                    break
+                attempts += 1
+                future = asyncio.create_task(attempt(problem, dispatched[task_id], limit))
+                dispatched[task_id] += 1
+                in_flight[future] = (task_id, estimate)
+                busy.add(task_id)
+                cursor = idx + 1
+
+            if not in_flight:
+                break
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                task_id, estimate = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except BaseException:
+                    ledger.settle(estimate, 0.0)
+                    raise
+                cost = float(result.get("cost", {}).get("total", 0.0))
+                ledger.settle(estimate, cost)
+                if result["cached"]:
+                    replayed_cost += cost
+                if progress is not None:
+                    progress.update(min(cost, budget - progress.n))
+
+                correct = result["passed"] == result["total"]
+                problem_stats[task_id]["attempts"] += 1
+                problem_stats[task_id]["correct"] = (
+                    problem_stats[task_id]["correct"] or correct
+                )
+                _observe_tokens(token_policy, model, task_id, result)
+                _log_attempt(attempt_log, model, task_id, result, correct)
+
+                if correct and task_id not in solved:
+                    solved.add(task_id)
+                    idx = unsolved.index(task_id)
+                    unsolved.pop(idx)
+                    if idx < cursor:
+                        cursor -= 1
+    finally:
+        if owns_log:
+            attempt_log.close()
+        for future in in_flight:
+            future.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if progress is not None:
+            progress.close()
+
+    return {
+        "attempts": attempts,
+        "correct": len(solved),
+        "total_cost": ledger.spent,
+        "replayed_cost": replayed_cost,
+        "per_problem": problem_stats,
+    }
@@ -0,0 +1,138 @@
+"""Append-only JSONL log of benchmark attempts."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+ATTEMPTS_FILE = "attempts.jsonl"
+
+# Bytes read at a time when scanning backwards for the last complete line.
+_TAIL_CHUNK = 64 * 1024
+
+
+def _last_line_end(fh, size: int) -> int:
+    """Return the offset just past the last newline in ``fh`` (0 if none)."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - _TAIL_CHUNK)
+        fh.seek(start)
+        chunk = fh.read(pos - start)
+        idx = chunk.rfind(b"\n")
+        if idx != -1:
+            return start + idx + 1
+        pos = start
+    return 0
+
+
+def read_attempt_log(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the records of the attempts log at ``path`` in order.
+
+    A trailing line without its newline, left behind by a crash mid-write, is
+    ignored.
+    """
+    with Path(path).open("rb") as fh:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+class AttemptLog:
+    """Stream attempt records into a single append-only JSONL file.
+
+    Every record gets a monotonically increasing ``seq`` number, continuing
+    from the last record when an existing log is reopened.  Reopening also
+    truncates an incomplete final line so a crashed run can be resumed
+    without corrupting the file.
+
+    ``flush_every`` sets how many records are buffered before they are
+    flushed to the operating system (``0`` flushes only on :meth:`close`);
+    with ``fsync`` each flush is also forced to disk.  When ``legacy_dir``
+    is given every record is additionally written there as a
+    ``<id>.json`` file, the layout older tools expect.  The log may be
+    shared between threads.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_every: int = 1,
+        fsync: bool = False,
+        legacy_dir: Path | None = None,
+    ) -> None:
+        if flush_every < 0:
+            raise ValueError("flush_every must be non-negative")
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self.legacy_dir = Path(legacy_dir) if legacy_dir is not None else None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.next_seq = self._recover()
+        self._fh = self.path.open("ab")
+
+    def _recover(self) -> int:
+        """Drop a partial last line and return the next sequence number."""
+        if not self.path.exists():
+            return 0
+        with self.path.open("rb+") as fh:
+            size = fh.seek(0, os.SEEK_END)
+            end = _last_line_end(fh, size)
+            if end != size:
+                fh.truncate(end)
+            if end == 0:
+                return 0
+            start = _last_line_end(fh, end - 1)
+            fh.seek(start)
+            last = fh.read(end - start)
+        try:
+            return int(json.loads(last)["seq"]) + 1
+        except (ValueError, KeyError, TypeError):
+            # Not written by AttemptLog; number records after the existing ones.
+            return sum(1 for _ in read_attempt_log(self.path))
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Append ``record`` with the next ``seq`` number and return it."""
+        with self._lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            record = {"seq": seq, **record}
+            self._fh.write(json.dumps(record).encode() + b"\n")
+            self._pending += 1
+            if self.flush_every and self._pending >= self.flush_every:
+                self._flush()
+            if self.legacy_dir is not None:
+                self.legacy_dir.mkdir(parents=True, exist_ok=True)
+                with (self.legacy_dir / f"{record['id']}.json").open("w") as fh:
+                    json.dump(record, fh)
+        return seq
+
+    def _flush(self) -> None:
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+        self._pending = 0
+
+    def flush(self) -> None:
+        """Write buffered records out, honouring the ``fsync`` policy."""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._flush()
+            self._fh.close()
+
+    def __enter__(self) -> AttemptLog:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,259 @@
+"""OpenAI-style Batch API requests and a local file-backed stand-in service."""
+
+from __future__ import annotations
+
+import json
+import time
+import types
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlparse
+
+from .llm import _build_result, get_client
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Hosts known to bill Batch API jobs below the synchronous price, and the
+# factor they bill at.  OpenAI charges half.
+BATCH_DISCOUNTS = {"api.openai.com": 0.5}
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchError(RuntimeError):
+    """Raised when a batch job fails as a whole."""
+
+
+def batch_price_factor(client: Any) -> float:
+    """Return the fraction of the synchronous price batch jobs on ``client`` cost.
+
+    Only hosts in :data:`BATCH_DISCOUNTS` get a discount.  Any other
+    endpoint is charged at full price: OpenRouter, whose prices
+    :data:`~budgetbench.llm_cost.LLM_COSTS` lists, has no Batch API, and a
+    :class:`LocalBatchClient` answers from the synchronous endpoint.
+    """
+    base_url = getattr(client, "base_url", None)
+    if base_url is None:
+        return 1.0
+    return BATCH_DISCOUNTS.get(urlparse(str(base_url)).hostname, 1.0)
+
+
+def batch_request(custom_id: str, model: str, prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """Return one line of a batch input file for a chat completion."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+        },
+    }
+
+
+def submit_batch(
+    client: Any, requests: Iterable[Dict[str, Any]], metadata: Dict[str, str] | None = None
+) -> str:
+    """Upload ``requests`` as a JSONL file, start a batch job and return its id."""
+    data = "".join(json.dumps(request) + "\n" for request in requests).encode()
+    input_file = client.files.create(file=("batch.jsonl", data), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata=metadata,
+    )
+    return batch.id
+
+
+def wait_for_batch(client: Any, batch_id: str, poll_interval: float = 30.0) -> Any:
+    """Poll the batch ``batch_id`` until it stops and return it.
+
+    Expired and cancelled batches are returned since they may hold partial
+    results; a failed batch raises :class:`BatchError`.
+    """
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_STATUSES:
+            break
+        time.sleep(poll_interval)
+    if batch.status == "failed":
+        raise BatchError(f"Batch {batch_id} failed: {getattr(batch, 'errors', None)}")
+    return batch
+
+
+def iter_batch_results(
+    client: Any, batch: Any
+) -> Iterator[Tuple[str, Dict[str, Any] | None, Any]]:
+    """Yield ``(custom_id, body, error)`` for every request the batch answered.
+
+    ``body`` is the chat completion as a dictionary, or ``None`` with the
+    request's ``error`` when it failed.  Each output file is downloaded
+    whole, then parsed one line at a time, so callers can process results
+    while the rest of the file is parsed.
+    """
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                yield record["custom_id"], response["body"], None
+            else:
+                yield record["custom_id"], None, record.get("error") or response.get("body")
+
+
+def _namespace(value: Any) -> Any:
+    if isinstance(value, dict):
+        return types.SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+def batch_result(body: Dict[str, Any], model: str, price_factor: float) -> dict:
+    """Convert a batch response ``body`` into :func:`~budgetbench.llm.chat_completion`'s result.
+
+    Costs are scaled by ``price_factor``, the batch discount.
+    """
+    result = _build_result(_namespace(body), model)
+    result["cost"] = {key: value * price_factor for key, value in result["cost"].items()}
+    return result
+
+
+def _realtime_response(body: Dict[str, Any]) -> Dict[str, Any]:
+    return get_client().chat.completions.create(**body).model_dump()
+
+
+class LocalBatchClient:
+    """File-backed stand-in for the Files and Batches APIs of an OpenAI client.
+
+    Files and batch states are kept under ``root``.  A batch runs when it is
+    polled for the ``polls``-th time: each request body is passed to
+    ``responder``, which returns the chat completion as a dictionary, and
+    exceptions become per-request errors.  The default responder sends the
+    request to the synchronous chat endpoint, which runs a batch sweep
+    against providers without a Batch API.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        responder: Callable[[Dict[str, Any]], Dict[str, Any]] | None = None,
+        polls: int = 1,
+    ) -> None:
+        self.root = Path(root)
+        self.responder = responder or _realtime_response
+        self.polls = polls
+        (self.root / "files").mkdir(parents=True, exist_ok=True)
+        (self.root / "batches").mkdir(parents=True, exist_ok=True)
+        self.files = types.SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = types.SimpleNamespace(
+            create=self._create_batch, retrieve=self._retrieve_batch, cancel=self._cancel_batch
+        )
+
+    def _file_path(self, file_id: str) -> Path:
+        return self.root / "files" / f"{file_id}.jsonl"
+
+    def _write_file(self, data: bytes, filename: str, purpose: str) -> types.SimpleNamespace:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self._file_path(file_id).write_bytes(data)
+        return types.SimpleNamespace(
+            id=file_id, filename=filename, purpose=purpose, bytes=len(data)
+        )
+
+    def _create_file(self, file: Any, purpose: str) -> types.SimpleNamespace:
+        filename = "upload.jsonl"
+        if isinstance(file, tuple):
+            filename, file = file[0], file[1]
+        data = file.read() if hasattr(file, "read") else file
+        if isinstance(data, str):
+            data = data.encode()
+        return self._write_file(data, filename, purpose)
+
+    def _file_content(self, file_id: str) -> types.SimpleNamespace:
+        data = self._file_path(file_id).read_bytes()
+        return types.SimpleNamespace(content=data, text=data.decode())
+
+    def _state_path(self, batch_id: str) -> Path:
+        return self.root / "batches" / f"{batch_id}.json"
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        self._state_path(state["id"]).write_text(json.dumps(state))
+
+    def _load(self, batch_id: str) -> Dict[str, Any]:
+        return json.loads(self._state_path(batch_id).read_text())
+
+    def _create_batch(
+        self,
+        input_file_id: str,
+        endpoint: str,
+        completion_window: str,
+        metadata: Dict[str, str] | None = None,
+    ) -> types.SimpleNamespace:
+        state = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "metadata": metadata,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "errors": None,
+            "polls": 0,
+        }
+        self._save(state)
+        return _namespace(state)
+
+    def _run(self, state: Dict[str, Any]) -> None:
+        lines = self._file_content(state["input_file_id"]).text.splitlines()
+        outputs, errors = [], []
+        for n, line in enumerate(lines):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            record = {"id": f"batch_req_{n}", "custom_id": request["custom_id"]}
+            try:
+                body = self.responder(request["body"])
+            except Exception as exc:
+                error = {"code": type(exc).__name__, "message": str(exc)}
+                errors.append({**record, "response": None, "error": error})
+                continue
+            response = {"status_code": 200, "request_id": record["id"], "body": body}
+            outputs.append({**record, "response": response, "error": None})
+        for key, records in (("output_file_id", outputs), ("error_file_id", errors)):
+            if records:
+                data = "".join(json.dumps(r) + "\n" for r in records).encode()
+                state[key] = self._write_file(data, f"{key}.jsonl", "batch_output").id
+        state["request_counts"] = {
+            "total": len(outputs) + len(errors),
+            "completed": len(outputs),
+            "failed": len(errors),
+        }
+        state["status"] = "completed"
+        state["completed_at"] = int(time.time())
+
+    def _retrieve_batch(self, batch_id: str) -> types.SimpleNamespace:
+        state = self._load(batch_id)
+        if state["status"] not in TERMINAL_STATUSES:
+            state["polls"] += 1
+            if state["polls"] >= self.polls:
+                self._run(state)
+            else:
+                state["status"] = "in_progress"
+            self._save(state)
+        return _namespace(state)
+
+    def _cancel_batch(self, batch_id: str) -> types.SimpleNamespace:
+        state = self._load(batch_id)
+        if state["status"] not in TERMINAL_STATUSES:
+            state["status"] = "cancelled"
+            self._save(state)
+        return _namespace(state)
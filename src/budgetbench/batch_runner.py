@@ -0,0 +1,211 @@
+"""Budget runner that submits each round of attempts as one Batch API job."""
+
+from __future__ import annotations
+
+import itertools
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Tuple
+
+from .attempt_log import ATTEMPTS_FILE, AttemptLog
+from .batch import (
+    batch_price_factor,
+    batch_request,
+    batch_result,
+    iter_batch_results,
+    submit_batch,
+    wait_for_batch,
+)
+from .budget import BudgetLedger
+from .llm import get_client
+from .llm_cost import estimate_max_cost
+from .problems import as_problem_store
+from .runner import (
+    _log_attempt,
+    _observe_tokens,
+    _score_completion,
+    _token_limit,
+    load_humaneval_dataset,
+)
+from .testplan import get_test_plan
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .cache import CompletionCache
+    from .sandbox import SandboxPool
+    from .tokens import TokenPolicy
+
+
+def run_humaneval_batches(
+    model: str,
+    budget: float,
+    log_dir: Path = Path("logs"),
+    max_tokens: int = 10_240,
+    client: Any = None,
+    poll_interval: float = 30.0,
+    price_factor: float | None = None,
+    show_progress: bool = False,
+    pool: SandboxPool | None = None,
+    plan_cache_dir: Path | None = None,
+    fail_fast: bool = True,
+    cache: CompletionCache | None = None,
+    attempt_log: AttemptLog | None = None,
+    token_policy: TokenPolicy | None = None,
+    max_failures: int = 3,
+) -> Dict[str, Any]:
+    """Run HumanEval tasks until ``budget`` (USD) is exhausted, in batch rounds.
+
+    Every round sends one attempt at each unsolved task as a single batch job
+    through ``client`` (the shared OpenAI client by default, or a
+    :class:`~budgetbench.batch.LocalBatchClient`), polls it every
+    ``poll_interval`` seconds and evaluates the responses as they are read
+    from the output file; the next round retries the tasks still unsolved.
+    Responses are charged at ``price_factor`` times the synchronous price,
+    by default the provider's batch discount from
+    :func:`~budgetbench.batch.batch_price_factor`.
+
+    A request joins a round only while the worst-case cost of the round's
+    requests still fits the remaining budget, as reserved on a
+    :class:`~budgetbench.budget.BudgetLedger`; the first request of a round
+    is always admitted, so a run overshoots the budget no more than the
+    sequential runner does.  Requests the batch fails to answer are not
+    charged and are retried in the next round, until a task has failed
+    ``max_failures`` times; it is then given up on and listed in the
+    summary's ``abandoned`` tasks, so a run whose remaining requests keep
+    failing still ends with a summary.
+
+    Attempts are logged and summarised, and ``pool``, ``fail_fast``,
+    ``cache`` and ``token_policy`` are used, as by
+    :func:`~budgetbench.runner.run_humaneval_until_budget`; the summary also
+    reports the number of ``rounds``, of ``failed_requests`` and the
+    ``abandoned`` tasks.
+    """
+    problems = as_problem_store(load_humaneval_dataset())
+    for problem in problems:
+        get_test_plan(problem, cache_dir=plan_cache_dir)
+    tasks = list(problems.task_ids)
+    unsolved = tasks.copy()
+    attempts = 0
+    rounds = 0
+    failed_requests = 0
+    failures = {task_id: 0 for task_id in tasks}
+    replayed_cost = 0.0
+    solved = set()
+    problem_stats = {task_id: {"attempts": 0, "correct": False} for task_id in tasks}
+    log_dir.mkdir(parents=True, exist_ok=True)
+    ledger = BudgetLedger(budget)
+    owns_log = attempt_log is None
+    if attempt_log is None:
+        attempt_log = AttemptLog(log_dir / ATTEMPTS_FILE)
+    if client is None:
+        client = get_client()
+    if price_factor is None:
+        price_factor = batch_price_factor(client)
+
+    progress = None
+    if show_progress:
+        from tqdm.auto import tqdm
+
+        progress = tqdm(total=budget, unit="USD", desc="Budget spent")
+
+    def answered(
+        batch: Any, pending: Dict[str, Tuple[str, int, float]]
+    ) -> Iterator[Tuple[str, float, dict]]:
+        nonlocal failed_requests
+        for custom_id, body, _error in iter_batch_results(client, batch):
+            if custom_id not in pending:
+                continue
+            task_id, limit, estimate = pending.pop(custom_id)
+            if body is None:
+                failed_requests += 1
+                failures[task_id] += 1
+                ledger.settle(estimate, 0.0)
+                continue
+            completion = batch_result(body, model, price_factor)
+            if cache is not None:
+                completion = cache.record(
+                    model,
+                    problems[task_id]["prompt"],
+                    limit,
+                    problem_stats[task_id]["attempts"],
+                    completion,
+                )
+            yield task_id, estimate, completion
+
+    try:
+        while unsolved and not ledger.exhausted:
+            replays = []
+            requests = []
+            pending: Dict[str, Tuple[str, int, float]] = {}
+            for task_id in unsolved:
+                prompt = problems[task_id]["prompt"]
+                sample = problem_stats[task_id]["attempts"]
+                limit = _token_limit(token_policy, model, task_id, max_tokens)
+                estimate = estimate_max_cost(prompt, model, limit) * price_factor
+                if not ledger.try_reserve(estimate):
+                    break
+                if cache is not None:
+                    cached = cache.lookup(model, prompt, limit, sample)
+                    if cached is not None:
+                        replays.append((task_id, estimate, cached))
+                        continue
+                custom_id = f"{task_id}#{sample}"
+                requests.append(batch_request(custom_id, model, prompt, limit))
+                pending[custom_id] = (task_id, limit, estimate)
+            if not replays and not pending:
+                break
+            rounds += 1
+
+            responses: Iterator[Tuple[str, float, dict]] = iter(())
+            if requests:
+                batch_id = submit_batch(
+                    client, requests, metadata={"model": model, "round": str(rounds)}
+                )
+                batch = wait_for_batch(client, batch_id, poll_interval)
+                responses = answered(batch, pending)
+            newly_solved = set()
+            for task_id, estimate, completion in itertools.chain(replays, responses):
+                cost = float(completion.get("cost", {}).get("total", 0.0))
+                ledger.settle(estimate, cost)
+                if completion.get("cached"):
+                    replayed_cost += cost
+                if progress is not None:
+                    progress.update(min(cost, budget - progress.n))
+                _observe_tokens(token_policy, model, task_id, completion)
+                result = _score_completion(
+                    problems[task_id], completion, pool=pool, fail_fast=fail_fast
+                )
+                attempts += 1
+                correct = result["passed"] == result["total"]
+                problem_stats[task_id]["attempts"] += 1
+                problem_stats[task_id]["correct"] = (
+                    problem_stats[task_id]["correct"] or correct
+                )
+                _log_attempt(attempt_log, model, task_id, result, correct)
+                if correct:
+                    newly_solved.add(task_id)
+            for task_id, _limit, estimate in pending.values():
+                # Not answered at all, e.g. because the batch expired.
+                failed_requests += 1
+                failures[task_id] += 1
+                ledger.settle(estimate, 0.0)
+            solved |= newly_solved
+            unsolved = [
+                task_id
+                for task_id in unsolved
+                if task_id not in newly_solved and failures[task_id] < max_failures
+            ]
+    finally:
+        if owns_log:
+            attempt_log.close()
+        if progress is not None:
+            progress.close()
+
+    return {
+        "attempts": attempts,
+        "correct": len(solved),
+        "total_cost": ledger.spent,
+        "replayed_cost": replayed_cost,
+        "rounds": rounds,
+        "failed_requests": failed_requests,
+        "abandoned": [task_id for task_id in tasks if failures[task_id] >= max_failures],
+        "per_problem": problem_stats,
+    }
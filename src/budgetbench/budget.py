@@ -0,0 +1,52 @@
+"""Budget accounting for runners with several requests in flight."""
+
+from __future__ import annotations
+
+import threading
+
+
+class BudgetLedger:
+    """Track money spent and reserved against a hard ``budget`` in USD.
+
+    Before a request is dispatched its worst-case cost is reserved with
+    :meth:`try_reserve`; once it completes the reservation is replaced by the
+    actual cost with :meth:`settle`.  The ledger is safe to share between
+    threads.
+    """
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, estimate: float) -> bool:
+        """Reserve ``estimate`` for a new request if the budget allows it.
+
+        Nothing is dispatched once ``spent`` reaches the budget.  With no other
+        request in flight a reservation always succeeds, so a single request
+        may overshoot the budget exactly like the sequential runner's last
+        attempt.  Additional concurrent requests are only admitted when their
+        worst case still fits under the budget.
+        """
+        with self._lock:
+            if self.spent >= self.budget:
+                return False
+            if self.in_flight and self.spent + self.reserved + estimate > self.budget:
+                return False
+            self.reserved += estimate
+            self.in_flight += 1
+            return True
+
+    def settle(self, estimate: float, actual: float) -> None:
+        """Release the reservation of ``estimate`` and record ``actual``."""
+        with self._lock:
+            self.reserved = max(self.reserved - estimate, 0.0)
+            self.in_flight -= 1
+            self.spent += actual
+
+    @property
+    def exhausted(self) -> bool:
+        with self._lock:
+            return self.spent >= self.budget
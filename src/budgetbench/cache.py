@@ -0,0 +1,192 @@
+"""Content-addressed on-disk cache for LLM completions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+CACHE_MODES = ("readwrite", "record", "replay")
+
+
+class CacheMissError(LookupError):
+    """Raised in ``replay`` mode when a request has no cached response."""
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how a :class:`CompletionCache` was used.
+
+    ``replayed_cost`` is what cache hits would have cost had they been sent
+    to the provider; ``actual_spend`` is the cost of requests that were.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    replayed_cost: float = 0.0
+    actual_spend: float = 0.0
+
+
+def cache_key(model: str, prompt: str, max_tokens: int, sample: int = 0) -> str:
+    """Return the content address of a completion request.
+
+    ``sample`` distinguishes repeated requests for the same prompt, e.g. the
+    runner's retries of a task, so each retry replays its own response.
+    """
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "max_tokens": max_tokens, "sample": sample},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CompletionCache:
+    """SQLite-backed store of completion results keyed by :func:`cache_key`.
+
+    ``mode`` selects how :meth:`lookup` behaves: ``"readwrite"`` replays hits
+    and records misses, ``"record"`` always calls the provider and stores the
+    response, and ``"replay"`` never calls it and raises
+    :class:`CacheMissError` on a miss.
+
+    Entries older than ``ttl`` seconds are ignored and purged.  When
+    ``max_entries`` or ``max_bytes`` is set, the least recently used entries
+    are evicted after each write to stay within the limit.  The cache may be
+    shared between threads.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "readwrite",
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(CACHE_MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached result for ``key`` or ``None``."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and created < now - self.ttl:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE completions SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def put(self, key: str, result: dict) -> None:
+        """Store ``result`` under ``key`` and apply the eviction policy."""
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM completions WHERE created < ?", (now - self.ttl,)
+            )
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                " SELECT key FROM completions ORDER BY accessed DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        if self.max_bytes is not None:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT key, size FROM completions ORDER BY accessed"
+                ).fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM completions WHERE key = ?", stale)
+
+    def lookup(
+        self, model: str, prompt: str, max_tokens: int, sample: int = 0
+    ) -> dict | None:
+        """Return the cached result for a request, or ``None`` to send it.
+
+        Hits carry ``"cached": True``.  In ``record`` mode nothing is looked
+        up; in ``replay`` mode a miss raises :class:`CacheMissError`.
+        """
+        if self.mode == "record":
+            return None
+        cached = self.get(cache_key(model, prompt, max_tokens, sample))
+        if cached is None:
+            if self.mode == "replay":
+                raise CacheMissError(f"No cached completion for {model} (sample {sample})")
+            return None
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.replayed_cost += float(cached.get("cost", {}).get("total", 0.0))
+        return {**cached, "cached": True}
+
+    def record(
+        self, model: str, prompt: str, max_tokens: int, sample: int, result: dict
+    ) -> dict:
+        """Store a freshly retrieved ``result`` and return it marked uncached."""
+        self.put(cache_key(model, prompt, max_tokens, sample), result)
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.actual_spend += float(result.get("cost", {}).get("total", 0.0))
+        return {**result, "cached": False}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> CompletionCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
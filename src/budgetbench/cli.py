@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 from pathlib import Path
 
-from .runner import run_humaneval_until_budget
+from .attempt_log import ATTEMPTS_FILE, AttemptLog
+from .cache import CACHE_MODES, CompletionCache
 
 
 def main() -> None:
@@ -14,26 +16,275 @@ def main() -> None:
     parser.add_argument("model", help="Model name to evaluate")
     parser.add_argument("budget", type=float, help="Budget in USD")
     parser.add_argument(
-        "--log-dir", default="logs", help="Directory to store JSON log files"
+        "--log-dir", default="logs", help="Directory to store the attempts log"
+    )
+    parser.add_argument(
+        "--log-flush-every",
+        type=int,
+        default=1,
+        help="Flush the attempts log after this many records (0: only at exit)",
+    )
+    parser.add_argument(
+        "--log-fsync",
+        action="store_true",
+        help="fsync the attempts log on every flush",
+    )
+    parser.add_argument(
+        "--legacy-log-files",
+        action="store_true",
+        help="Also write each attempt to its own <uuid>.json file",
     )
     parser.add_argument(
         "--analytics",
         choices=["simple", "full"],
         help="Include analytics output (simple or full)",
     )
+    parser.add_argument(
+        "--sandbox-workers",
+        type=int,
+        default=0,
+        help="Evaluate on a pool of this many pre-forked sandbox workers "
+        "(default: start a fresh process per evaluation)",
+    )
+    parser.add_argument(
+        "--plan-cache-dir",
+        help="Directory for cached precompiled test plans",
+    )
+    parser.add_argument(
+        "--full-scoring",
+        action="store_true",
+        help="Run every assertion of each attempt instead of stopping at the "
+        "first failure (implied by --analytics full)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of LLM requests to keep in flight (default: 1, sequential)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap generation, extraction and evaluation in staged worker "
+        "pools (--concurrency sets the number of generation workers)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit each round of attempts as one Batch API job (half price on "
+        "OpenAI, results within 24h)",
+    )
+    parser.add_argument(
+        "--batch-local",
+        metavar="DIR",
+        help="Run batch rounds through a local file-backed stand-in for the "
+        "Batch API, answered by the regular endpoint at full price",
+    )
+    parser.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between polls of a running batch (default: 30)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream completions and stop each one once its code block is complete",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=1,
+        help="Completions to request at once per task (n), for cheaper pass@k "
+        "sampling; sequential runs only",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        help="Requests per minute allowed by the provider for this model",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        help="Tokens per minute allowed by the provider for this model",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Upper bound for the adaptive number of requests in flight "
+        "(enables rate limiting even without --rpm/--tpm)",
+    )
+    parser.add_argument(
+        "--hedge-quantile",
+        type=float,
+        help="Duplicate requests still outstanding after this quantile of the "
+        "model's latency (e.g. 0.95); both calls are charged",
+    )
+    parser.add_argument(
+        "--hedge-rate",
+        type=float,
+        default=0.05,
+        help="Largest fraction of requests that may be hedged (default: 0.05)",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=10_240,
+        help="Max tokens per request (the ceiling with --adaptive-tokens)",
+    )
+    parser.add_argument(
+        "--adaptive-tokens",
+        action="store_true",
+        help="Choose each request's max tokens from the usage of earlier attempts",
+    )
+    parser.add_argument(
+        "--token-history",
+        help="Directory of attempts logs to learn token usage from "
+        "(default: --log-dir)",
+    )
+    parser.add_argument(
+        "--token-quantile",
+        type=float,
+        default=0.95,
+        help="Quantile of a task's past token usage to allow (default: 0.95)",
+    )
+    parser.add_argument(
+        "--cache",
+        help="SQLite file caching completions so repeated runs replay them",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default="readwrite",
+        help="readwrite replays hits and records misses, record always calls "
+        "the provider, replay never does",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        help="Evict least recently used cache entries beyond this size",
+    )
     args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
+    if args.samples > 1 and (
+        args.concurrency > 1 or args.pipeline or args.batch or args.batch_local or args.stream
+    ):
+        parser.error(
+            "--samples cannot be combined with --concurrency, --pipeline, --batch or --stream"
+        )
+    if (args.batch or args.batch_local) and (
+        args.pipeline or args.stream or args.concurrency > 1
+    ):
+        parser.error("--batch cannot be combined with --pipeline, --stream or --concurrency")
+    if args.pipeline and args.sandbox_workers > 0:
+        parser.error(
+            "--pipeline evaluates on its own process pool; drop --sandbox-workers"
+        )
 
-    summary = run_humaneval_until_budget(
-        model=args.model,
-        budget=args.budget,
-        log_dir=Path(args.log_dir),
-        show_progress=True,
-    )
+    # Imported after parsing so ``--help`` and usage errors stay fast.
+    import asyncio
+
+    from .async_runner import run_humaneval_until_budget_async
+    from .pipeline import run_humaneval_pipeline
+    from .runner import run_humaneval_until_budget
+    from .sandbox import SandboxPool
+    from .tokens import TokenPolicy
+
+    if args.rpm or args.tpm or args.max_in_flight:
+        from .ratelimit import RateLimits, configure_rate_limits
+
+        configure_rate_limits(
+            RateLimits(
+                requests_per_minute=args.rpm,
+                tokens_per_minute=args.tpm,
+                max_in_flight=args.max_in_flight or RateLimits.max_in_flight,
+            )
+        )
+
+    if args.hedge_quantile:
+        from .hedge import HedgePolicy
+        from .llm import configure_hedging
+
+        configure_hedging(
+            HedgePolicy(quantile=args.hedge_quantile, max_hedge_rate=args.hedge_rate)
+        )
+
+    with contextlib.ExitStack() as stack:
+        log_dir = Path(args.log_dir)
+        attempt_log = stack.enter_context(
+            AttemptLog(
+                log_dir / ATTEMPTS_FILE,
+                flush_every=args.log_flush_every,
+                fsync=args.log_fsync,
+                legacy_dir=log_dir if args.legacy_log_files else None,
+            )
+        )
+        pool = None
+        if args.sandbox_workers > 0:
+            pool = stack.enter_context(SandboxPool(workers=args.sandbox_workers))
+        cache = None
+        if args.cache:
+            max_bytes = int(args.cache_max_mb * 1e6) if args.cache_max_mb else None
+            cache = stack.enter_context(
+                CompletionCache(Path(args.cache), mode=args.cache_mode, max_bytes=max_bytes)
+            )
+        token_policy = None
+        if args.adaptive_tokens:
+            # Read before this run appends to the attempts log.
+            token_policy = TokenPolicy.from_logs(
+                Path(args.token_history or log_dir), quantile=args.token_quantile
+            )
+        run_kwargs = dict(
+            model=args.model,
+            budget=args.budget,
+            log_dir=log_dir,
+            max_tokens=args.max_tokens,
+            show_progress=True,
+            pool=pool,
+            plan_cache_dir=Path(args.plan_cache_dir) if args.plan_cache_dir else None,
+            fail_fast=not (args.full_scoring or args.analytics == "full"),
+            cache=cache,
+            attempt_log=attempt_log,
+            stream=args.stream,
+            token_policy=token_policy,
+        )
+        if args.batch or args.batch_local:
+            from .batch import LocalBatchClient
+            from .batch_runner import run_humaneval_batches
+
+            run_kwargs.pop("stream")
+            client = None
+            if args.batch_local:
+                client = LocalBatchClient(Path(args.batch_local))
+            summary = run_humaneval_batches(
+                client=client, poll_interval=args.batch_poll_interval, **run_kwargs
+            )
+        elif args.pipeline:
+            run_kwargs.pop("pool")
+            summary = run_humaneval_pipeline(
+                generation_workers=args.concurrency, **run_kwargs
+            )
+        elif args.concurrency > 1:
+            summary = asyncio.run(
+                run_humaneval_until_budget_async(
+                    concurrency=args.concurrency, **run_kwargs
+                )
+            )
+        else:
+            summary = run_humaneval_until_budget(
+                samples_per_request=args.samples, **run_kwargs
+            )
     print(
         f"Attempts: {summary['attempts']}\n"
         f"Correct: {summary['correct']}\n"
         f"Total cost: ${summary['total_cost']:.6f}"
     )
+    if cache is not None:
+        print(
+            f"Replayed cost: ${cache.stats.replayed_cost:.6f}\n"
+            f"Actual spend: ${cache.stats.actual_spend:.6f}"
+        )
 
     if args.analytics == "simple":
         print(
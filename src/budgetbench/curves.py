@@ -0,0 +1,166 @@
+"""Vectorised accuracy-per-dollar curves over arbitrary budget grids."""
+
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from .attempt_log import ATTEMPTS_FILE, read_attempt_log
+from .reports import _run_id, _total_tasks
+from .scan import map_runs
+
+
+class BudgetCurve(TypedDict):
+    """Problems solved by one run at each budget of a grid."""
+
+    model: str
+    run_id: str
+    budgets: np.ndarray
+    solved: np.ndarray
+    pass_rate: np.ndarray | None
+
+
+def budget_grid(
+    low: float = 1e-4, high: float = 10.0, points: int = 1000, log: bool = True
+) -> np.ndarray:
+    """Return ``points`` budgets from ``low`` to ``high``, log-spaced by default."""
+    if log:
+        return np.logspace(np.log10(low), np.log10(high), points)
+    return np.linspace(low, high, points)
+
+
+def run_arrays(
+    costs: Sequence[float], task_ids: Sequence[Any], correct: Sequence[bool]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return a run's cumulative cost and first-solve indicator arrays.
+
+    The inputs describe the run's attempts in order.  ``first_solve[i]`` is
+    true when attempt ``i`` is the first correct attempt at its task.
+    """
+    cumulative = np.cumsum(np.asarray(costs, dtype=np.float64))
+    first_solve = np.zeros(len(cumulative), dtype=bool)
+    correct_idx = np.flatnonzero(np.asarray(correct, dtype=bool))
+    if correct_idx.size:
+        tasks = np.asarray(task_ids, dtype=object)[correct_idx].astype(str)
+        _, first = np.unique(tasks, return_index=True)
+        first_solve[correct_idx[first]] = True
+    return cumulative, first_solve
+
+
+def solved_at(
+    cumulative: np.ndarray, first_solve: np.ndarray, budgets: Iterable[float]
+) -> np.ndarray:
+    """Return how many tasks a run had solved at each of ``budgets``.
+
+    A budget counts the tasks solved up to and including the first attempt
+    whose cumulative cost reaches it, or every task the run solved if it
+    never spent that much; the same rule as the budget table written by
+    :func:`~budgetbench.reports.aggregate`.
+    """
+    budgets = np.asarray(budgets, dtype=np.float64)
+    if not len(cumulative):
+        return np.zeros(budgets.shape, dtype=np.int64)
+    solved = np.cumsum(first_solve, dtype=np.int64)
+    idx = np.searchsorted(cumulative, budgets, side="left")
+    return solved[np.minimum(idx, len(solved) - 1)]
+
+
+def _scan_run(path: Path) -> Tuple[str | None, np.ndarray, np.ndarray, int | None]:
+    """Return one run's model, curve arrays and task count (pool worker)."""
+    model = None
+    costs: List[float] = []
+    task_ids: List[Any] = []
+    correct: List[bool] = []
+    for record in read_attempt_log(path):
+        if model is None:
+            model = record.get("model", "")
+        costs.append(float(record.get("cost", {}).get("total", 0.0)))
+        task_ids.append(record.get("task_id"))
+        correct.append(bool(record.get("correct")))
+    return model, *run_arrays(costs, task_ids, correct), _total_tasks(path.parent)
+
+
+def iter_budget_curves(
+    log_dir: Path, budgets: Iterable[float], workers: int | None = None
+) -> Iterator[BudgetCurve]:
+    """Yield the :class:`BudgetCurve` of every run under ``log_dir``.
+
+    Runs are described by their ``attempts.jsonl``; ``pass_rate`` is only
+    computed when the run's ``summary.json`` gives the number of tasks.
+    With ``workers`` above one, runs are parsed on a process pool and yielded
+    in the same order as a serial scan.
+    """
+    budgets = np.asarray(budgets, dtype=np.float64)
+    paths = sorted(Path(log_dir).rglob(ATTEMPTS_FILE))
+    for path, scanned in zip(paths, map_runs(_scan_run, paths, workers)):
+        model, cumulative, first_solve, total_tasks = scanned
+        if model is None:
+            continue
+        solved = solved_at(cumulative, first_solve, budgets)
+        yield {
+            "model": model,
+            "run_id": _run_id(path, log_dir),
+            "budgets": budgets,
+            "solved": solved,
+            "pass_rate": solved / total_tasks if total_tasks else None,
+        }
+
+
+def curves_from_per_call(table: Any, budgets: Iterable[float]) -> List[BudgetCurve]:
+    """Compute curves from the Parquet table of :func:`~budgetbench.reports.load_per_call`.
+
+    Rows are grouped into runs by ``(model, run_id)`` keeping their logged
+    order, with one stable sort of the whole table rather than a scan per
+    run.  ``pass_rate`` is not available from the table alone.
+    """
+    budgets = np.asarray(budgets, dtype=np.float64)
+    models = table.column("model").to_numpy(zero_copy_only=False).astype(str)
+    runs = table.column("run_id").to_numpy(zero_copy_only=False).astype(str)
+    tasks = table.column("task_id").to_numpy(zero_copy_only=False)
+    correct = table.column("correct").fill_null(False).to_numpy(zero_copy_only=False)
+    costs = table.column("cost_total").fill_null(0.0).to_numpy(zero_copy_only=False)
+    model_names, model_codes = np.unique(models, return_inverse=True)
+    run_names, run_codes = np.unique(runs, return_inverse=True)
+    groups, group_codes = np.unique(
+        np.stack([model_codes, run_codes], axis=1), axis=0, return_inverse=True
+    )
+    group_codes = group_codes.reshape(-1)
+    order = np.argsort(group_codes, kind="stable")
+    bounds = np.cumsum(np.bincount(group_codes, minlength=len(groups)))[:-1]
+    curves: List[BudgetCurve] = []
+    for (model_code, run_code), rows in zip(groups, np.split(order, bounds)):
+        model, run_id = str(model_names[model_code]), str(run_names[run_code])
+        cumulative, first_solve = run_arrays(costs[rows], tasks[rows], correct[rows])
+        curves.append(
+            {
+                "model": model,
+                "run_id": run_id,
+                "budgets": budgets,
+                "solved": solved_at(cumulative, first_solve, budgets),
+                "pass_rate": None,
+            }
+        )
+    return curves
+
+
+def write_budget_curves_csv(curves: Iterable[BudgetCurve], output_file: Path) -> None:
+    """Write ``curves`` to ``output_file`` as long-form CSV."""
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open("w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["model", "run_id", "budget", "solved", "pass_rate"])
+        for curve in curves:
+            pass_rate = curve["pass_rate"]
+            for i, budget in enumerate(curve["budgets"]):
+                writer.writerow(
+                    [
+                        curve["model"],
+                        curve["run_id"],
+                        f"{budget:.6g}",
+                        int(curve["solved"][i]),
+                        "" if pass_rate is None else f"{pass_rate[i]:.6g}",
+                    ]
+                )
@@ -0,0 +1,139 @@
+"""Local snapshots of the HumanEval dataset for fast, offline startup."""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+HUMANEVAL_DATASET = "openai/openai_humaneval"
+HUMANEVAL_SPLIT = "test"
+SNAPSHOT_FORMAT = "budgetbench-dataset"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ENV = "BUDGETBENCH_DATASET"
+DEFAULT_SNAPSHOT_PATH = Path.home() / ".cache" / "budgetbench" / "humaneval.json.gz"
+SNAPSHOT_FIELDS = ("task_id", "prompt", "canonical_solution", "test", "entry_point")
+
+
+class SnapshotError(ValueError):
+    """Raised when a dataset snapshot is malformed, outdated or corrupted."""
+
+
+def snapshot_path() -> Path:
+    """Return where the dataset snapshot lives (``$BUDGETBENCH_DATASET``)."""
+    return Path(os.environ.get(SNAPSHOT_ENV) or DEFAULT_SNAPSHOT_PATH)
+
+
+def load_dataset(path: str = HUMANEVAL_DATASET, split: str = HUMANEVAL_SPLIT):
+    """Load ``split`` of ``path`` from the Hugging Face Hub.
+
+    ``datasets`` is only imported here, so reading a snapshot never pays for
+    it.
+    """
+    import datasets
+
+    return datasets.load_dataset(path, split=split)
+
+
+def _checksum(rows: List[Dict[str, Any]]) -> str:
+    payload = json.dumps(rows, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def write_snapshot(
+    rows: Iterable[Dict[str, Any]],
+    path: Path,
+    source: str = HUMANEVAL_DATASET,
+    split: str = HUMANEVAL_SPLIT,
+) -> str:
+    """Write ``rows`` to ``path`` as a gzip-compressed JSON snapshot.
+
+    Only the problem fields in :data:`SNAPSHOT_FIELDS` are kept.  The file
+    records the format version, the source dataset and a SHA-256 checksum of
+    the rows, which is returned.
+    """
+    rows = [{field: row[field] for field in SNAPSHOT_FIELDS} for row in rows]
+    checksum = _checksum(rows)
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "split": split,
+        "created": time.time(),
+        "sha256": checksum,
+        "rows": rows,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        json.dump(snapshot, fh, separators=(",", ":"))
+    tmp.replace(path)
+    return checksum
+
+
+def read_snapshot(path: Path) -> List[Dict[str, Any]]:
+    """Return the rows stored in the snapshot at ``path``.
+
+    Raises :class:`SnapshotError` if the file is not a snapshot, was written
+    by another format version or fails its checksum.
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            snapshot = json.load(fh)
+    except (OSError, EOFError, ValueError) as exc:
+        raise SnapshotError(f"Unreadable dataset snapshot {path}: {exc}") from exc
+    if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"{path} is not a dataset snapshot")
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Dataset snapshot {path} has version {snapshot.get('version')}, "
+            f"expected {SNAPSHOT_VERSION}; recreate it with `budgetbench-dataset snapshot`"
+        )
+    rows = snapshot.get("rows", [])
+    if _checksum(rows) != snapshot.get("sha256"):
+        raise SnapshotError(f"Dataset snapshot {path} failed its checksum")
+    return rows
+
+
+def load_humaneval_rows() -> Iterable[Dict[str, Any]]:
+    """Return every HumanEval problem, from the snapshot when one exists."""
+    path = snapshot_path()
+    if path.is_file():
+        return read_snapshot(path)
+    return load_dataset(HUMANEVAL_DATASET, split=HUMANEVAL_SPLIT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the local HumanEval snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser(
+        "snapshot", help="Download HumanEval and write it to a local snapshot"
+    )
+    snapshot.add_argument(
+        "--output",
+        type=Path,
+        help=f"Snapshot file (default: ${SNAPSHOT_ENV} or {DEFAULT_SNAPSHOT_PATH})",
+    )
+    verify = commands.add_parser("verify", help="Check a snapshot's version and checksum")
+    verify.add_argument("path", type=Path, nargs="?", help="Snapshot file to check")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        path = args.output or snapshot_path()
+        rows = load_dataset(HUMANEVAL_DATASET, split=HUMANEVAL_SPLIT)
+        checksum = write_snapshot(rows, path)
+        print(f"Wrote {len(rows)} problems to {path} (sha256 {checksum})")
+    else:
+        path = args.path or snapshot_path()
+        rows = read_snapshot(path)
+        print(f"{path}: {len(rows)} problems, snapshot version {SNAPSHOT_VERSION}")
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
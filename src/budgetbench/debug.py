@@ -3,31 +3,54 @@ from __future__ import annotations
 
 import argparse
 import json
-from datasets import load_dataset
+from pathlib import Path
 
-from .llm import chat_completion
-from .evaluator import evaluate
-from .runner import _extract_code, _is_valid_python, _has_valid_signature
+from .dataset import load_humaneval_rows
+from .problems import ProblemStore
+from .tokens import TokenPolicy
 
 
-def debug_humaneval_task(task_id: str, model: str, max_tokens: int = 10_240) -> dict:
-    """Run ``task_id`` once with ``model`` and print intermediate results."""
+def debug_humaneval_task(
+    task_id: str,
+    model: str,
+    max_tokens: int = 10_240,
+    problems: ProblemStore | None = None,
+    token_policy: TokenPolicy | None = None,
+) -> dict:
+    """Run ``task_id`` once with ``model`` and print intermediate results.
+
+    ``problems`` may be given to reuse an already loaded store.  Otherwise
+    the full dataset is loaded, including tasks the runner excludes.  With a
+    ``token_policy`` the request's ``max_tokens`` is chosen by it, capped at
+    ``max_tokens``.
+    """
+    from .evaluator import evaluate
+    from .llm import chat_completion
+    from .runner import _extract_code, _has_valid_signature, _is_valid_python
+
     print(f"Loading HumanEval problem {task_id}...")
-    dataset = load_dataset("openai/openai_humaneval", split="test")
-    problem = next(p for p in dataset if p["task_id"] == task_id)
+    if problems is None:
+        problems = ProblemStore(load_humaneval_rows())
+    problem = problems[task_id]
     print("Prompt:\n" + problem["prompt"])
 
-    print("\nRequesting completion from model...")
+    if token_policy is not None:
+        max_tokens = token_policy.limit(model, task_id, max_tokens)
+    print(f"\nRequesting completion from model (max_tokens={max_tokens})...")
     completion = chat_completion(problem["prompt"], model=model, max_tokens=max_tokens)
     raw = completion["message"]
     print("Raw response:\n" + raw)
+    if completion.get("finish_reason") == "length":
+        print("(response truncated at max_tokens)")
 
     code = _extract_code(raw)
     print("\nExtracted code:\n" + code)
 
     is_valid = _is_valid_python(code)
     print(f"\nIs valid Python: {is_valid}")
-    has_valid_signature = _has_valid_signature(code, problem["prompt"], problem["entry_point"])
+    has_valid_signature = _has_valid_signature(
+        code, problem.prompt, problem.entry_point, problem.arg_names
+    )
     print(f"Has valid signature: {has_valid_signature}")
 
     print("\nRunning unit tests...")
@@ -64,10 +87,20 @@ def main() -> None:
     parser.add_argument(
         "--max-tokens", type=int, default=10_240, help="Max tokens to request"
     )
+    parser.add_argument(
+        "--token-history",
+        help="Choose max tokens from the attempts logs in this directory "
+        "(--max-tokens is then the ceiling)",
+    )
     args = parser.parse_args()
 
     task_id = f"HumanEval/{args.problem_number}"
-    debug_humaneval_task(task_id, model=args.model, max_tokens=args.max_tokens)
+    token_policy = None
+    if args.token_history:
+        token_policy = TokenPolicy.from_logs(Path(args.token_history))
+    debug_humaneval_task(
+        task_id, model=args.model, max_tokens=args.max_tokens, token_policy=token_policy
+    )
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
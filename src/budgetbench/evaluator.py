@@ -2,42 +2,244 @@
 
 from __future__ import annotations
 
-import ast
-from typing import Any, Dict, Tuple
+import marshal
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Sequence, Tuple
 
-from human_eval.execution import check_correctness
+from human_eval.execution import (
+    TimeoutException,
+    create_tempdir,
+    reliability_guard,
+    swallow_io,
+    time_limit,
+)
 
+from .testplan import TestPlan, get_test_plan
 
-def evaluate(problem: Dict[str, Any], solution: str, timeout: float = 1.0) -> Tuple[int, int]:
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .sandbox import SandboxPool
+
+
+@dataclass
+class SuiteResult:
+    """Per-assertion outcomes of a problem's test suite.
+
+    ``outcomes`` holds one entry per assertion using the same vocabulary as
+    ``human_eval.execution.check_correctness``: ``"passed"``, ``"timed out"``
+    or ``"failed: <reason>"``.  Assertions not run because a fail-fast
+    evaluation stopped early are recorded as ``"skipped"``.
+    """
+
+    outcomes: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> int:
+        return sum(1 for outcome in self.outcomes if outcome == "passed")
+
+    @property
+    def total(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def failed_at(self) -> int | None:
+        """Index of the first assertion that did not pass, if any."""
+        for index, outcome in enumerate(self.outcomes):
+            if outcome != "passed":
+                return index
+        return None
+
+
+def _run_suite(
+    conn: Any,
+    program: str,
+    test_programs: Sequence[Any] | bytes,
+    timeout: float,
+    fail_fast: bool = False,
+) -> None:
+    """Load ``program`` once and run each of ``test_programs`` against it.
+
+    Executed inside a sandbox process.  ``test_programs`` holds sources or
+    code objects, or a ``marshal`` blob of code objects when it had to cross a
+    process boundary.  One outcome per test program is sent over ``conn`` as
+    soon as it is known so the parent keeps partial results if this process
+    has to be killed.  With ``fail_fast`` nothing further is run or sent after
+    the first outcome that is not ``"passed"``.
+
+    Each test program runs in a shallow copy of the solution's globals, so
+    names it binds do not reach the next one.  The objects those names refer
+    to are shared: a module-level list, dict or cache that one assertion
+    mutates is seen mutated by the next.  Re-executing the solution for every
+    assertion would isolate them at the cost of repeating its module-level
+    work, which loading once is meant to avoid.
+    """
+    if isinstance(test_programs, bytes):
+        test_programs = marshal.loads(test_programs)
+    with create_tempdir():
+        # These system calls are needed when cleaning up tempdir.
+        import os
+        import shutil
+
+        rmtree = shutil.rmtree
+        rmdir = os.rmdir
+        chdir = os.chdir
+
+        reliability_guard()
+
+        exec_globals: Dict[str, Any] = {}
+        load_error = None
+        try:
+            with swallow_io():
+                with time_limit(timeout):
+                    exec(program, exec_globals)
+        except TimeoutException:
+            load_error = "timed out"
+        except BaseException as e:
+            load_error = f"failed: {e}"
+
+        for test_program in test_programs:
+            if load_error is not None:
+                outcome = load_error
+            else:
+                # A shallow copy keeps names defined by one assertion's
+                # program from leaking into the next one; mutable objects
+                # of the solution are still shared (see the docstring).
+                scope = dict(exec_globals)
+                try:
+                    with swallow_io():
+                        with time_limit(timeout):
+                            exec(test_program, scope)
+                    outcome = "passed"
+                except TimeoutException:
+                    outcome = "timed out"
+                except BaseException as e:
+                    outcome = f"failed: {e}"
+            conn.send(outcome)
+            if fail_fast and outcome != "passed":
+                break
+
+        shutil.rmtree = rmtree
+        os.rmdir = rmdir
+        os.chdir = chdir
+
+
+def _pad_outcomes(outcomes: List[str], total: int, fail_fast: bool) -> List[str]:
+    """Fill in outcomes for assertions a sandbox never reported on.
+
+    Unreported assertions count as ``"timed out"``, matching how
+    ``check_correctness`` treats a process that never reports back.  In
+    fail-fast mode only the first of them is charged as a timeout and the
+    rest are ``"skipped"``, as are those after a reported failure.
+    """
+    missing = total - len(outcomes)
+    if missing <= 0:
+        return outcomes
+    if not fail_fast:
+        return outcomes + ["timed out"] * missing
+    if not outcomes or outcomes[-1] == "passed":
+        return outcomes + ["timed out"] + ["skipped"] * (missing - 1)
+    return outcomes + ["skipped"] * missing
+
+
+def _collect_outcomes(
+    conn: Any, total: int, timeout: float, fail_fast: bool = False
+) -> List[str]:
+    """Receive up to ``total`` outcomes from a sandbox and pad the rest.
+
+    Each outcome is awaited for ``timeout`` plus a one second grace period; the
+    first also allows for loading the solution.  A sandbox that stops
+    reporting (hung in C code, crashed, swallowed the alarm) ends collection;
+    see :func:`_pad_outcomes` for how the remaining assertions are recorded.
+    """
+    outcomes: List[str] = []
+    while len(outcomes) < total:
+        if fail_fast and outcomes and outcomes[-1] != "passed":
+            break
+        wait = timeout + 1 if outcomes else 2 * timeout + 1
+        if not conn.poll(wait):
+            break
+        try:
+            outcomes.append(conn.recv())
+        except EOFError:
+            break
+    return _pad_outcomes(outcomes, total, fail_fast)
+
+
+def evaluate_suite(
+    problem: Mapping[str, Any],
+    solution: str,
+    timeout: float = 1.0,
+    pool: SandboxPool | None = None,
+    plan: TestPlan | None = None,
+    fail_fast: bool = False,
+) -> SuiteResult:
+    """Run every assertion of ``problem`` against ``solution`` in one sandbox.
+
+    The solution is loaded once in a single process guarded the same way as
+    ``human_eval.execution.check_correctness``.  Each assertion then runs with
+    its own ``timeout`` and exception handling, so one failing or hanging
+    assertion does not affect the outcome of the others.  Assertions share
+    the solution's module-level objects, so a solution that keeps state in
+    them can see it change between assertions (see :func:`_run_suite`).
+
+    By default a fresh process is started for the call.  When ``pool`` is
+    given the sandbox is forked from one of its pre-started workers instead.
+
+    ``plan`` is the problem's precompiled :class:`~budgetbench.testplan.TestPlan`;
+    when omitted it is looked up with :func:`~budgetbench.testplan.get_test_plan`.
+
+    With ``fail_fast`` evaluation stops at the first assertion that fails or
+    times out; :attr:`SuiteResult.failed_at` reports which one and the
+    remaining assertions are marked ``"skipped"``.
+    """
+    if plan is None:
+        plan = get_test_plan(problem)
+    if not plan.total:
+        return SuiteResult()
+
+    program = problem["prompt"] + solution + "\n"
+    if pool is not None:
+        outcomes = pool.run(program, plan.marshalled(), plan.total, timeout, fail_fast)
+        return SuiteResult(outcomes)
+
+    recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_run_suite,
+        args=(send_conn, program, plan.marshalled(), timeout, fail_fast),
+    )
+    process.start()
+    send_conn.close()
+    try:
+        outcomes = _collect_outcomes(recv_conn, plan.total, timeout, fail_fast)
+    finally:
+        recv_conn.close()
+        process.join(timeout=1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+    return SuiteResult(outcomes)
+
+
+def evaluate(
+    problem: Mapping[str, Any],
+    solution: str,
+    timeout: float = 1.0,
+    pool: SandboxPool | None = None,
+    plan: TestPlan | None = None,
+    fail_fast: bool = False,
+) -> Tuple[int, int]:
     """Return number of passed tests and total tests for a dataset problem.
 
-    The implementation delegates execution to ``human_eval.execution.check_correctness``
-    for each individual assertion in the problem's test suite.
+    All assertions of the problem's test suite are executed by
+    :func:`evaluate_suite` in a single sandbox process, optionally taken from
+    a :class:`~budgetbench.sandbox.SandboxPool`, using the problem's
+    precompiled ``plan`` when given.
     ``timeout`` controls how long each individual test is allowed to run.
+    With ``fail_fast`` assertions after the first failure are not run, so
+    ``passed`` only counts those before it.
     """
 
-    module_ast = ast.parse(problem["test"])
-    check_func = next(
-        node for node in module_ast.body if isinstance(node, ast.FunctionDef)
+    result = evaluate_suite(
+        problem, solution, timeout, pool=pool, plan=plan, fail_fast=fail_fast
     )
-    passed = 0
-    total = 0
-    for stmt in check_func.body:
-        if not isinstance(stmt, ast.Assert):
-            continue
-        total += 1
-        test_func = ast.FunctionDef(
-            name=check_func.name,
-            args=check_func.args,
-            body=[stmt],
-            decorator_list=[],
-            returns=None,
-            type_comment=None,
-        )
-        test_module = ast.Module(body=[test_func], type_ignores=[])
-        test_src = ast.unparse(ast.fix_missing_locations(test_module))
-        single_problem = {**problem, "test": test_src}
-        result = check_correctness(single_problem, solution, timeout)
-        if result.get("passed"):
-            passed += 1
-    return passed, total
+    return result.passed, result.total
@@ -0,0 +1,112 @@
+"""Latency histograms and the policy deciding when to hedge slow requests."""
+
+from __future__ import annotations
+
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Histogram buckets start at 10 ms and each covers a 2**(1/8) (~9%) range.
+_MIN_LATENCY = 0.01
+_BUCKETS_PER_DOUBLING = 8
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of request latencies in seconds.
+
+    Quantiles are reported as the upper edge of the bucket they fall in, so
+    they overestimate by at most one bucket width (about 9%).
+    """
+
+    def __init__(self) -> None:
+        self.counts: List[int] = []
+        self.count = 0
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        if seconds <= _MIN_LATENCY:
+            return 0
+        return math.ceil(math.log2(seconds / _MIN_LATENCY) * _BUCKETS_PER_DOUBLING)
+
+    @staticmethod
+    def _upper_edge(bucket: int) -> float:
+        return _MIN_LATENCY * 2 ** (bucket / _BUCKETS_PER_DOUBLING)
+
+    def record(self, seconds: float) -> None:
+        bucket = self._bucket(seconds)
+        if bucket >= len(self.counts):
+            self.counts.extend([0] * (bucket + 1 - len(self.counts)))
+        self.counts[bucket] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Return the ``q`` quantile, or ``None`` if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self._upper_edge(bucket)
+        return self._upper_edge(len(self.counts) - 1)
+
+
+@dataclass
+class HedgePolicy:
+    """Decide when a request has been outstanding long enough to duplicate.
+
+    Each model's completed requests are recorded in a
+    :class:`LatencyHistogram`.  Once a model has ``min_samples`` of them, a
+    request still outstanding after the model's ``quantile`` latency (but
+    never before ``min_delay`` seconds) may be hedged, provided hedges stay
+    within ``max_hedge_rate`` of the model's requests.  The policy may be
+    shared between threads.
+    """
+
+    quantile: float = 0.95
+    max_hedge_rate: float = 0.05
+    min_samples: int = 20
+    min_delay: float = 1.0
+    histograms: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    requests: Dict[str, int] = field(default_factory=dict)
+    hedges: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.quantile < 1.0:
+            raise ValueError("quantile must be between 0 and 1")
+        if not 0.0 <= self.max_hedge_rate <= 1.0:
+            raise ValueError("max_hedge_rate must be between 0 and 1")
+
+    def begin(self, model: str) -> float | None:
+        """Count a new request and return after how long to hedge it.
+
+        ``None`` means the model has too few samples to hedge yet.
+        """
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+            histogram = self.histograms.get(model)
+            if histogram is None or histogram.count < self.min_samples:
+                return None
+            return max(histogram.quantile(self.quantile), self.min_delay)
+
+    def try_hedge(self, model: str) -> bool:
+        """Claim a hedge for ``model`` unless that exceeds ``max_hedge_rate``."""
+        with self._lock:
+            hedges = self.hedges.get(model, 0)
+            if hedges + 1 > self.max_hedge_rate * self.requests.get(model, 0):
+                return False
+            self.hedges[model] = hedges + 1
+            return True
+
+    def record(self, model: str, seconds: float) -> None:
+        """Record the latency of a completed request to ``model``."""
+        with self._lock:
+            self.histograms.setdefault(model, LatencyHistogram()).record(seconds)
+
+    def hedge_rate(self, model: str) -> float:
+        with self._lock:
+            requests = self.requests.get(model, 0)
+            return self.hedges.get(model, 0) / requests if requests else 0.0
@@ -2,73 +2,175 @@
 
 from __future__ import annotations
 
+import asyncio
+import email.utils
+import math
 import os
+import random
+import re
+import threading
 import time
+import types
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
 from json import JSONDecodeError
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
 
 import httpx
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    BadRequestError,
+    InternalServerError,
+    OpenAI,
+    OpenAIError,
+    RateLimitError,
+)
 
-from .llm_cost import LLM_COSTS
+from .cache import CompletionCache
+from .hedge import HedgePolicy
+from .llm_cost import LLM_COSTS, PROMPT_OVERHEAD_TOKENS
+from .ratelimit import Permit, ProviderLimiter, get_limiter
 
 MODEL_NAME = os.getenv("MODEL_NAME", "openai/gpt-oss-20b")
 
+_DOTENV_LOADED = False
+
 
 def _ensure_env() -> None:
     """Load API credentials from ``.env`` when missing.
 
     ``OPENAI_API_KEY`` must be provided; ``OPENAI_BASE_URL`` is optional and
-    falls back to the OpenAI default endpoint when absent.
+    falls back to the OpenAI default endpoint when absent.  The ``.env`` file
+    is read at most once per process.
     """
-    if not os.getenv("OPENAI_API_KEY") or not os.getenv("OPENAI_BASE_URL"):
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED and (
+        not os.getenv("OPENAI_API_KEY") or not os.getenv("OPENAI_BASE_URL")
+    ):
         from dotenv import load_dotenv
 
         load_dotenv()
+        _DOTENV_LOADED = True
 
     if not os.getenv("OPENAI_API_KEY"):
         raise RuntimeError("Missing required environment variable: OPENAI_API_KEY")
 
 
-def chat_completion(
-    prompt: str,
-    model: str | None = None,
-    max_tokens: int = 10_240,
-) -> dict:
-    """Return the assistant message and token usage details.
+@dataclass(frozen=True)
+class HTTPSettings:
+    """Connection pool settings for the shared API clients.
 
-    The returned dictionary contains the assistant ``message`` along with ``usage``
-    statistics (prompt, cache, reasoning and completion tokens) and ``cost`` for
-    each token type when pricing information is available for ``model``.
+    ``http2`` requires the optional ``h2`` package (``httpx[http2]``).
     """
-    _ensure_env()
-    client_kwargs = {"api_key": os.environ["OPENAI_API_KEY"]}
-    base_url = os.getenv("OPENAI_BASE_URL")
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+HTTP_SETTINGS = HTTPSettings(http2=os.getenv("BUDGETBENCH_HTTP2", "") == "1")
+
+_CLIENTS: dict[tuple[str, str | None], OpenAI] = {}
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[str, str | None], AsyncOpenAI]
+] = weakref.WeakKeyDictionary()
+_CLIENTS_LOCK = threading.Lock()
+
+
+def configure_http(**settings) -> None:
+    """Update :data:`HTTP_SETTINGS` and drop clients built with the old ones.
+
+    Accepts the fields of :class:`HTTPSettings` as keyword arguments.
+    """
+    global HTTP_SETTINGS
+    HTTP_SETTINGS = replace(HTTP_SETTINGS, **settings)
+    close_clients()
+
+
+def _client_key(api_key: str | None, base_url: str | None) -> tuple[str, str | None]:
+    if api_key is None:
+        _ensure_env()
+        api_key = os.environ["OPENAI_API_KEY"]
+    if base_url is None:
+        base_url = os.getenv("OPENAI_BASE_URL") or None
+    return api_key, base_url
+
+
+def _client_kwargs(key: tuple[str, str | None]) -> dict:
+    """Return keyword arguments for constructing an OpenAI client for ``key``."""
+    api_key, base_url = key
+    # Retries are done by :func:`_send` so rate limiting sees every 429.
+    client_kwargs = {"api_key": api_key, "max_retries": 0}
     if base_url:
         client_kwargs["base_url"] = base_url
-    client = OpenAI(**client_kwargs)
-    target_model = model or MODEL_NAME
-    # ``openai`` occasionally returns malformed JSON or encounters transient
-    # network issues.  These manifest as ``JSONDecodeError`` or ``httpx``
-    # exceptions bubbling out of ``client.chat.completions.create``.  Instead of
-    # failing immediately, attempt a few simple retries with exponential
-    # backoff.  If all retries fail, surface a more helpful ``RuntimeError`` so
-    # callers don't see an opaque JSON decoding stack trace.
-    completion = None
-    for attempt in range(3):
-        try:
-            completion = client.chat.completions.create(
-                model=target_model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
+    return client_kwargs
+
+
+def get_client(api_key: str | None = None, base_url: str | None = None) -> OpenAI:
+    """Return the shared ``OpenAI`` client for ``(api_key, base_url)``.
+
+    Clients are created once per process and keep their HTTP connections
+    alive between calls, so repeated requests skip connection and TLS setup.
+    ``openai`` clients are thread-safe and may be used from any thread.
+    Missing arguments default to ``OPENAI_API_KEY`` and ``OPENAI_BASE_URL``.
+    """
+    key = _client_key(api_key, base_url)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=HTTP_SETTINGS.limits(), http2=HTTP_SETTINGS.http2
             )
-            break
-        except (JSONDecodeError, httpx.HTTPError) as exc:  # pragma: no cover - network
-            if attempt == 2:
-                raise RuntimeError("Failed to retrieve completion") from exc
-            time.sleep(2**attempt)
-    assert completion is not None  # for type checkers
-
-    usage_obj = getattr(completion, "usage", None)
+            client = OpenAI(**_client_kwargs(key), http_client=http_client)
+            _CLIENTS[key] = client
+    return client
+
+
+def get_async_client(
+    api_key: str | None = None, base_url: str | None = None
+) -> AsyncOpenAI:
+    """Return the shared ``AsyncOpenAI`` client for the running event loop.
+
+    Async connections belong to the loop that opened them, so clients are
+    kept per event loop and discarded together with it.
+    """
+    key = _client_key(api_key, base_url)
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(
+                limits=HTTP_SETTINGS.limits(), http2=HTTP_SETTINGS.http2
+            )
+            client = AsyncOpenAI(**_client_kwargs(key), http_client=http_client)
+            clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close the shared synchronous clients and forget all shared clients."""
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+        _ASYNC_CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+def _usage(usage_obj) -> dict:
+    """Return the token counts of an API ``usage`` object."""
     prompt_tokens = getattr(usage_obj, "prompt_tokens", 0) if usage_obj else 0
     completion_tokens = getattr(usage_obj, "completion_tokens", 0) if usage_obj else 0
     reasoning_tokens = getattr(usage_obj, "reasoning_tokens", 0) if usage_obj else 0
@@ -80,24 +182,725 @@ def chat_completion(
         if prompt_details:
             cache_tokens += getattr(prompt_details, "cached_tokens", 0)
 
-    usage = {
+    return {
         "prompt_tokens": prompt_tokens,
         "cache_tokens": cache_tokens,
         "reasoning_tokens": reasoning_tokens,
         "completion_tokens": completion_tokens,
     }
 
+
+def _costs(usage: dict, target_model: str) -> dict:
+    """Return the cost of ``usage`` per token type for ``target_model``."""
     costs = {"prompt": 0.0, "cache": 0.0, "reasoning": 0.0, "completion": 0.0, "total": 0.0}
     cost_info = LLM_COSTS.get(target_model)
     if cost_info:
-        costs["prompt"] = prompt_tokens * cost_info.prompt
-        costs["cache"] = cache_tokens * cost_info.cache
-        costs["reasoning"] = reasoning_tokens * cost_info.reasoning
-        costs["completion"] = completion_tokens * cost_info.completion
+        costs["prompt"] = usage["prompt_tokens"] * cost_info.prompt
+        costs["cache"] = usage["cache_tokens"] * cost_info.cache
+        costs["reasoning"] = usage["reasoning_tokens"] * cost_info.reasoning
+        costs["completion"] = usage["completion_tokens"] * cost_info.completion
         costs["total"] = sum(costs.values())
+    return costs
+
 
+def _build_result(completion, target_model: str) -> dict:
+    """Convert an API ``completion`` into BudgetBench's result dictionary."""
+    usage = _usage(getattr(completion, "usage", None))
     return {
         "message": completion.choices[0].message.content,
         "usage": usage,
-        "cost": costs,
+        "cost": _costs(usage, target_model),
+        "finish_reason": getattr(completion.choices[0], "finish_reason", None),
+    }
+
+
+class _StreamCollector:
+    """Accumulates a streamed completion and decides when to cancel it."""
+
+    def __init__(
+        self, prompt: str, max_tokens: int, stop_when: Callable[[str], bool] | None
+    ) -> None:
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.stop_when = stop_when
+        self.parts: list[str] = []
+        self.reasoning_bytes = 0
+        self.generation_id: str | None = None
+        self.usage = None
+        self.usage_reported = False
+        self.stopped_early = False
+        self.started = time.perf_counter()
+        self.ttft: float | None = None
+        self.finish_reason: str | None = None
+
+    def feed(self, chunk) -> bool:
+        """Record ``chunk``; return ``True`` once the stream should be cancelled."""
+        if self.generation_id is None:
+            self.generation_id = getattr(chunk, "id", None)
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+            self.usage_reported = True
+        if not chunk.choices:
+            return False
+        choice = chunk.choices[0]
+        if getattr(choice, "finish_reason", None):
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta
+        # OpenRouter streams reasoning as ``reasoning``, vLLM and others as
+        # ``reasoning_content``; either is billed as output.
+        reasoning = getattr(delta, "reasoning", None) or getattr(
+            delta, "reasoning_content", None
+        )
+        text = delta.content
+        if (text or reasoning) and self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+        if reasoning:
+            self.reasoning_bytes += len(reasoning.encode())
+        if not text:
+            return False
+        self.parts.append(text)
+        # Fences are only ever completed by a chunk containing a backtick.
+        if self.stop_when is not None and "`" in text:
+            self.stopped_early = self.stop_when("".join(self.parts))
+        return self.stopped_early
+
+    def estimate_usage(self) -> types.SimpleNamespace:
+        """Return an upper bound on the usage of a stream cancelled before it reported one.
+
+        As in :func:`~budgetbench.llm_cost.estimate_max_cost`, every UTF-8
+        byte of the prompt, the text and the reasoning received counts as a
+        token, and reasoning is also charged at the reasoning rate.  Output
+        is capped at ``max_tokens``, which the provider never bills beyond.
+        """
+        text_bytes = len("".join(self.parts).encode())
+        return types.SimpleNamespace(
+            prompt_tokens=len(self.prompt.encode()) + PROMPT_OVERHEAD_TOKENS,
+            completion_tokens=min(text_bytes + self.reasoning_bytes, self.max_tokens),
+            reasoning_tokens=min(self.reasoning_bytes, self.max_tokens),
+        )
+
+    def result(self, target_model: str) -> dict:
+        usage = self.usage if self.usage is not None else self.estimate_usage()
+        message = types.SimpleNamespace(content="".join(self.parts))
+        choice = types.SimpleNamespace(message=message, finish_reason=self.finish_reason)
+        completion = types.SimpleNamespace(choices=[choice], usage=usage)
+        result = _build_result(completion, target_model)
+        result["ttft"] = self.ttft
+        result["latency"] = time.perf_counter() - self.started
+        result["stopped_early"] = self.stopped_early
+        result["usage_estimated"] = self.usage is None
+        return result
+
+
+# Hosts that report the usage of a generation by its id, so the real usage
+# of a cancelled stream can be read back after the stream is closed.
+GENERATION_STATS_HOSTS = frozenset({"openrouter.ai"})
+
+
+def _generation_request(client, collector: _StreamCollector) -> dict | None:
+    """Return the arguments of ``client.get`` for the stats of ``collector``'s generation.
+
+    ``None`` when the stream already reported its usage, carried no id, or
+    ``client`` talks to a host not in :data:`GENERATION_STATS_HOSTS`.
+    """
+    if collector.usage_reported or not collector.generation_id:
+        return None
+    host = urlparse(str(getattr(client, "base_url", ""))).hostname
+    if host not in GENERATION_STATS_HOSTS:
+        return None
+    return {
+        "path": "/generation",
+        "cast_to": httpx.Response,
+        "options": {"params": {"id": collector.generation_id}},
     }
+
+
+def _generation_usage(response: httpx.Response) -> types.SimpleNamespace:
+    """Convert OpenRouter generation stats into an API ``usage`` object.
+
+    Its native completion count already includes reasoning tokens, as the
+    ``usage`` of a chat completion does.
+    """
+    response.raise_for_status()
+    data = response.json()["data"]
+    return types.SimpleNamespace(
+        prompt_tokens=int(data["native_tokens_prompt"]),
+        completion_tokens=int(data["native_tokens_completion"]),
+        prompt_tokens_details=types.SimpleNamespace(
+            cached_tokens=int(data.get("native_tokens_cached") or 0)
+        ),
+    )
+
+
+# Failures of a generation stats lookup, after which usage is estimated.
+_STATS_ERRORS = (OpenAIError, httpx.HTTPError, ValueError, KeyError, TypeError)
+
+
+def _read_generation_usage(client, collector: _StreamCollector) -> None:
+    """Replace a cancelled stream's missing usage with the provider's stats."""
+    request = _generation_request(client, collector)
+    if request is None:
+        return
+    try:
+        collector.usage = _generation_usage(client.get(**request))
+    except _STATS_ERRORS:
+        pass
+
+
+async def _aread_generation_usage(client, collector: _StreamCollector) -> None:
+    """Asynchronous counterpart of :func:`_read_generation_usage`."""
+    request = _generation_request(client, collector)
+    if request is None:
+        return
+    try:
+        collector.usage = _generation_usage(await client.get(**request))
+    except _STATS_ERRORS:
+        pass
+
+
+def _stream_kwargs(target_model: str, prompt: str, max_tokens: int) -> dict:
+    return dict(
+        model=target_model,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+
+# ``openai`` occasionally returns malformed JSON or encounters transient
+# network issues, rate limits and server errors.  These are retried a few
+# times; if all attempts fail a ``RuntimeError`` is raised so callers don't see
+# an opaque JSON decoding stack trace.
+RETRY_ATTEMPTS = 5
+_RETRYABLE = (
+    JSONDecodeError,
+    httpx.HTTPError,
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """Return the seconds a 429 response asked the client to wait, if any."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(when.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_tokens(prompt: str, max_tokens: int) -> int:
+    """Upper bound on the tokens a request may count against a provider limit."""
+    return len(prompt.encode()) + PROMPT_OVERHEAD_TOKENS + max_tokens
+
+
+def _tokens_used(result: dict) -> int:
+    usage = result.get("usage", {})
+    return sum(
+        usage.get(field, 0)
+        for field in ("prompt_tokens", "completion_tokens", "reasoning_tokens")
+    )
+
+
+def _on_failure(
+    exc: BaseException,
+    attempt: int,
+    limiter: ProviderLimiter | None,
+    permit: Permit | None,
+) -> float:
+    """Return the permit of a failed attempt and the seconds to wait before the next.
+
+    Raises ``RuntimeError`` once the attempts are exhausted.  A 429 honours
+    ``Retry-After``; with a limiter the pause is applied there, to every
+    request for the provider.
+    """
+    throttled = isinstance(exc, RateLimitError)
+    retry_after = _retry_after(exc) if throttled else None
+    if limiter is not None and permit is not None:
+        if throttled:
+            limiter.throttle(permit, retry_after)
+        else:
+            limiter.abandon(permit)
+    if attempt == RETRY_ATTEMPTS - 1:
+        raise RuntimeError("Failed to retrieve completion") from exc
+    if throttled and limiter is not None:
+        return 0.0
+    if retry_after is not None:
+        return retry_after
+    return 2**attempt * (0.5 + random.random())
+
+
+def _send(
+    send: Callable[[], dict], limiter: ProviderLimiter | None, tokens: int
+) -> dict:
+    """Call ``send`` under ``limiter``, retrying transient failures."""
+    attempt = 0
+    while True:
+        permit = limiter.acquire(tokens) if limiter is not None else None
+        try:
+            result = send()
+        except _RETRYABLE as exc:
+            time.sleep(_on_failure(exc, attempt, limiter, permit))
+            attempt += 1
+            continue
+        except BaseException:
+            if limiter is not None and permit is not None:
+                limiter.abandon(permit)
+            raise
+        if limiter is not None and permit is not None:
+            limiter.release(permit, _tokens_used(result))
+        return result
+
+
+async def _asend(
+    send: Callable[[], Awaitable[dict]], limiter: ProviderLimiter | None, tokens: int
+) -> dict:
+    """Asynchronous counterpart of :func:`_send`."""
+    attempt = 0
+    while True:
+        permit = await limiter.acquire_async(tokens) if limiter is not None else None
+        try:
+            result = await send()
+        except _RETRYABLE as exc:
+            await asyncio.sleep(_on_failure(exc, attempt, limiter, permit))
+            attempt += 1
+            continue
+        except BaseException:
+            if limiter is not None and permit is not None:
+                limiter.abandon(permit)
+            raise
+        if limiter is not None and permit is not None:
+            limiter.release(permit, _tokens_used(result))
+        return result
+
+
+def _limiter(target_model: str) -> ProviderLimiter | None:
+    return get_limiter(target_model, os.getenv("OPENAI_BASE_URL") or None)
+
+
+HEDGE_POLICY: HedgePolicy | None = None
+
+
+def configure_hedging(policy: HedgePolicy | None) -> None:
+    """Hedge slow requests in this process under ``policy`` (``None``: never)."""
+    global HEDGE_POLICY
+    HEDGE_POLICY = policy
+
+
+def calls_per_request() -> int:
+    """Return how many calls one request may be charged for.
+
+    A hedged request pays for both of its calls, so runners reserving a
+    request's worst-case cost against a budget must multiply it by this.
+    """
+    return 1 if HEDGE_POLICY is None else 2
+
+
+def _charge_hedge(winner: dict, loser: dict | None, won_by: str) -> dict:
+    """Return ``winner`` charged for the losing call of a hedged pair too.
+
+    A loser that has not finished is cancelled or abandoned, but the provider
+    may still bill it; it is charged the winner's cost as an estimate of what
+    the same request costs.  ``usage`` stays that of the returned response.
+    """
+    extra = (loser or winner).get("cost", {})
+    result = dict(winner)
+    result["cost"] = {
+        key: value + extra.get(key, 0.0) for key, value in winner.get("cost", {}).items()
+    }
+    result["hedge"] = {
+        "winner": won_by,
+        "loser_cost": extra.get("total", 0.0),
+        "loser_estimated": loser is None,
+    }
+    return result
+
+
+def _spawn(func: Callable[[], tuple]) -> Future:
+    """Run ``func`` on a daemon thread so an abandoned call never blocks exit."""
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _timed(call: Callable[[], dict]) -> tuple[dict, float]:
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+
+async def _atimed(call: Callable[[], Awaitable[dict]]) -> tuple[dict, float]:
+    start = time.perf_counter()
+    result = await call()
+    return result, time.perf_counter() - start
+
+
+def _hedge_outcome(
+    primary, backup, first, model: str, policy: HedgePolicy
+) -> dict:
+    """Return the charged result of a hedged pair whose ``first`` succeeded."""
+    loser = backup if first is primary else primary
+    result, latency = first.result()
+    policy.record(model, latency)
+    loser_result = None
+    if loser.done() and not loser.cancelled() and loser.exception() is None:
+        loser_result, loser_latency = loser.result()
+        policy.record(model, loser_latency)
+    won_by = "primary" if first is primary else "hedge"
+    return _charge_hedge(result, loser_result, won_by)
+
+
+def _hedged(call: Callable[[], dict], model: str, policy: HedgePolicy) -> dict:
+    """Run ``call``, duplicating it if it is slower than ``policy`` allows.
+
+    The first successful response wins; if both calls fail, the primary's
+    error is raised.
+    """
+    delay = policy.begin(model)
+    if delay is None:
+        result, latency = _timed(call)
+        policy.record(model, latency)
+        return result
+    primary = _spawn(lambda: _timed(call))
+    done, _ = wait([primary], timeout=delay)
+    if done or not policy.try_hedge(model):
+        result, latency = primary.result()
+        policy.record(model, latency)
+        return result
+    backup = _spawn(lambda: _timed(call))
+    pending = {primary, backup}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in (primary, backup):
+            if future in done and future.exception() is None:
+                return _hedge_outcome(primary, backup, future, model, policy)
+    raise primary.exception()
+
+
+async def _ahedged(
+    call: Callable[[], Awaitable[dict]], model: str, policy: HedgePolicy
+) -> dict:
+    """Asynchronous counterpart of :func:`_hedged`; the loser is cancelled."""
+    delay = policy.begin(model)
+    if delay is None:
+        result, latency = await _atimed(call)
+        policy.record(model, latency)
+        return result
+    primary = asyncio.ensure_future(_atimed(call))
+    calls = [primary]
+    try:
+        done, _ = await asyncio.wait(calls, timeout=delay)
+        if done or not policy.try_hedge(model):
+            result, latency = await primary
+            policy.record(model, latency)
+            return result
+        backup = asyncio.ensure_future(_atimed(call))
+        calls.append(backup)
+        pending = set(calls)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in calls:
+                if future in done and future.exception() is None:
+                    return _hedge_outcome(primary, backup, future, model, policy)
+        raise primary.exception()
+    finally:
+        for future in calls:
+            if not future.done():
+                future.cancel()
+
+
+def chat_completion(
+    prompt: str,
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    cache: CompletionCache | None = None,
+    sample: int = 0,
+    stream: bool = False,
+    stop_when: Callable[[str], bool] | None = None,
+) -> dict:
+    """Return the assistant message and token usage details.
+
+    The returned dictionary contains the assistant ``message`` along with ``usage``
+    statistics (prompt, cache, reasoning and completion tokens) and ``cost`` for
+    each token type when pricing information is available for ``model``, plus
+    the provider's ``finish_reason`` (``"length"`` when ``max_tokens`` cut the
+    response off).
+    Requests go through the process-wide client from :func:`get_client` and,
+    when rate limits are configured for the model's provider (see
+    :func:`~budgetbench.ratelimit.configure_rate_limits`), its shared
+    :class:`~budgetbench.ratelimit.ProviderLimiter`.  Transient failures are
+    retried up to :data:`RETRY_ATTEMPTS` times in total, honouring a 429's
+    ``Retry-After``.  With hedging configured (:func:`configure_hedging`) a
+    slow request is duplicated, the first response wins and the result's
+    ``cost`` covers both calls, as described in its ``hedge`` entry.
+
+    When ``cache`` is given, the response for ``(model, prompt, max_tokens,
+    sample)`` is served from or recorded in it according to its mode and the
+    result gains a ``cached`` flag.  ``sample`` tells repeated requests for the
+    same prompt apart.
+
+    With ``stream`` the response is received incrementally and the result
+    also reports the time to the first token (``ttft``) and overall
+    ``latency`` in seconds.  ``stop_when`` is then called with the text so far
+    whenever a chunk may have closed a code fence; once it returns ``True``
+    the request is cancelled and ``stopped_early`` is set.  Cancelled streams
+    end before the provider reports usage.  Where the host reports it per
+    generation (:data:`GENERATION_STATS_HOSTS`) it is read back afterwards;
+    otherwise the cost is an upper bound from the bytes of the prompt and of
+    the text and reasoning received, and ``usage_estimated`` is set.
+    """
+    target_model = model or MODEL_NAME
+    if cache is not None:
+        cached = cache.lookup(target_model, prompt, max_tokens, sample)
+        if cached is not None:
+            return cached
+    client = get_client()
+    if stream:
+
+        def send() -> dict:
+            collector = _StreamCollector(prompt, max_tokens, stop_when)
+            response = client.chat.completions.create(
+                **_stream_kwargs(target_model, prompt, max_tokens)
+            )
+            try:
+                for chunk in response:
+                    if collector.feed(chunk):
+                        break
+            finally:
+                response.close()
+            _read_generation_usage(client, collector)
+            return collector.result(target_model)
+
+    else:
+
+        def send() -> dict:
+            completion = client.chat.completions.create(
+                model=target_model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+            )
+            return _build_result(completion, target_model)
+
+    limiter = _limiter(target_model)
+    tokens = _request_tokens(prompt, max_tokens)
+    policy = HEDGE_POLICY
+    if policy is None:
+        result = _send(send, limiter, tokens)
+    else:
+        result = _hedged(lambda: _send(send, limiter, tokens), target_model, policy)
+    if cache is not None:
+        result = cache.record(target_model, prompt, max_tokens, sample, result)
+    return result
+
+
+async def achat_completion(
+    prompt: str,
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    cache: CompletionCache | None = None,
+    sample: int = 0,
+    stream: bool = False,
+    stop_when: Callable[[str], bool] | None = None,
+) -> dict:
+    """Asynchronous counterpart of :func:`chat_completion`.
+
+    Uses ``AsyncOpenAI`` so many requests can be in flight from one event
+    loop; retries, caching, streaming and the returned dictionary match
+    :func:`chat_completion`.
+    """
+    target_model = model or MODEL_NAME
+    if cache is not None:
+        cached = cache.lookup(target_model, prompt, max_tokens, sample)
+        if cached is not None:
+            return cached
+    client = get_async_client()
+    if stream:
+
+        async def send() -> dict:
+            collector = _StreamCollector(prompt, max_tokens, stop_when)
+            response = await client.chat.completions.create(
+                **_stream_kwargs(target_model, prompt, max_tokens)
+            )
+            try:
+                async for chunk in response:
+                    if collector.feed(chunk):
+                        break
+            finally:
+                await response.close()
+            await _aread_generation_usage(client, collector)
+            return collector.result(target_model)
+
+    else:
+
+        async def send() -> dict:
+            completion = await client.chat.completions.create(
+                model=target_model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+            )
+            return _build_result(completion, target_model)
+
+    limiter = _limiter(target_model)
+    tokens = _request_tokens(prompt, max_tokens)
+    policy = HEDGE_POLICY
+    if policy is None:
+        result = await _asend(send, limiter, tokens)
+    else:
+        result = await _ahedged(lambda: _asend(send, limiter, tokens), target_model, policy)
+    if cache is not None:
+        result = cache.record(target_model, prompt, max_tokens, sample, result)
+    return result
+
+
+# Endpoints and models known to ignore or reject the ``n`` parameter.
+_N_UNSUPPORTED: set[tuple[str | None, str]] = set()
+
+
+def _rejects_n(exc: BadRequestError) -> bool:
+    """Return whether a 400 response objects to the ``n`` parameter itself."""
+    if getattr(exc, "param", None) == "n":
+        return True
+    return re.search(r"(?<![\w.-])['\"`]?n['\"`]?(?![\w.-])", str(exc)) is not None
+
+
+def _split_tokens(total: int, weights: list[int]) -> list[int]:
+    """Split ``total`` in proportion to ``weights`` into integers summing to it."""
+    if sum(weights) <= 0:
+        weights = [1] * len(weights)
+    shares = [total * w / sum(weights) for w in weights]
+    parts = [math.floor(share) for share in shares]
+    by_remainder = sorted(range(len(parts)), key=lambda i: parts[i] - shares[i])
+    for i in by_remainder[: total - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def _split_result(completion, target_model: str) -> list[dict]:
+    """Split a completion with several choices into one result per choice.
+
+    The prompt was sent (and billed) once, so prompt and cache tokens are
+    shared evenly; providers only report completion and reasoning tokens in
+    total, so those are shared in proportion to each choice's length.  The
+    per-choice costs add up to the cost of the request, and every result
+    records how many samples shared it (``shared_by``).
+    """
+    usage = _usage(getattr(completion, "usage", None))
+    choices = completion.choices
+    even = [1] * len(choices)
+    lengths = [len(choice.message.content or "") for choice in choices]
+    split = {
+        "prompt_tokens": _split_tokens(usage["prompt_tokens"], even),
+        "cache_tokens": _split_tokens(usage["cache_tokens"], even),
+        "reasoning_tokens": _split_tokens(usage["reasoning_tokens"], lengths),
+        "completion_tokens": _split_tokens(usage["completion_tokens"], lengths),
+    }
+    results = []
+    for i, choice in enumerate(choices):
+        sample_usage = {field: parts[i] for field, parts in split.items()}
+        results.append(
+            {
+                "message": choice.message.content,
+                "usage": sample_usage,
+                "cost": _costs(sample_usage, target_model),
+                "finish_reason": getattr(choice, "finish_reason", None),
+                "shared_by": len(choices),
+            }
+        )
+    return results
+
+
+def chat_samples(
+    prompt: str,
+    n: int,
+    model: str | None = None,
+    max_tokens: int = 10_240,
+    cache: CompletionCache | None = None,
+    sample: int = 0,
+) -> list[dict]:
+    """Return ``n`` independent completions of ``prompt``.
+
+    The samples are requested in one call with the ``n`` parameter, so the
+    prompt is paid for once and its cost is split across them (see
+    :func:`_split_result`).  Endpoints that reject ``n`` or return fewer
+    choices are remembered for the rest of the process, and the missing
+    samples are requested with parallel :func:`chat_completion` calls
+    instead; other request errors are raised.  Each result has the keys
+    documented in :func:`chat_completion` plus ``shared_by``, the number of
+    samples that shared its request.
+
+    With a ``cache`` the ``i``-th sample is looked up and recorded as sample
+    ``sample + i``, so only samples missing from the cache are requested.
+    """
+    target_model = model or MODEL_NAME
+    results: list[dict | None] = [None] * n
+    if cache is not None:
+        for i in range(n):
+            results[i] = cache.lookup(target_model, prompt, max_tokens, sample + i)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+    fresh: list[dict] = []
+    endpoint = (os.getenv("OPENAI_BASE_URL") or None, target_model)
+    if len(missing) > 1 and endpoint not in _N_UNSUPPORTED:
+        client = get_client()
+
+        def send() -> dict:
+            completion = client.chat.completions.create(
+                model=target_model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                n=len(missing),
+            )
+            return {
+                "usage": _usage(getattr(completion, "usage", None)),
+                "samples": _split_result(completion, target_model),
+            }
+
+        tokens = _request_tokens(prompt, len(missing) * max_tokens)
+        try:
+            fresh = _send(send, _limiter(target_model), tokens)["samples"][: len(missing)]
+        except BadRequestError as exc:
+            # Other 400s, e.g. an overlong prompt, would fail fanned out too.
+            if not _rejects_n(exc):
+                raise
+            fresh = []
+        if len(fresh) < len(missing):
+            _N_UNSUPPORTED.add(endpoint)
+    remaining = len(missing) - len(fresh)
+    if remaining:
+        with ThreadPoolExecutor(max_workers=remaining) as executor:
+            fresh += executor.map(
+                lambda _: {
+                    **chat_completion(prompt, model=target_model, max_tokens=max_tokens),
+                    "shared_by": 1,
+                },
+                range(remaining),
+            )
+    for i, result in zip(missing, fresh):
+        if cache is not None:
+            result = cache.record(target_model, prompt, max_tokens, sample + i, result)
+        results[i] = result
+    return results
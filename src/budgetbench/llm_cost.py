@@ -14,6 +14,29 @@ class LLMCost:
     reasoning: float = 0.0
 
 
+# Tokens a chat template may add around a single user message.
+PROMPT_OVERHEAD_TOKENS = 32
+
+
+def estimate_max_cost(prompt: str, model: str, max_tokens: int) -> float:
+    """Return an upper bound on the cost of one completion request.
+
+    The prompt is charged as if every UTF-8 byte were its own token (no
+    tokenizer emits fewer than one byte per token) plus a small template
+    overhead.  The completion is charged at ``max_tokens`` for both the
+    completion and reasoning rates, since providers may bill reasoning tokens
+    on top of the completion count.  Models without pricing information cost
+    nothing, as in :func:`budgetbench.llm.chat_completion`.
+    """
+    cost_info = LLM_COSTS.get(model)
+    if cost_info is None:
+        return 0.0
+    prompt_tokens = len(prompt.encode()) + PROMPT_OVERHEAD_TOKENS
+    return prompt_tokens * cost_info.prompt + max_tokens * (
+        cost_info.completion + cost_info.reasoning
+    )
+
+
 LLM_COSTS: dict[str, LLMCost] = {
     "openai/gpt-oss-120b": LLMCost(
         name="openai/gpt-oss-120b", prompt=0.000000072, completion=0.00000028
@@ -0,0 +1,297 @@
+"""Unbiased pass@k estimates over attempt logs, computed with NumPy."""
+
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from .attempt_log import ATTEMPTS_FILE, read_attempt_log
+from .scan import map_runs
+
+# Tolerance for budgets that are an exact multiple of a task's sample cost.
+_AFFORD_EPS = 1e-9
+
+
+class PassAtK(TypedDict):
+    """One model's pass@k over its tasks, and its expected pass rate per budget."""
+
+    model: str
+    ks: np.ndarray
+    pass_at_k: np.ndarray
+    tasks: np.ndarray
+    budgets: np.ndarray
+    expected: np.ndarray
+
+
+def log_factorials(n: int) -> np.ndarray:
+    """Return the table of ``log(i!)`` for ``i`` in ``0..n``."""
+    table = np.zeros(n + 1, dtype=np.float64)
+    np.cumsum(np.log(np.arange(1, n + 1, dtype=np.float64)), out=table[1:])
+    return table
+
+
+def _estimate(n: np.ndarray, c: np.ndarray, k: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """Return ``1 - C(n - c, k) / C(n, k)`` for broadcastable ``n``, ``c`` and ``1 <= k <= n``.
+
+    The ratio is ``(n - c)! (n - k)! / ((n - c - k)! n!)``, taken in log
+    space from ``table`` so that binomials of millions of samples do not
+    overflow; ``expm1`` keeps tiny estimates accurate.  Tasks without a
+    correct sample get exactly 0, where rounding in the table would leave
+    noise, and estimates are clipped to ``[0, 1]``.
+    """
+    failed = n - c
+    some_pass = failed < k
+    log_ratio = (
+        table[failed]
+        + table[np.maximum(n - k, 0)]
+        - table[np.maximum(failed - k, 0)]
+        - table[n]
+    )
+    estimate = np.clip(-np.expm1(np.where(some_pass, 0.0, log_ratio)), 0.0, 1.0)
+    return np.where(some_pass, 1.0, np.where(c == 0, 0.0, estimate))
+
+
+def pass_at_k(n: Sequence[int], c: Sequence[int], ks: Sequence[int]) -> np.ndarray:
+    """Return the unbiased pass@k estimate of every task for every ``k``.
+
+    Task ``i`` drew ``n[i]`` samples of which ``c[i]`` were correct; the
+    result has one row per task and one column per ``k``, with NaN where a
+    task has fewer than ``k`` samples.
+    """
+    n = np.asarray(n, dtype=np.int64)[:, None]
+    c = np.asarray(c, dtype=np.int64)[:, None]
+    ks = np.asarray(ks, dtype=np.int64)[None, :]
+    if (ks < 1).any():
+        raise ValueError("k must be at least 1")
+    table = log_factorials(int(n.max(initial=0)))
+    enough = ks <= n
+    estimate = _estimate(n, c, np.minimum(ks, n), table)
+    return np.where(enough, estimate, np.nan)
+
+
+def pass_at_budget(
+    n: Sequence[int], c: Sequence[int], cost: Sequence[float], budgets: Iterable[float]
+) -> np.ndarray:
+    """Return every task's expected pass rate when it may spend each of ``budgets``.
+
+    ``cost[i]`` is the total cost of task ``i``'s samples, so a budget buys
+    ``floor(budget / (cost[i] / n[i]))`` samples and the pass@k estimate for
+    that many is returned.  Only ``n[i]`` samples were observed, so larger
+    budgets are capped at pass@n; free tasks always get it.
+    """
+    n = np.asarray(n, dtype=np.int64)[:, None]
+    c = np.asarray(c, dtype=np.int64)[:, None]
+    mean_cost = np.asarray(cost, dtype=np.float64)[:, None] / np.maximum(n, 1)
+    budgets = np.asarray(budgets, dtype=np.float64)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        affordable = np.floor(budgets / mean_cost + _AFFORD_EPS)
+    affordable = np.where(mean_cost > 0, affordable, np.inf)
+    k = np.minimum(affordable, n).astype(np.int64)
+    table = log_factorials(int(n.max(initial=0)))
+    estimate = _estimate(n, c, np.maximum(k, 1), table)
+    return np.where(k >= 1, estimate, 0.0)
+
+
+def _sorted_codes(names: Sequence[Any], codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort ``names`` and renumber ``codes`` to match."""
+    names = np.asarray(names).astype(str)
+    order = np.argsort(names, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return names[order], rank[codes]
+
+
+def _factorize(values: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the sorted distinct ``values`` and each value's index into them.
+
+    Hashing is linear in the number of values, where ``np.unique`` would
+    sort millions of strings.
+    """
+    index: Dict[Any, int] = {}
+    codes = np.fromiter(
+        (index.setdefault(value, len(index)) for value in values), np.int64, len(values)
+    )
+    return _sorted_codes(list(index), codes)
+
+
+def _column_codes(column: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Like :func:`_factorize` for a pyarrow column, reusing its dictionary encoding."""
+    import pyarrow as pa
+
+    if not pa.types.is_dictionary(column.type) or not column.num_chunks:
+        return _factorize(column.to_numpy(zero_copy_only=False))
+    column = column.unify_dictionaries()
+    codes = np.concatenate(
+        [chunk.indices.to_numpy(zero_copy_only=False) for chunk in column.chunks]
+    ).astype(np.int64)
+    return _sorted_codes(column.chunk(0).dictionary.to_pylist(), codes)
+
+
+def _group(
+    model_names: np.ndarray,
+    model_codes: np.ndarray,
+    task_codes: np.ndarray,
+    correct: Any,
+    costs: Any,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    keys = model_codes * (int(task_codes.max(initial=0)) + 1) + task_codes
+    groups, first, group_codes = np.unique(keys, return_index=True, return_inverse=True)
+    group_codes = group_codes.reshape(-1)
+    n = np.bincount(group_codes, minlength=len(groups))
+    c = np.bincount(
+        group_codes, weights=np.asarray(correct, dtype=bool), minlength=len(groups)
+    ).astype(np.int64)
+    cost = np.bincount(
+        group_codes, weights=np.asarray(costs, dtype=np.float64), minlength=len(groups)
+    )
+    return model_names, model_codes[first], n, c, cost
+
+
+def group_samples(
+    models: Sequence[Any],
+    task_ids: Sequence[Any],
+    correct: Sequence[bool],
+    costs: Sequence[float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Group attempts by ``(model, task)``.
+
+    Returns the sorted model names, then per group the index of its model,
+    its number of samples ``n``, correct samples ``c`` and total ``cost``;
+    the result can be passed on to :func:`summarise_pass_at_k`.
+    """
+    model_names, model_codes = _factorize(models)
+    _, task_codes = _factorize(task_ids)
+    return _group(model_names, model_codes, task_codes, correct, costs)
+
+
+def summarise_pass_at_k(
+    model_names: Sequence[str],
+    group_models: np.ndarray,
+    n: np.ndarray,
+    c: np.ndarray,
+    cost: np.ndarray,
+    ks: Sequence[int],
+    budgets: Iterable[float] = (),
+) -> List[PassAtK]:
+    """Average per-task estimates into one :class:`PassAtK` per model.
+
+    ``pass_at_k`` averages over the ``tasks`` with at least ``k`` samples
+    (NaN if there are none); ``expected`` averages :func:`pass_at_budget`,
+    a per-task budget, over all of the model's tasks.
+    """
+    ks = np.asarray(ks, dtype=np.int64)
+    budgets = np.asarray(list(budgets), dtype=np.float64)
+    per_task = pass_at_k(n, c, ks)
+    per_budget = pass_at_budget(n, c, cost, budgets)
+    tasks = np.zeros((len(model_names), len(ks)), dtype=np.int64)
+    np.add.at(tasks, group_models, ~np.isnan(per_task))
+    sums = np.zeros((len(model_names), len(ks)))
+    np.add.at(sums, group_models, np.nan_to_num(per_task))
+    expected = np.zeros((len(model_names), len(budgets)))
+    np.add.at(expected, group_models, per_budget)
+    counts = np.bincount(group_models, minlength=len(model_names))[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(tasks > 0, sums / tasks, np.nan)
+        expected = expected / counts
+    return [
+        {
+            "model": str(model),
+            "ks": ks,
+            "pass_at_k": means[m],
+            "tasks": tasks[m],
+            "budgets": budgets,
+            "expected": expected[m],
+        }
+        for m, model in enumerate(model_names)
+        if counts[m, 0]
+    ]
+
+
+def _tally_run(path: Path) -> Dict[Tuple[str, str], List[float]]:
+    """Return ``[n, c, cost]`` per ``(model, task)`` of one run (pool worker)."""
+    tally: Dict[Tuple[str, str], List[float]] = {}
+    for record in read_attempt_log(path):
+        key = (str(record.get("model", "")), str(record.get("task_id")))
+        counts = tally.setdefault(key, [0, 0, 0.0])
+        counts[0] += 1
+        counts[1] += bool(record.get("correct"))
+        counts[2] += float(record.get("cost", {}).get("total", 0.0))
+    return tally
+
+
+def collect_pass_at_k(
+    log_dir: Path,
+    ks: Sequence[int],
+    budgets: Iterable[float] = (),
+    workers: int | None = None,
+) -> List[PassAtK]:
+    """Return the :class:`PassAtK` of every model under ``log_dir``.
+
+    Every attempt in an ``attempts.jsonl`` is a sample of its task, and the
+    samples of all runs of a model are pooled.  The estimate is unbiased
+    only if samples were drawn without regard to earlier results; the budget
+    runners stop sampling a task once it is solved, so prefer logs of fixed
+    sample counts.  With ``workers`` above one, runs are tallied on a
+    process pool.
+    """
+    paths = sorted(Path(log_dir).rglob(ATTEMPTS_FILE))
+    merged: Dict[Tuple[str, str], List[float]] = {}
+    for tally in map_runs(_tally_run, paths, workers):
+        for key, (n, c, cost) in tally.items():
+            counts = merged.setdefault(key, [0, 0, 0.0])
+            counts[0] += n
+            counts[1] += c
+            counts[2] += cost
+    keys = sorted(merged)
+    model_names, group_models = np.unique([model for model, _ in keys], return_inverse=True)
+    values = np.array([merged[key] for key in keys], dtype=np.float64).reshape(-1, 3)
+    return summarise_pass_at_k(
+        model_names,
+        group_models.reshape(-1),
+        values[:, 0].astype(np.int64),
+        values[:, 1].astype(np.int64),
+        values[:, 2],
+        ks,
+        budgets,
+    )
+
+
+def pass_at_k_from_per_call(
+    table: Any, ks: Sequence[int], budgets: Iterable[float] = ()
+) -> List[PassAtK]:
+    """Compute :class:`PassAtK` from the table of :func:`~budgetbench.reports.load_per_call`.
+
+    Rows of all runs of a model are pooled, as by :func:`collect_pass_at_k`,
+    without parsing any JSON.
+    """
+    model_names, model_codes = _column_codes(table.column("model"))
+    _, task_codes = _column_codes(table.column("task_id"))
+    grouped = _group(
+        model_names,
+        model_codes,
+        task_codes,
+        table.column("correct").fill_null(False).to_numpy(zero_copy_only=False),
+        table.column("cost_total").fill_null(0.0).to_numpy(zero_copy_only=False),
+    )
+    return summarise_pass_at_k(*grouped, ks, budgets)
+
+
+def write_pass_at_k_csv(results: Iterable[PassAtK], output_file: Path) -> None:
+    """Write ``results`` to ``output_file`` as long-form CSV.
+
+    Each model gets one row per ``k`` and then one row per budget, with the
+    other column left empty.
+    """
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open("w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["model", "k", "budget", "pass_at_k", "tasks"])
+        for result in results:
+            for k, value, tasks in zip(result["ks"], result["pass_at_k"], result["tasks"]):
+                value = "" if np.isnan(value) else f"{value:.6g}"
+                writer.writerow([result["model"], int(k), "", value, int(tasks)])
+            for budget, value in zip(result["budgets"], result["expected"]):
+                writer.writerow([result["model"], "", f"{budget:.6g}", f"{value:.6g}", ""])
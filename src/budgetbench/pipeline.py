@@ -0,0 +1,267 @@
+"""Budget runner that overlaps LLM generation with test execution."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict
+
+from .attempt_log import ATTEMPTS_FILE, AttemptLog
+from .budget import BudgetLedger
+from .evaluator import evaluate_suite
+from .llm import calls_per_request, chat_completion
+from .llm_cost import estimate_max_cost
+from .problems import as_problem_store
+from .runner import (
+    _extract_code,
+    _has_valid_signature,
+    _is_valid_python,
+    _log_attempt,
+    _next_task,
+    _observe_tokens,
+    _stream_options,
+    _token_limit,
+    load_humaneval_dataset,
+)
+from .testplan import get_test_plan
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .cache import CompletionCache
+    from .tokens import TokenPolicy
+
+# Marks the end of the stream flowing through the stage queues.
+_DONE = None
+
+
+def _evaluate_code(
+    problem: Dict[str, Any], code: str, timeout: float, fail_fast: bool
+) -> Dict[str, Any]:
+    """Evaluation stage job, run in a worker process."""
+    suite = evaluate_suite(problem, code, timeout, fail_fast=fail_fast)
+    return {"passed": suite.passed, "total": suite.total, "failed_at": suite.failed_at}
+
+
+def run_humaneval_pipeline(
+    model: str,
+    budget: float,
+    log_dir: Path = Path("logs"),
+    max_tokens: int = 10_240,
+    generation_workers: int = 4,
+    evaluation_workers: int | None = None,
+    queue_size: int = 8,
+    show_progress: bool = False,
+    plan_cache_dir: Path | None = None,
+    fail_fast: bool = True,
+    cache: CompletionCache | None = None,
+    attempt_log: AttemptLog | None = None,
+    timeout: float = 1.0,
+    stream: bool = False,
+    token_policy: TokenPolicy | None = None,
+) -> Dict[str, Any]:
+    """Run HumanEval tasks until ``budget`` (USD) is exhausted, in stages.
+
+    Attempts flow through three overlapping stages connected by bounded
+    queues of ``queue_size`` items:
+
+    1. generation: up to ``generation_workers`` threads call
+       :func:`~budgetbench.llm.chat_completion`;
+    2. extraction: one thread extracts the code and checks its syntax and
+       signature;
+    3. evaluation: a process pool of ``evaluation_workers`` runs the tests.
+
+    A full queue blocks the stage feeding it, so a slow evaluator throttles
+    generation instead of buffering responses without bound.  Costs are
+    settled on a :class:`~budgetbench.budget.BudgetLedger` (and the progress
+    bar advanced) as soon as a response arrives, while solved tasks are
+    retired once their evaluation finishes.  Tasks are dispatched round-robin
+    and never have two attempts in the pipeline at once.  Reservations cover
+    both calls of a hedged request while hedging is configured.
+
+    Attempts are logged and summarised, and ``stream`` and ``token_policy``
+    are used, as by :func:`~budgetbench.runner.run_humaneval_until_budget`;
+    responses reach the policy as soon as they are generated.
+    """
+    problems = as_problem_store(load_humaneval_dataset())
+    for problem in problems:
+        get_test_plan(problem, cache_dir=plan_cache_dir)
+    tasks = list(problems.task_ids)
+    unsolved = tasks.copy()
+    attempts = 0
+    solved = set()
+    problem_stats = {task_id: {"attempts": 0, "correct": False} for task_id in tasks}
+    dispatched = {task_id: 0 for task_id in tasks}
+    replayed_cost = 0.0
+    log_dir.mkdir(parents=True, exist_ok=True)
+    ledger = BudgetLedger(budget)
+    owns_log = attempt_log is None
+    if attempt_log is None:
+        attempt_log = AttemptLog(log_dir / ATTEMPTS_FILE)
+
+    generated_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    extracted_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    # Stage completions reported back to the dispatching thread.
+    events: queue.Queue = queue.Queue()
+    eval_slots = threading.Semaphore(queue_size)
+
+    generators = ThreadPoolExecutor(max_workers=generation_workers)
+    evaluators = ProcessPoolExecutor(max_workers=evaluation_workers)
+
+    def generate(task_id: str, sample: int, limit: int, estimate: float) -> None:
+        try:
+            completion = chat_completion(
+                problems[task_id]["prompt"],
+                model=model,
+                max_tokens=limit,
+                cache=cache,
+                sample=sample,
+                **_stream_options(problems[task_id], stream),
+            )
+        except BaseException as exc:
+            events.put(("generation_failed", task_id, estimate, exc))
+            return
+        events.put(("generated", task_id, estimate, completion))
+        generated_q.put((task_id, completion))
+
+    def extract() -> None:
+        while True:
+            item = generated_q.get()
+            if item is _DONE:
+                extracted_q.put(_DONE)
+                return
+            task_id, completion = item
+            problem = problems[task_id]
+            code = _extract_code(completion["message"])
+            result = {
+                "raw": completion["message"],
+                "code": code,
+                "is_valid": _is_valid_python(code),
+                "has_valid_signature": _has_valid_signature(
+                    code, problem["prompt"], problem["entry_point"], problem.get("arg_names")
+                ),
+                "cost": completion.get("cost", {}),
+                "cached": completion.get("cached", False),
+                "ttft": completion.get("ttft"),
+                "stopped_early": completion.get("stopped_early", False),
+                "usage": completion.get("usage", {}),
+                "usage_estimated": completion.get("usage_estimated", False),
+                "finish_reason": completion.get("finish_reason"),
+                "hedge": completion.get("hedge"),
+                "shared_by": completion.get("shared_by", 1),
+            }
+            extracted_q.put((task_id, result))
+
+    def evaluate() -> None:
+        while True:
+            item = extracted_q.get()
+            if item is _DONE:
+                return
+            task_id, result = item
+            eval_slots.acquire()
+            try:
+                future = evaluators.submit(
+                    _evaluate_code, problems[task_id], result["code"], timeout, fail_fast
+                )
+            except BaseException as exc:
+                eval_slots.release()
+                events.put(("evaluation_failed", task_id, 0.0, exc))
+                continue
+
+            def done(future, task_id=task_id, result=result) -> None:
+                eval_slots.release()
+                try:
+                    events.put(("evaluated", task_id, 0.0, {**result, **future.result()}))
+                except BaseException as exc:
+                    events.put(("evaluation_failed", task_id, 0.0, exc))
+
+            future.add_done_callback(done)
+
+    stages = [
+        threading.Thread(target=extract, daemon=True),
+        threading.Thread(target=evaluate, daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    progress = None
+    if show_progress:
+        from tqdm.auto import tqdm
+
+        progress = tqdm(total=budget, unit="USD", desc="Budget spent")
+
+    busy: set = set()
+    generating = 0
+    cursor = 0
+    error: BaseException | None = None
+    try:
+        while True:
+            while error is None and generating < generation_workers and unsolved:
+                idx = _next_task(unsolved, cursor, busy)
+                if idx is None:
+                    break
+                task_id = unsolved[idx]
+                limit = _token_limit(token_policy, model, task_id, max_tokens)
+                estimate = estimate_max_cost(problems[task_id]["prompt"], model, limit)
+                estimate *= calls_per_request()
+                if not ledger.try_reserve(estimate):
+                    break
+                attempts += 1
+                generators.submit(generate, task_id, dispatched[task_id], limit, estimate)
+                dispatched[task_id] += 1
+                busy.add(task_id)
+                generating += 1
+                cursor = idx + 1
+
+            if not busy:
+                break
+            kind, task_id, estimate, payload = events.get()
+            if kind in ("generation_failed", "evaluation_failed"):
+                if kind == "generation_failed":
+                    generating -= 1
+                    ledger.settle(estimate, 0.0)
+                busy.discard(task_id)
+                error = error or payload
+            elif kind == "generated":
+                generating -= 1
+                cost = float(payload.get("cost", {}).get("total", 0.0))
+                ledger.settle(estimate, cost)
+                _observe_tokens(token_policy, model, task_id, payload)
+                if payload.get("cached"):
+                    replayed_cost += cost
+                if progress is not None:
+                    progress.update(min(cost, budget - progress.n))
+            else:
+                busy.discard(task_id)
+                correct = payload["passed"] == payload["total"]
+                problem_stats[task_id]["attempts"] += 1
+                problem_stats[task_id]["correct"] = (
+                    problem_stats[task_id]["correct"] or correct
+                )
+                _log_attempt(attempt_log, model, task_id, payload, correct)
+                if correct and task_id not in solved:
+                    solved.add(task_id)
+                    idx = unsolved.index(task_id)
+                    unsolved.pop(idx)
+                    if idx < cursor:
+                        cursor -= 1
+    finally:
+        if owns_log:
+            attempt_log.close()
+        generators.shutdown(wait=True)
+        generated_q.put(_DONE)
+        for stage in stages:
+            stage.join()
+        evaluators.shutdown(wait=True)
+        if progress is not None:
+            progress.close()
+    if error is not None:
+        raise error
+
+    return {
+        "attempts": attempts,
+        "correct": len(solved),
+        "total_cost": ledger.spent,
+        "replayed_cost": replayed_cost,
+        "per_problem": problem_stats,
+    }
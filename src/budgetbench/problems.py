@@ -0,0 +1,131 @@
+"""Indexed in-memory store of HumanEval problems."""
+
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, Mapping, Tuple
+
+
+def prompt_arg_names(prompt: str, entry_point: str | None = None) -> Tuple[str, ...] | None:
+    """Return the argument names of the function declared in ``prompt``.
+
+    The function named ``entry_point`` is preferred, falling back to the first
+    function in the prompt.  ``None`` means the prompt declares no function.
+    """
+    try:
+        tree = ast.parse(prompt)
+    except SyntaxError:
+        return None
+    funcs = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+    if not funcs:
+        return None
+    func = next((f for f in funcs if f.name == entry_point), funcs[0])
+    return tuple(arg.arg for arg in func.args.args)
+
+
+def _task_number(task_id: str) -> int | None:
+    suffix = task_id.rpartition("/")[2]
+    return int(suffix) if suffix.isdigit() else None
+
+
+@dataclass(frozen=True, slots=True)
+class ProblemRecord:
+    """One HumanEval problem with metadata precomputed when it is loaded.
+
+    Records support ``record["prompt"]`` and :meth:`get` so code written
+    against the dataset's plain dictionaries works with either.
+    """
+
+    task_id: str
+    prompt: str
+    entry_point: str
+    test: str
+    canonical_solution: str = ""
+    number: int | None = None
+    arg_names: Tuple[str, ...] | None = None
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> ProblemRecord:
+        prompt = row.get("prompt", "")
+        entry_point = row.get("entry_point", "")
+        return cls(
+            task_id=row["task_id"],
+            prompt=prompt,
+            entry_point=entry_point,
+            test=row.get("test", ""),
+            canonical_solution=row.get("canonical_solution", ""),
+            number=_task_number(row["task_id"]),
+            arg_names=prompt_arg_names(prompt, entry_point),
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(f.name for f in fields(self))
+
+
+class ProblemStore:
+    """Problems in dataset order, indexed by ``task_id`` and task number.
+
+    Iterating yields :class:`ProblemRecord` objects in order, ``store[task_id]``
+    and :meth:`by_number` are constant-time lookups, and ``task_id in store``
+    tests membership.
+    """
+
+    def __init__(self, rows: Iterable[Mapping[str, Any]], exclude: Iterable[str] = ()) -> None:
+        excluded = set(exclude)
+        self._records: Tuple[ProblemRecord, ...] = tuple(
+            row if isinstance(row, ProblemRecord) else ProblemRecord.from_row(row)
+            for row in rows
+            if row["task_id"] not in excluded
+        )
+        self._by_id: Dict[str, ProblemRecord] = {r.task_id: r for r in self._records}
+        self._by_number: Dict[int, ProblemRecord] = {
+            r.number: r for r in self._records if r.number is not None
+        }
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[ProblemRecord]:
+        return iter(self._records)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._by_id
+
+    def __getitem__(self, task_id: str) -> ProblemRecord:
+        return self._by_id[task_id]
+
+    def get(self, task_id: str, default: ProblemRecord | None = None) -> ProblemRecord | None:
+        return self._by_id.get(task_id, default)
+
+    def by_number(self, number: int) -> ProblemRecord:
+        """Return the problem ``HumanEval/<number>``."""
+        return self._by_number[number]
+
+    @property
+    def task_ids(self) -> Tuple[str, ...]:
+        return tuple(self._by_id)
+
+
+def as_problem_store(
+    dataset: Iterable[Mapping[str, Any]], exclude: Iterable[str] = ()
+) -> ProblemStore:
+    """Return ``dataset`` as a :class:`ProblemStore`, reusing it if it is one.
+
+    An existing store is assumed to already omit ``exclude``.
+    """
+    if isinstance(dataset, ProblemStore):
+        return dataset
+    return ProblemStore(dataset, exclude=exclude)
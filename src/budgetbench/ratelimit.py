@@ -0,0 +1,294 @@
+"""Process-wide request pacing and adaptive concurrency for LLM providers."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Tuple
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Limits for requests to one provider endpoint.
+
+    ``requests_per_minute`` and ``tokens_per_minute`` are enforced by token
+    buckets holding ``burst_seconds`` worth of allowance.  The number of
+    requests in flight is an AIMD window between ``min_in_flight`` and
+    ``max_in_flight``: it grows by ``increase`` per window of successful
+    requests and is multiplied by ``decrease`` when the provider answers 429
+    or, with ``latency_target`` set, a request takes longer than that many
+    seconds.  After a 429 without ``Retry-After`` every request waits
+    ``backoff`` seconds.  With ``per_model`` unset one limiter is shared by
+    every model on the endpoint, for providers that limit per API key.
+    """
+
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+    burst_seconds: float = 1.0
+    initial_in_flight: int = 4
+    min_in_flight: int = 1
+    max_in_flight: int = 64
+    increase: float = 1.0
+    decrease: float = 0.5
+    latency_target: float | None = None
+    backoff: float = 1.0
+    per_model: bool = True
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.min_in_flight <= self.max_in_flight:
+            raise ValueError("need 1 <= min_in_flight <= max_in_flight")
+        if not 0.0 < self.decrease < 1.0:
+            raise ValueError("decrease must be between 0 and 1")
+        for name in ("requests_per_minute", "tokens_per_minute"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive")
+
+
+class TokenBucket:
+    """A token bucket refilled at ``rate`` per second up to ``capacity``.
+
+    :meth:`take` may overdraw the bucket; it returns how long the caller has
+    to wait for the debt to be repaid, which keeps callers in arrival order
+    without holding a lock while they sleep.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self.updated, 0.0)
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Withdraw ``amount`` and return the seconds until it is covered."""
+        self._refill(now)
+        self.level -= amount
+        return max(-self.level, 0.0) / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        """Return ``amount`` (or withdraw it, when negative)."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass(frozen=True)
+class Permit:
+    """A request admitted by :meth:`ProviderLimiter.acquire`."""
+
+    started: float
+    tokens: int
+
+
+class ProviderLimiter:
+    """Pace requests to one provider endpoint under :class:`RateLimits`.
+
+    Threads call :meth:`acquire` and event-loop tasks :meth:`acquire_async`;
+    both may share one limiter.  Every permit must be handed back with
+    :meth:`release` on success, :meth:`throttle` after a 429 or
+    :meth:`abandon` after any other failure.  Waiting requests are admitted
+    in arrival order.
+    """
+
+    def __init__(
+        self, limits: RateLimits, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.limits = limits
+        self.clock = clock
+        self.window = float(
+            min(max(limits.initial_in_flight, limits.min_in_flight), limits.max_in_flight)
+        )
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._blocked_until = 0.0
+        self._last_decrease = -math.inf
+        now = clock()
+        self._requests = self._bucket(limits.requests_per_minute, now)
+        self._tokens = self._bucket(limits.tokens_per_minute, now)
+
+    def _bucket(self, per_minute: float | None, now: float) -> TokenBucket | None:
+        if per_minute is None:
+            return None
+        rate = per_minute / 60.0
+        return TokenBucket(rate, max(rate * self.limits.burst_seconds, 1.0), now)
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.window)
+
+    def _reserve(self, tokens: int) -> float:
+        """Charge one request of ``tokens`` and return how long to wait."""
+        with self._lock:
+            now = self.clock()
+            delay = max(self._blocked_until - now, 0.0)
+            if self._requests is not None:
+                delay = max(delay, self._requests.take(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.take(tokens, now))
+            return delay
+
+    def _permit(self, tokens: int) -> Permit:
+        return Permit(started=self.clock(), tokens=tokens)
+
+    def acquire(self, tokens: int = 0) -> Permit:
+        """Block until a request estimated at ``tokens`` tokens may be sent."""
+        with self._lock:
+            admitted = not self._waiters and self._has_slot()
+            if admitted:
+                self.in_flight += 1
+            else:
+                event = threading.Event()
+                self._waiters.append(event.set)
+        if not admitted:
+            event.wait()
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return self._permit(tokens)
+
+    async def acquire_async(self, tokens: int = 0) -> Permit:
+        """Asynchronous counterpart of :meth:`acquire`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(None)
+            )
+
+        with self._lock:
+            admitted = not self._waiters and self._has_slot()
+            if admitted:
+                self.in_flight += 1
+            else:
+                self._waiters.append(wake)
+        if not admitted:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    try:
+                        self._waiters.remove(wake)
+                        handed_over = False
+                    except ValueError:
+                        handed_over = True
+                if handed_over:
+                    self._leave()
+                raise
+        try:
+            delay = self._reserve(tokens)
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._leave()
+            raise
+        return self._permit(tokens)
+
+    def _leave(self, update: Callable[[float], None] | None = None) -> None:
+        """Free a slot, apply ``update`` and hand free slots to waiters."""
+        with self._lock:
+            self.in_flight -= 1
+            if update is not None:
+                update(self.clock())
+            woken = []
+            while self._waiters and self._has_slot():
+                self.in_flight += 1
+                woken.append(self._waiters.popleft())
+        for wake in woken:
+            wake()
+
+    def _shrink(self, permit: Permit, now: float) -> None:
+        # Requests sent before the last cut saw the old window; reacting to
+        # them again would collapse the window after a single burst of 429s.
+        if permit.started >= self._last_decrease:
+            self.window = max(self.window * self.limits.decrease, self.limits.min_in_flight)
+            self._last_decrease = now
+
+    def release(self, permit: Permit, tokens_used: int | None = None) -> None:
+        """Return the permit of a successful request.
+
+        ``tokens_used`` replaces the permit's token estimate in the
+        tokens-per-minute budget.
+        """
+
+        def update(now: float) -> None:
+            if tokens_used is not None and self._tokens is not None:
+                self._tokens.refund(permit.tokens - tokens_used, now)
+            target = self.limits.latency_target
+            if target is not None and now - permit.started > target:
+                self._shrink(permit, now)
+            else:
+                self.window = min(
+                    self.window + self.limits.increase / self.window,
+                    self.limits.max_in_flight,
+                )
+
+        self._leave(update)
+
+    def throttle(self, permit: Permit, retry_after: float | None = None) -> None:
+        """Return the permit of a request the provider rejected with 429.
+
+        Every request waits until ``retry_after`` seconds (or the configured
+        ``backoff``) have passed and the in-flight window shrinks.
+        """
+
+        def update(now: float) -> None:
+            self.throttled += 1
+            pause = self.limits.backoff if retry_after is None else retry_after
+            self._blocked_until = max(self._blocked_until, now + pause)
+            self._shrink(permit, now)
+
+        self._leave(update)
+
+    def abandon(self, permit: Permit) -> None:
+        """Return the permit of a request that failed for another reason."""
+        self._leave()
+
+
+_LIMITS: Dict[Tuple[str | None, str | None], RateLimits] = {}
+_LIMITERS: Dict[Tuple[str | None, str | None], ProviderLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def configure_rate_limits(
+    limits: RateLimits | None, model: str | None = None, base_url: str | None = None
+) -> None:
+    """Set (or with ``None`` remove) the limits for ``model`` at ``base_url``.
+
+    ``None`` for ``model`` or ``base_url`` matches every model or endpoint;
+    the most specific configuration wins.  Existing limiters are discarded.
+    """
+    with _LIMITERS_LOCK:
+        if limits is None:
+            _LIMITS.pop((base_url, model), None)
+        else:
+            _LIMITS[(base_url, model)] = limits
+        _LIMITERS.clear()
+
+
+def get_limiter(model: str, base_url: str | None = None) -> ProviderLimiter | None:
+    """Return the process-wide limiter for ``model`` at ``base_url``.
+
+    ``None`` means no limits are configured for it.
+    """
+    with _LIMITERS_LOCK:
+        for key in ((base_url, model), (base_url, None), (None, model), (None, None)):
+            limits = _LIMITS.get(key)
+            if limits is not None:
+                break
+        else:
+            return None
+        limiter_key = (base_url, model if limits.per_model else None)
+        limiter = _LIMITERS.get(limiter_key)
+        if limiter is None:
+            limiter = _LIMITERS[limiter_key] = ProviderLimiter(limits)
+        return limiter
@@ -0,0 +1,224 @@
+"""Re-evaluate logged attempts offline without calling the LLM."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from .attempt_log import ATTEMPTS_FILE, read_attempt_log
+from .reports import STATE_FILE
+
+LOG_METADATA_FILES = {"summary.json", "metadata.json", STATE_FILE, ATTEMPTS_FILE}
+REEVAL_FILE = "reeval.jsonl"
+# Attempts submitted to the pool ahead of the one being written.
+MAX_PENDING = 256
+
+
+def _is_attempt_file(path: Path) -> bool:
+    """Return whether ``path`` is a legacy per-attempt ``<uuid>.json`` file."""
+    if path.name in LOG_METADATA_FILES:
+        return False
+    try:
+        uuid.UUID(path.stem)
+    except ValueError:
+        return False
+    return True
+
+
+def _iter_runs(log_dir: Path) -> Iterator[Tuple[Path, List[Path]]]:
+    """Yield each run directory under ``log_dir`` with its attempt log files.
+
+    A run is described by its ``attempts.jsonl`` when present, otherwise by
+    the per-attempt ``<uuid>.json`` files the runner writes.  Other JSON
+    files, such as the state :func:`~budgetbench.reports.aggregate` keeps,
+    are not attempts.
+    """
+    run_dirs = {p.parent for p in log_dir.rglob(ATTEMPTS_FILE)}
+    run_dirs.update(p.parent for p in log_dir.rglob("*.json") if _is_attempt_file(p))
+    for run_dir in sorted(run_dirs):
+        jsonl = run_dir / ATTEMPTS_FILE
+        if jsonl.exists():
+            yield run_dir, [jsonl]
+        else:
+            files = [p for p in run_dir.glob("*.json") if _is_attempt_file(p)]
+            files.sort(key=lambda p: (p.stat().st_mtime, p.name))
+            yield run_dir, files
+
+
+def _iter_attempts(files: List[Path]) -> Iterator[Dict[str, Any]]:
+    for path in files:
+        if path.suffix == ".jsonl":
+            yield from read_attempt_log(path)
+        else:
+            with path.open() as fh:
+                yield json.load(fh)
+
+
+def _reevaluate(job: Tuple[Dict[str, Any], str, float]) -> Dict[str, Any]:
+    """Score one logged ``response`` against ``problem`` in a pool worker."""
+    from .runner import _score_completion
+
+    problem, response, timeout = job
+    result = _score_completion(problem, {"message": response}, timeout=timeout)
+    return {
+        "is_valid": result["is_valid"],
+        "has_valid_signature": result["has_valid_signature"],
+        "passed": result["passed"],
+        "total": result["total"],
+    }
+
+
+def _scored(
+    attempts: Iterable[Dict[str, Any]],
+    problems: Mapping[str, Dict[str, Any]],
+    timeout: float,
+    executor: Executor,
+    max_pending: int,
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any] | None]]:
+    """Yield each attempt with its re-evaluation, in log order.
+
+    Attempts are read and submitted lazily, at most ``max_pending`` ahead of
+    the one yielded, so memory stays bounded however long the log is.
+    Attempts for unknown tasks come with ``None``.
+    """
+    pending: Deque[Tuple[Dict[str, Any], Future | None]] = deque()
+    for attempt in attempts:
+        future = None
+        if attempt.get("task_id") in problems:
+            job = (problems[attempt["task_id"]], attempt.get("response") or "", timeout)
+            future = executor.submit(_reevaluate, job)
+        pending.append((attempt, future))
+        if len(pending) >= max_pending:
+            attempt, future = pending.popleft()
+            yield attempt, None if future is None else future.result()
+    while pending:
+        attempt, future = pending.popleft()
+        yield attempt, None if future is None else future.result()
+
+
+def reevaluate_logs(
+    log_dir: Path,
+    problems: Mapping[str, Dict[str, Any]],
+    report: Path | None = None,
+    workers: int | None = None,
+    timeout: float = 1.0,
+    executor: Executor | None = None,
+    max_pending: int = MAX_PENDING,
+) -> Dict[str, int]:
+    """Re-extract and re-evaluate every logged attempt under ``log_dir``.
+
+    Each attempt's stored ``response`` is run through the current code
+    extraction and evaluator on a process pool of ``workers`` processes, with
+    every assertion scored.  For every run directory a ``reeval.jsonl`` is
+    written next to its logs holding the original records plus
+    ``reeval_correct``, ``reeval_passed`` and ``reeval_total`` columns.  When
+    ``report`` is given, attempts whose correctness changed are listed there
+    as CSV.
+
+    Logs are streamed: at most ``max_pending`` attempts are held and queued
+    on the pool at a time.  Attempts for tasks missing from ``problems`` are
+    left unscored.  Returns
+    counts of ``attempts`` re-evaluated, ``changed`` verdicts and ``skipped``
+    attempts.
+    """
+    counts = {"attempts": 0, "changed": 0, "skipped": 0}
+    diff_fh = None
+    diff_writer = None
+    owns_executor = executor is None
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if report is not None:
+            report.parent.mkdir(parents=True, exist_ok=True)
+            diff_fh = report.open("w", newline="")
+            diff_writer = csv.writer(diff_fh)
+            diff_writer.writerow(
+                ["run_dir", "id", "model", "task_id", "correct", "reeval_correct"]
+            )
+
+        for run_dir, files in _iter_runs(Path(log_dir)):
+            scored = _scored(
+                _iter_attempts(files), problems, timeout, executor, max_pending
+            )
+            with (run_dir / REEVAL_FILE).open("w") as out:
+                for attempt, result in scored:
+                    if result is None:
+                        counts["skipped"] += 1
+                        out.write(json.dumps(attempt) + "\n")
+                        continue
+                    correct = result["passed"] == result["total"]
+                    counts["attempts"] += 1
+                    record = {
+                        **attempt,
+                        "reeval_correct": correct,
+                        "reeval_passed": result["passed"],
+                        "reeval_total": result["total"],
+                    }
+                    out.write(json.dumps(record) + "\n")
+                    if bool(attempt.get("correct")) != correct:
+                        counts["changed"] += 1
+                        if diff_writer is not None:
+                            diff_writer.writerow(
+                                [
+                                    str(run_dir),
+                                    attempt.get("id", ""),
+                                    attempt.get("model", ""),
+                                    attempt["task_id"],
+                                    bool(attempt.get("correct")),
+                                    correct,
+                                ]
+                            )
+    finally:
+        if diff_fh is not None:
+            diff_fh.close()
+        if owns_executor:
+            executor.shutdown()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-evaluate logged attempts without calling the LLM"
+    )
+    parser.add_argument(
+        "log_dir", type=Path, help="Directory tree containing attempt logs"
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=Path("reeval_diff.csv"),
+        help="CSV listing attempts whose correctness changed",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Number of evaluation processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=1.0, help="Timeout per assertion in seconds"
+    )
+    args = parser.parse_args()
+
+    from .runner import load_humaneval_dataset
+
+    problems = load_humaneval_dataset()
+    counts = reevaluate_logs(
+        args.log_dir,
+        problems,
+        report=args.report,
+        workers=args.workers,
+        timeout=args.timeout,
+    )
+    print(
+        f"Re-evaluated: {counts['attempts']}\n"
+        f"Changed: {counts['changed']}\n"
+        f"Skipped: {counts['skipped']}"
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
@@ -0,0 +1,423 @@
+"""Incremental CSV reports over BudgetBench attempt logs."""
+
+from __future__ import annotations
+
+import csv
+import importlib
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .attempt_log import ATTEMPTS_FILE
+from .scan import map_runs
+
+BUDGETS = [0.001, 0.01, 0.1, 1, 10]
+PER_CALL_FILE = "per_call.csv"
+PER_CALL_PARQUET = "per_call.parquet"
+PER_CALL_FORMATS = ("csv", "parquet")
+AGGREGATE_FILE = "aggregate_by_budget.csv"
+STATE_FILE = "aggregate_state.json"
+STATE_VERSION = 3
+ROW_GROUP_SIZE = 64 * 1024
+# Parts ``per_call.parquet`` may hold before incremental runs merge them.
+MAX_PER_CALL_PARTS = 16
+
+PER_CALL_FIELDS = [
+    "model",
+    "run_id",
+    "task_id",
+    "correct",
+    "cost_total",
+    "cost_prompt",
+    "cost_completion",
+    "cost_cache",
+    "cost_reasoning",
+]
+AGGREGATE_FIELDS = ["model", "run_id", "budget", "solved", "pass_rate"]
+CATEGORY_FIELDS = ("model", "run_id", "task_id")
+
+
+@dataclass
+class LogCheckpoint:
+    """How far one ``attempts.jsonl`` has been aggregated, and its totals.
+
+    ``offset`` is the byte offset just past the last complete line read;
+    ``inode`` and ``mtime`` detect a replaced or untouched file.  ``counts``
+    maps each budget threshold already crossed to the number of tasks solved
+    when it was.
+    """
+
+    offset: int = 0
+    inode: int = 0
+    mtime: float = 0.0
+    model: str | None = None
+    attempts: int = 0
+    cumulative: float = 0.0
+    solved: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _load_state(path: Path, per_call_format: str) -> Dict[str, LogCheckpoint] | None:
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if (
+        state.get("version") != STATE_VERSION
+        or state.get("budgets") != BUDGETS
+        or state.get("per_call_format") != per_call_format
+    ):
+        return None
+    return {key: LogCheckpoint(**value) for key, value in state["logs"].items()}
+
+
+def _save_state(
+    path: Path, logs: Dict[str, LogCheckpoint], per_call_format: str
+) -> None:
+    state = {
+        "version": STATE_VERSION,
+        "budgets": BUDGETS,
+        "per_call_format": per_call_format,
+        "logs": {key: asdict(cp) for key, cp in logs.items()},
+    }
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state))
+    tmp.replace(path)
+
+
+def _read_new_lines(path: Path, offset: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(end_offset, record)`` for complete lines after ``offset``."""
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                yield offset, json.loads(line)
+
+
+def _append_per_call(
+    columns: Dict[str, List[Any]], record: Dict[str, Any], run_id: str
+) -> None:
+    cost = record.get("cost", {})
+    columns["model"].append(record.get("model"))
+    columns["run_id"].append(run_id)
+    columns["task_id"].append(record.get("task_id"))
+    columns["correct"].append(record.get("correct"))
+    for name in PER_CALL_FIELDS[4:]:
+        columns[name].append(cost.get(name[len("cost_"):]))
+
+
+def _run_id(attempts_file: Path, log_dir: Path) -> str:
+    """Return the run identifier of ``attempts_file``: its directory relative to ``log_dir``.
+
+    Runs of different models or sweeps may share a directory name, e.g. the
+    timestamp ``run_all_models.py`` names every model's run after, so the
+    name alone is not unique.
+    """
+    run_dir = Path(attempts_file).parent.relative_to(log_dir)
+    return run_dir.as_posix() if run_dir.parts else Path(log_dir).resolve().name
+
+
+def _scan_log(
+    job: Tuple[str, str, LogCheckpoint, int]
+) -> Tuple[LogCheckpoint, Dict[str, List[Any]], bool]:
+    """Read up to ``limit`` attempts of one log from its checkpoint.
+
+    Runs in a pool worker or in process.  Returns the advanced checkpoint,
+    the per-call columns of the attempts read and whether the log was read
+    to its end.
+    """
+    path, run_id, checkpoint, limit = job
+    path = Path(path)
+    columns: Dict[str, List[Any]] = {name: [] for name in PER_CALL_FIELDS}
+    rows = 0
+    for offset, record in _read_new_lines(path, checkpoint.offset):
+        _append_per_call(columns, record, run_id)
+        _advance(checkpoint, record)
+        checkpoint.offset = offset
+        rows += 1
+        if rows >= limit:
+            return checkpoint, columns, False
+    return checkpoint, columns, True
+
+
+def _pyarrow(module: str = "pyarrow") -> Any:
+    """Import ``module`` of pyarrow, pointing at the ``parquet`` extra if it is missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(
+            "Parquet per-call tables require pyarrow; install budgetbench[parquet]"
+        ) from exc
+
+
+def _per_call_schema():
+    pa = _pyarrow()
+
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [(name, category) for name in CATEGORY_FIELDS]
+        + [("correct", pa.bool_())]
+        + [(name, pa.float64()) for name in PER_CALL_FIELDS if name.startswith("cost_")]
+    )
+
+
+class _CsvSink:
+    """Appends per-call rows to ``per_call.csv``."""
+
+    def __init__(self, path: Path) -> None:
+        new_file = not path.exists()
+        self._fh = path.open("a", newline="")
+        self._writer = csv.writer(self._fh)
+        if new_file:
+            self._writer.writerow(PER_CALL_FIELDS)
+
+    def write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        self._writer.writerows(zip(*(columns[name] for name in PER_CALL_FIELDS)))
+
+    def close(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+
+
+class _ParquetSink:
+    """Writes per-call rows as a new Parquet part, one row group at a time.
+
+    Each aggregation adds at most one ``part-NNNNN.parquet`` file to the
+    ``per_call.parquet`` directory holding the rows it appended, so the
+    directory reads back as a single table.  Once there are more than
+    :data:`MAX_PER_CALL_PARTS` parts they are merged into one, a row group
+    at a time and in order, so reruns do not leave a trail of tiny files.
+    """
+
+    def __init__(self, directory: Path, row_group_size: int | None = None) -> None:
+        self._pq = _pyarrow("pyarrow.parquet")
+        self._schema = _per_call_schema()
+        self._row_group_size = row_group_size or ROW_GROUP_SIZE
+        self._columns: Dict[str, List[Any]] = {name: [] for name in PER_CALL_FIELDS}
+        self._writer = None
+        self._directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+        part = len(self._parts())
+        self._path = directory / f"part-{part:05d}.parquet"
+        # Hidden until complete: readers skip dot files in the directory.
+        self._tmp_path = directory / f".{self._path.name}.tmp"
+
+    def _parts(self) -> List[Path]:
+        return sorted(self._directory.glob("part-*.parquet"))
+
+    def write_columns(self, columns: Dict[str, List[Any]]) -> None:
+        for name, column in self._columns.items():
+            column.extend(columns[name])
+        if len(self._columns["model"]) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._columns["model"]:
+            return
+        pa = _pyarrow()
+        table = pa.Table.from_pydict(self._columns, schema=self._schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._tmp_path, self._schema)
+        # Large batches are split into row groups of ``row_group_size``.
+        self._writer.write_table(table, row_group_size=self._row_group_size)
+        self._columns = {name: [] for name in PER_CALL_FIELDS}
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._tmp_path.replace(self._path)
+        if len(self._parts()) > MAX_PER_CALL_PARTS:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Merge every part into ``part-00000.parquet``, keeping the row order.
+
+        A crash part-way leaves duplicate rows behind, but :func:`aggregate`
+        only saves its state after the sink is closed, so the next run
+        rebuilds from scratch.
+        """
+        parts = self._parts()
+        merged = self._directory / "part-00000.parquet"
+        tmp_path = self._directory / f".{merged.name}.tmp"
+        with self._pq.ParquetWriter(tmp_path, self._schema) as writer:
+            for part in parts:
+                source = self._pq.ParquetFile(part)
+                for group in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(group))
+        for part in parts:
+            part.unlink()
+        tmp_path.replace(merged)
+
+
+def load_per_call(out_dir: Path, columns: List[str] | None = None):
+    """Read the Parquet per-call table written by :func:`aggregate`.
+
+    Returns a ``pyarrow.Table`` with ``model``, ``run_id`` and ``task_id``
+    as dictionary-encoded columns, ``correct`` as booleans and the costs as
+    float64; pass ``columns`` to read only some of them.  Use
+    ``.to_pandas()`` or ``.column(name).to_numpy()`` for analysis.
+    """
+    pq = _pyarrow("pyarrow.parquet")
+    return pq.read_table(
+        Path(out_dir) / PER_CALL_PARQUET, columns=columns, schema=_per_call_schema()
+    )
+
+
+def _advance(checkpoint: LogCheckpoint, record: Dict[str, Any]) -> None:
+    """Fold one attempt into ``checkpoint``'s running totals."""
+    if checkpoint.model is None:
+        checkpoint.model = record["model"]
+    checkpoint.attempts += 1
+    checkpoint.cumulative += float(record.get("cost", {}).get("total", 0.0))
+    task_id = record.get("task_id")
+    if record.get("correct") and task_id not in checkpoint.solved:
+        checkpoint.solved.append(task_id)
+    for budget in sorted(BUDGETS):
+        key = str(budget)
+        if key not in checkpoint.counts and checkpoint.cumulative >= budget:
+            checkpoint.counts[key] = len(checkpoint.solved)
+
+
+def _total_tasks(run_dir: Path) -> int | None:
+    summary_file = run_dir / "summary.json"
+    if not summary_file.exists():
+        return None
+    with summary_file.open() as fh:
+        summary = json.load(fh)
+    return len(summary.get("per_problem", {})) or None
+
+
+def aggregate(
+    log_dir: Path,
+    out_dir: Path,
+    full: bool = False,
+    per_call_format: str = "csv",
+    workers: int | None = None,
+) -> Dict[str, int]:
+    """Write ``per_call.csv`` and ``aggregate_by_budget.csv`` for ``log_dir``.
+
+    ``per_call.csv`` has one row per attempt with columns for model, run
+    identifier (the run directory relative to ``log_dir``), task, correctness
+    and token cost components.
+    ``aggregate_by_budget.csv`` reports, for each run and budget threshold in
+    :data:`BUDGETS`, the number of problems solved and the pass rate.
+
+    Runs only ever append to their logs, so progress is checkpointed in
+    ``aggregate_state.json`` in ``out_dir``: for every ``attempts.jsonl`` its
+    byte offset, inode, mtime and running totals.  A rerun parses only the
+    bytes appended since, appends their rows to ``per_call.csv`` and rewrites
+    the small budget table from the totals.  If a log was replaced, truncated
+    or removed, or ``full`` is set, everything is rebuilt from scratch.
+
+    Incremental and full runs write the same rows, and each run's rows keep
+    the order of its log, but only a full rebuild groups them by log in
+    path order: a rerun appends whatever every log gained since, so when
+    several logs grow between reruns their rows interleave in the order of
+    the reruns.  Sort by ``run_id`` when the row order matters.
+
+    With ``per_call_format="parquet"`` the per-call rows are written instead
+    as typed columns to the ``per_call.parquet`` directory, adding one part
+    file of row groups per run with new attempts and merging the parts once
+    there are more than :data:`MAX_PER_CALL_PARTS`; read it back with
+    :func:`load_per_call`.  This requires ``pyarrow``, from the ``parquet``
+    extra.
+
+    Logs are read :data:`ROW_GROUP_SIZE` attempts at a time and each batch
+    is written before the next is parsed, so memory is bounded by a batch
+    per log rather than by the size of the logs.  With ``workers`` above
+    one, the first batch of every log is parsed on a process pool of that
+    size and the rest of a longer log in this process, in path order, so
+    the output is identical to a serial scan.
+
+    Returns counts of ``logs`` scanned, ``read`` logs that had new data and
+    new ``attempts`` aggregated.
+    """
+    if per_call_format not in PER_CALL_FORMATS:
+        raise ValueError(f"per_call_format must be one of {', '.join(PER_CALL_FORMATS)}")
+    if per_call_format == "parquet":
+        _pyarrow()
+    log_dir = Path(log_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = out_dir / PER_CALL_FILE
+    parquet_dir = out_dir / PER_CALL_PARQUET
+    per_call_path = parquet_dir if per_call_format == "parquet" else csv_path
+    state_path = out_dir / STATE_FILE
+
+    paths = sorted(log_dir.rglob(ATTEMPTS_FILE))
+    stats = {path: path.stat() for path in paths}
+    checkpoints = None
+    if not full and per_call_path.exists():
+        checkpoints = _load_state(state_path, per_call_format)
+    if checkpoints is not None:
+        current = {str(path) for path in paths}
+        for key, cp in checkpoints.items():
+            st = stats.get(Path(key))
+            if key not in current or st.st_ino != cp.inode or st.st_size < cp.offset:
+                checkpoints = None
+                break
+    if checkpoints is None:
+        checkpoints = {}
+        csv_path.unlink(missing_ok=True)
+        shutil.rmtree(parquet_dir, ignore_errors=True)
+
+    # Rows appended from here on are only accounted for once the new state
+    # is saved, so drop the old one: a crash in between forces a rebuild
+    # rather than duplicating rows.
+    state_path.unlink(missing_ok=True)
+    counts = {"logs": len(paths), "read": 0, "attempts": 0}
+    if per_call_format == "parquet":
+        sink = _ParquetSink(parquet_dir)
+    else:
+        sink = _CsvSink(csv_path)
+    jobs = []
+    for path in paths:
+        st = stats[path]
+        cp = checkpoints.setdefault(str(path), LogCheckpoint(inode=st.st_ino))
+        if st.st_size != cp.offset or st.st_mtime != cp.mtime:
+            jobs.append((str(path), _run_id(path, log_dir), cp, ROW_GROUP_SIZE))
+    try:
+        scans = zip(jobs, map_runs(_scan_log, jobs, workers))
+        for (key, run_id, _, limit), (cp, columns, done) in scans:
+            while True:
+                sink.write_columns(columns)
+                counts["attempts"] += len(columns["model"])
+                if done:
+                    break
+                cp, columns, done = _scan_log((key, run_id, cp, limit))
+            cp.mtime = stats[Path(key)].st_mtime
+            checkpoints[key] = cp
+            counts["read"] += 1
+    finally:
+        sink.close()
+
+    with (out_dir / AGGREGATE_FILE).open("w", newline="") as fh:
+        writer = csv.DictWriter(fh, AGGREGATE_FIELDS)
+        writer.writeheader()
+        for path in paths:
+            cp = checkpoints[str(path)]
+            if not cp.attempts:
+                continue
+            total_tasks = _total_tasks(path.parent)
+            for budget in sorted(BUDGETS):
+                solved = cp.counts.get(str(budget), len(cp.solved))
+                row = {
+                    "model": cp.model,
+                    "run_id": _run_id(path, log_dir),
+                    "budget": budget,
+                    "solved": solved,
+                }
+                if total_tasks:
+                    row["pass_rate"] = solved / total_tasks
+                writer.writerow(row)
+
+    _save_state(state_path, checkpoints, per_call_format)
+    return counts
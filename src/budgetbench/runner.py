@@ -3,26 +3,41 @@
 from __future__ import annotations
 
 import ast
-import json
+import functools
 import re
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Sequence
 
-from datasets import load_dataset
-from tqdm.auto import tqdm
-
-from .llm import chat_completion
-from .evaluator import evaluate
+from .attempt_log import ATTEMPTS_FILE, AttemptLog
+from .dataset import load_humaneval_rows
+from .llm import chat_completion, chat_samples
+from .evaluator import evaluate_suite
+from .problems import ProblemStore, as_problem_store, prompt_arg_names
+from .testplan import get_test_plan
 
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .cache import CompletionCache
+    from .sandbox import SandboxPool
+    from .tokens import TokenPolicy
 
 EXCLUDED_TASKS = {"HumanEval/151"}
 
 
-def load_humaneval_dataset() -> list[Dict[str, Any]]:
-    """Load the HumanEval dataset excluding known broken tasks."""
-    dataset = load_dataset("openai/openai_humaneval", split="test")
-    return [p for p in dataset if p["task_id"] not in EXCLUDED_TASKS]
+def load_humaneval_dataset() -> ProblemStore:
+    """Load the HumanEval dataset excluding known broken tasks.
+
+    The problems are read from the local snapshot written by
+    ``budgetbench-dataset snapshot`` when it exists, without importing
+    ``datasets``, and otherwise from the Hugging Face Hub.  They are returned
+    as a :class:`~budgetbench.problems.ProblemStore` indexed by ``task_id``;
+    build it once and pass it around.
+    """
+    return ProblemStore(load_humaneval_rows(), exclude=EXCLUDED_TASKS)
+
+
+_FENCE_RE = re.compile(r"```(?:python)?\n(.*?)```", re.IGNORECASE | re.DOTALL)
 
 
 def _extract_code(text: str) -> str:
@@ -31,12 +46,35 @@ def _extract_code(text: str) -> str:
     The helper searches for fenced code blocks (```python ... ```). When none are
     present the raw text is returned. Leading and trailing whitespace is removed.
     """
-    fences = re.findall(r"```(?:python)?\n(.*?)```", text, re.IGNORECASE | re.DOTALL)
+    fences = _FENCE_RE.findall(text)
     if fences:
         return fences[0].strip()
     return text.strip()
 
 
+def _code_complete(text: str, entry_point: str) -> bool:
+    """Return True once the block :func:`_extract_code` takes from ``text`` is final.
+
+    That is the first fenced block, once it is closed and defines
+    ``entry_point``; later text cannot change what is extracted.
+    """
+    match = _FENCE_RE.search(text)
+    if match is None:
+        return False
+    pattern = rf"^\s*(?:async\s+)?def\s+{re.escape(entry_point)}\s*\("
+    return re.search(pattern, match.group(1), re.MULTILINE) is not None
+
+
+def _stream_options(problem: Mapping[str, Any], stream: bool) -> Dict[str, Any]:
+    """Return the streaming arguments for a completion of ``problem``."""
+    if not stream:
+        return {}
+    return {
+        "stream": True,
+        "stop_when": functools.partial(_code_complete, entry_point=problem["entry_point"]),
+    }
+
+
 def _is_valid_python(code: str) -> bool:
     """Return True if ``code`` parses as valid Python."""
     try:
@@ -46,126 +84,361 @@ def _is_valid_python(code: str) -> bool:
         return False
 
 
-def _has_valid_signature(code: str, prompt: str, entry_point: str) -> bool:
-    """Check that ``code`` defines ``entry_point`` with the same arguments as ``prompt``."""
+def _has_valid_signature(
+    code: str,
+    prompt: str,
+    entry_point: str,
+    expected_args: Sequence[str] | None = None,
+) -> bool:
+    """Check that ``code`` defines ``entry_point`` with the same arguments as ``prompt``.
+
+    The reference is the prompt's ``entry_point`` function, or its first
+    function if it has none of that name (see
+    :func:`~budgetbench.problems.prompt_arg_names`), whether the problem is
+    a plain dictionary or a record.  Earlier versions checked dictionaries
+    against the first function, which differs for prompts with a helper
+    before the entry point, such as HumanEval/32.  ``expected_args`` may carry the prompt's
+    argument names when they are already known, e.g. from a
+    :class:`~budgetbench.problems.ProblemRecord`, to skip parsing ``prompt``.
+    """
     try:
         solution_tree = ast.parse(code)
-        prompt_tree = ast.parse(prompt)
     except SyntaxError:
         return False
-    expected = next(
-        node for node in prompt_tree.body if isinstance(node, ast.FunctionDef)
-    )
-    expected_args = [arg.arg for arg in expected.args.args]
+    if expected_args is None:
+        expected_args = prompt_arg_names(prompt, entry_point)
+        if expected_args is None:
+            return False
     for node in solution_tree.body:
         if isinstance(node, ast.FunctionDef) and node.name == entry_point:
             given_args = [arg.arg for arg in node.args.args]
-            return given_args == expected_args
+            return given_args == list(expected_args)
     return False
 
 
-def run_humaneval_task(
-    task_id: str,
-    model: str,
-    max_tokens: int = 10_240,
-    dataset: Iterable[Dict[str, Any]] | None = None,
+def _score_completion(
+    problem: Mapping[str, Any],
+    completion: Dict[str, Any],
+    pool: SandboxPool | None = None,
+    fail_fast: bool = False,
+    timeout: float = 1.0,
 ) -> Dict[str, Any]:
-    """Generate and evaluate a HumanEval task using ``model``.
+    """Extract, validate and evaluate the code in ``completion`` for ``problem``.
 
-    ``dataset`` may be provided to avoid repeated downloads when evaluating many
-    tasks. The returned dictionary contains the raw LLM output (``raw``), the
-    extracted code (``code``), booleans for syntax validity (``is_valid``) and
-    API compliance (``has_valid_signature``), along with the evaluation results
-    (``passed`` and ``total``) and token ``cost`` information.
+    Returns the result dictionary documented in :func:`run_humaneval_task`.
+    ``timeout`` bounds each assertion as in :func:`~budgetbench.evaluator.evaluate`.
     """
-    if dataset is None:
-        dataset = load_humaneval_dataset()
-    else:
-        dataset = [p for p in dataset if p["task_id"] not in EXCLUDED_TASKS]
-    problem = next(p for p in dataset if p["task_id"] == task_id)
-    completion = chat_completion(problem["prompt"], model=model, max_tokens=max_tokens)
     raw = completion["message"]
     code = _extract_code(raw)
     is_valid = _is_valid_python(code)
     has_valid_signature = _has_valid_signature(
-        code, problem["prompt"], problem["entry_point"]
+        code, problem["prompt"], problem["entry_point"], problem.get("arg_names")
     )
-    passed, total = evaluate(problem, code)
+    suite = evaluate_suite(problem, code, timeout, pool=pool, fail_fast=fail_fast)
     return {
         "raw": raw,
         "code": code,
         "is_valid": is_valid,
         "has_valid_signature": has_valid_signature,
-        "passed": passed,
-        "total": total,
+        "passed": suite.passed,
+        "total": suite.total,
+        "failed_at": suite.failed_at,
         "cost": completion.get("cost", {}),
+        "cached": completion.get("cached", False),
+        "ttft": completion.get("ttft"),
+        "stopped_early": completion.get("stopped_early", False),
+        "usage": completion.get("usage", {}),
+        "usage_estimated": completion.get("usage_estimated", False),
+        "finish_reason": completion.get("finish_reason"),
+        "hedge": completion.get("hedge"),
+        "shared_by": completion.get("shared_by", 1),
     }
 
 
+def _log_attempt(
+    log: AttemptLog, model: str, task_id: str, result: Dict[str, Any], correct: bool
+) -> None:
+    """Append one attempt of ``task_id`` to ``log`` under a fresh UUID."""
+    log.append(
+        {
+            "id": str(uuid.uuid4()),
+            "model": model,
+            "task_id": task_id,
+            "response": result["raw"],
+            "correct": correct,
+            "passed": result["passed"],
+            "total": result["total"],
+            "failed_at": result["failed_at"],
+            "cost": result.get("cost", {}),
+            "cached": result.get("cached", False),
+            "ttft": result.get("ttft"),
+            "stopped_early": result.get("stopped_early", False),
+            "usage": result.get("usage", {}),
+            "usage_estimated": result.get("usage_estimated", False),
+            "finish_reason": result.get("finish_reason"),
+            "hedge": result.get("hedge"),
+            "shared_by": result.get("shared_by", 1),
+        }
+    )
+
+
+def _token_limit(
+    policy: TokenPolicy | None, model: str, task_id: str, max_tokens: int
+) -> int:
+    """Return the ``max_tokens`` for the next attempt at ``task_id``."""
+    if policy is None:
+        return max_tokens
+    return policy.limit(model, task_id, max_tokens)
+
+
+def _observe_tokens(
+    policy: TokenPolicy | None, model: str, task_id: str, result: Mapping[str, Any]
+) -> None:
+    """Feed the token usage of an attempt back to ``policy``."""
+    if policy is not None and result.get("usage"):
+        policy.observe(
+            model,
+            task_id,
+            result["usage"],
+            result.get("finish_reason"),
+            partial=bool(result.get("usage_estimated") or result.get("stopped_early")),
+        )
+
+
+def _next_task(unsolved: List[str], cursor: int, busy: set) -> int | None:
+    """Return the index of the next task from ``cursor`` that is not ``busy``.
+
+    The search wraps around ``unsolved`` once; ``None`` means every unsolved
+    task already has a request in flight.
+    """
+    for offset in range(len(unsolved)):
+        idx = (cursor + offset) % len(unsolved)
+        if unsolved[idx] not in busy:
+            return idx
+    return None
+
+
+def run_humaneval_task(
+    task_id: str,
+    model: str,
+    max_tokens: int = 10_240,
+    dataset: Iterable[Dict[str, Any]] | None = None,
+    pool: SandboxPool | None = None,
+    fail_fast: bool = False,
+    cache: CompletionCache | None = None,
+    sample: int = 0,
+    stream: bool = False,
+) -> Dict[str, Any]:
+    """Generate and evaluate a HumanEval task using ``model``.
+
+    ``dataset`` may be provided to avoid repeated downloads when evaluating many
+    tasks; pass the :class:`~budgetbench.problems.ProblemStore` returned by
+    :func:`load_humaneval_dataset` so the task is found without a scan.
+    ``pool`` optionally runs the evaluation on a pre-forked
+    :class:`~budgetbench.sandbox.SandboxPool` worker and ``fail_fast`` stops
+    the evaluation at the first failing assertion. ``cache`` and ``sample``
+    are passed on to :func:`~budgetbench.llm.chat_completion`. With
+    ``stream`` the completion is streamed and cancelled as soon as the code
+    block :func:`_extract_code` would take is complete and defines the entry
+    point. The returned dictionary contains the raw LLM output (``raw``), the extracted code
+    (``code``), booleans for syntax validity (``is_valid``) and API compliance
+    (``has_valid_signature``), along with the evaluation results (``passed``,
+    ``total`` and the index of the first failing assertion, ``failed_at``) and
+    token ``cost`` information, plus whether the completion was replayed from
+    the cache (``cached``). Streamed completions also report the time to
+    their first token (``ttft``) and whether they were ``stopped_early``.
+    """
+    if dataset is None:
+        dataset = load_humaneval_dataset()
+    else:
+        dataset = as_problem_store(dataset, exclude=EXCLUDED_TASKS)
+    problem = dataset[task_id]
+    completion = chat_completion(
+        problem["prompt"],
+        model=model,
+        max_tokens=max_tokens,
+        cache=cache,
+        sample=sample,
+        **_stream_options(problem, stream),
+    )
+    return _score_completion(problem, completion, pool=pool, fail_fast=fail_fast)
+
+
+def run_humaneval_samples(
+    task_id: str,
+    n: int,
+    model: str,
+    max_tokens: int = 10_240,
+    dataset: Iterable[Dict[str, Any]] | None = None,
+    pool: SandboxPool | None = None,
+    fail_fast: bool = False,
+    cache: CompletionCache | None = None,
+    sample: int = 0,
+) -> List[Dict[str, Any]]:
+    """Generate ``n`` samples for a HumanEval task in one request and evaluate them.
+
+    The samples come from :func:`~budgetbench.llm.chat_samples`, which pays
+    for the prompt once and splits its cost across them, and are evaluated
+    concurrently.  Returns one :func:`run_humaneval_task` result per sample;
+    ``shared_by`` says how many samples shared the request that produced it.
+    """
+    if dataset is None:
+        dataset = load_humaneval_dataset()
+    else:
+        dataset = as_problem_store(dataset, exclude=EXCLUDED_TASKS)
+    problem = dataset[task_id]
+    completions = chat_samples(
+        problem["prompt"],
+        n,
+        model=model,
+        max_tokens=max_tokens,
+        cache=cache,
+        sample=sample,
+    )
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        return list(
+            executor.map(
+                lambda completion: _score_completion(
+                    problem, completion, pool=pool, fail_fast=fail_fast
+                ),
+                completions,
+            )
+        )
+
+
 def run_humaneval_until_budget(
     model: str,
     budget: float,
     log_dir: Path = Path("logs"),
     max_tokens: int = 10_240,
     show_progress: bool = False,
+    pool: SandboxPool | None = None,
+    plan_cache_dir: Path | None = None,
+    fail_fast: bool = True,
+    cache: CompletionCache | None = None,
+    attempt_log: AttemptLog | None = None,
+    stream: bool = False,
+    token_policy: TokenPolicy | None = None,
+    samples_per_request: int = 1,
 ) -> Dict[str, Any]:
     """Run HumanEval tasks until ``budget`` (USD) is exhausted.
 
     Tasks are attempted sequentially and repeatedly until either all tasks are
-    solved or the running cost exceeds ``budget``. Each attempt is logged as a
-    JSON file named with a UUID in ``log_dir`` containing the task identifier,
-    model name, raw LLM response, correctness flag and detailed cost
-    information.
+    solved or the running cost exceeds ``budget``. Each attempt is appended to
+    ``attempt_log``, by default an :class:`~budgetbench.attempt_log.AttemptLog`
+    on ``attempts.jsonl`` in ``log_dir``, as a record with a UUID and sequence
+    number, the task identifier, model name, raw LLM response, correctness
+    flag and detailed cost information.
 
     When ``show_progress`` is ``True`` a ``tqdm`` progress bar is displayed
-    tracking how much of the budget has been spent.
+    tracking how much of the budget has been spent. ``pool`` is passed on to
+    :func:`run_humaneval_task` to evaluate attempts on pre-forked sandboxes.
+    Every task's test plan is built (or read from ``plan_cache_dir``) once up
+    front so retries skip the test-suite parsing.
+
+    Only whether an attempt passes every assertion matters here, so by default
+    evaluation stops at the first failing assertion (``fail_fast``) and the
+    log records its index as ``failed_at``.  Pass ``fail_fast=False`` to score
+    every assertion, e.g. for per-assertion analytics.
+
+    With a completion ``cache`` the n-th attempt of a task replays the n-th
+    recorded response for it.  Replayed attempts still count their recorded
+    cost against ``budget`` so a replayed run retraces the original one.
+
+    ``stream`` is passed on to :func:`run_humaneval_task` to stop paying for
+    text generated after the solution's code block.
+
+    With a :class:`~budgetbench.tokens.TokenPolicy` each attempt's
+    ``max_tokens`` is chosen by the policy, capped at ``max_tokens``, and every
+    response is fed back to it, so limits shrink towards what each task
+    actually needs and grow again after a truncated response.
+
+    With ``samples_per_request`` above one, every turn of a task draws that
+    many samples from one request with :func:`run_humaneval_samples`, for
+    cheaper pass@k collection.  Each sample is logged as an attempt carrying
+    its share of the request's cost; the budget is checked between requests,
+    so the last one may overshoot it by up to all of its samples.  It cannot
+    be combined with ``stream``.
 
     The returned dictionary summarises the number of ``attempts``, how many were
-    ``correct`` and the ``total_cost`` spent.
+    ``correct``, the ``total_cost`` spent and how much of it was
+    ``replayed_cost`` served from the cache.
     """
-    dataset = load_humaneval_dataset()
-    tasks = [p["task_id"] for p in dataset]
+    if samples_per_request < 1:
+        raise ValueError("samples_per_request must be at least 1")
+    if samples_per_request > 1 and stream:
+        raise ValueError("Multi-sample requests cannot be streamed")
+    dataset = as_problem_store(load_humaneval_dataset())
+    for problem in dataset:
+        get_test_plan(problem, cache_dir=plan_cache_dir)
+    tasks = list(dataset.task_ids)
     unsolved = tasks.copy()
     attempts = 0
     total_cost = 0.0
+    replayed_cost = 0.0
     solved = set()
     problem_stats = {task_id: {"attempts": 0, "correct": False} for task_id in tasks}
     log_dir.mkdir(parents=True, exist_ok=True)
+    owns_log = attempt_log is None
+    if attempt_log is None:
+        attempt_log = AttemptLog(log_dir / ATTEMPTS_FILE)
     idx = 0
 
     progress = None
     if show_progress:
+        from tqdm.auto import tqdm
+
         progress = tqdm(total=budget, unit="USD", desc="Budget spent")
 
     try:
         while unsolved and total_cost < budget:
             task_id = unsolved[idx]
-            attempts += 1
-            result = run_humaneval_task(
-                task_id, model=model, max_tokens=max_tokens, dataset=dataset
-            )
-            problem_stats[task_id]["attempts"] += 1
-            correct = result["passed"] == result["total"]
-            problem_stats[task_id]["correct"] = (
-                problem_stats[task_id]["correct"] or correct
-            )
-            cost = float(result.get("cost", {}).get("total", 0.0))
-            total_cost += cost
-            if progress is not None:
-                progress.update(min(cost, budget - progress.n))
-
-            log_id = uuid.uuid4()
-            log_data = {
-                "id": str(log_id),
-                "model": model,
-                "task_id": task_id,
-                "response": result["raw"],
-                "correct": correct,
-                "cost": result.get("cost", {}),
-            }
-            log_file = log_dir / f"{log_id}.json"
-            with log_file.open("w") as fh:
-                json.dump(log_data, fh)
+            limit = _token_limit(token_policy, model, task_id, max_tokens)
+            sample = problem_stats[task_id]["attempts"]
+            if samples_per_request > 1:
+                results = run_humaneval_samples(
+                    task_id,
+                    samples_per_request,
+                    model=model,
+                    max_tokens=limit,
+                    dataset=dataset,
+                    pool=pool,
+                    fail_fast=fail_fast,
+                    cache=cache,
+                    sample=sample,
+                )
+            else:
+                results = [
+                    run_humaneval_task(
+                        task_id,
+                        model=model,
+                        max_tokens=limit,
+                        dataset=dataset,
+                        pool=pool,
+                        fail_fast=fail_fast,
+                        cache=cache,
+                        sample=sample,
+                        stream=stream,
+                    )
+                ]
+            correct = False
+            for result in results:
+                attempts += 1
+                problem_stats[task_id]["attempts"] += 1
+                sample_correct = result["passed"] == result["total"]
+                correct = correct or sample_correct
+                problem_stats[task_id]["correct"] = (
+                    problem_stats[task_id]["correct"] or sample_correct
+                )
+                cost = float(result.get("cost", {}).get("total", 0.0))
+                total_cost += cost
+                if result["cached"]:
+                    replayed_cost += cost
+                if progress is not None:
+                    progress.update(min(cost, budget - progress.n))
+
+                _observe_tokens(token_policy, model, task_id, result)
+                _log_attempt(attempt_log, model, task_id, result, sample_correct)
 
             if correct:
                 solved.add(task_id)
@@ -176,6 +449,8 @@ def run_humaneval_until_budget(
             else:
                 idx = (idx + 1) % len(unsolved)
     finally:
+        if owns_log:
+            attempt_log.close()
         if progress is not None:
             progress.close()
 
@@ -183,5 +458,6 @@ def run_humaneval_until_budget(
         "attempts": attempts,
         "correct": len(solved),
         "total_cost": total_cost,
+        "replayed_cost": replayed_cost,
         "per_problem": problem_stats,
     }
@@ -0,0 +1,195 @@
+"""Persistent pool of pre-forked sandbox workers for candidate execution."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from typing import Any, Iterable, List
+
+from .evaluator import _pad_outcomes, _run_suite
+
+# Standard library modules HumanEval solutions commonly import.  They are
+# loaded once in the fork server so sandboxes start with them already imported.
+PRELOAD_MODULES = [
+    "bisect",
+    "collections",
+    "fractions",
+    "functools",
+    "hashlib",
+    "heapq",
+    "itertools",
+    "math",
+    "operator",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "typing",
+    "budgetbench.sandbox",
+]
+
+
+def _worker_main(conn: Any) -> None:
+    """Serve sandbox jobs received over ``conn`` until told to stop.
+
+    The worker itself never runs untrusted code: every job is executed in a
+    child forked from it, which applies ``reliability_guard`` and is discarded
+    afterwards.  Once a child has exited the worker sends ``None`` to signal
+    that it is ready for the next job.
+    """
+    # Own process group so the pool can kill the worker and any hung child
+    # together.
+    os.setpgrp()
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the forked sandbox
+            try:
+                _run_suite(conn, *job)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        conn.send(None)
+
+
+class _Worker:
+    """Handle on a worker process and the parent's end of its pipe."""
+
+    def __init__(self, process: Any, conn: Any) -> None:
+        self.process = process
+        self.conn = conn
+        self.runs = 0
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class SandboxPool:
+    """Long-lived pool of pre-forked workers that execute candidate solutions.
+
+    Workers are started through a ``forkserver`` whose interpreter has
+    ``preload`` already imported, so creating one costs a fork rather than an
+    interpreter start.  Each job runs in a throwaway child of a worker with
+    the same guards as :func:`~budgetbench.evaluator.evaluate_suite`; the
+    worker is replaced after ``max_runs`` jobs, and killed and replaced as
+    soon as a job stops reporting within its timeout.
+
+    The pool is safe to share between threads; callers block until a worker
+    is idle.  Use it as a context manager or call :meth:`close` when done.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_runs: int = 100,
+        preload: Iterable[str] = PRELOAD_MODULES,
+    ) -> None:
+        if max_runs < 1:
+            raise ValueError("max_runs must be at least 1")
+        self.max_runs = max_runs
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(list(preload))
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(workers or os.cpu_count() or 1):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def run(
+        self,
+        program: str,
+        test_programs: bytes,
+        total: int,
+        timeout: float,
+        fail_fast: bool = False,
+    ) -> List[str]:
+        """Execute ``program`` and the ``total`` marshalled ``test_programs``.
+
+        Returns one outcome per test program; assertions the sandbox never
+        reported on are filled in as by
+        :func:`~budgetbench.evaluator.evaluate_suite`.
+        """
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+        worker = self._idle.get()
+        outcomes: List[str] = []
+        healthy = False
+        try:
+            worker.conn.send((program, test_programs, timeout, fail_fast))
+            while True:
+                wait = timeout + 1 if outcomes else 2 * timeout + 1
+                if not worker.conn.poll(wait):
+                    break
+                message = worker.conn.recv()
+                if message is None:
+                    healthy = True
+                    break
+                if len(outcomes) < total:
+                    outcomes.append(message)
+        except (EOFError, BrokenPipeError, OSError):
+            healthy = False
+        finally:
+            self._release(worker, healthy)
+        return _pad_outcomes(outcomes, total, fail_fast)
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        worker.runs += 1
+        with self._lock:
+            closed = self._closed
+        if not healthy:
+            worker.kill()
+        elif closed or worker.runs >= self.max_runs:
+            worker.stop()
+        else:
+            self._idle.put(worker)
+            return
+        if not closed:
+            self._idle.put(self._spawn())
+
+    def close(self) -> None:
+        """Stop all idle workers; busy workers stop when their job finishes."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+    def __enter__(self) -> SandboxPool:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
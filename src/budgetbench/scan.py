@@ -0,0 +1,25 @@
+"""Fan work over run directories out to a process pool."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_runs(
+    func: Callable[[T], R], items: Iterable[T], workers: int | None = None
+) -> Iterator[R]:
+    """Yield ``func(item)`` for each of ``items``, in order.
+
+    With ``workers`` above one the calls run on a process pool of that size,
+    otherwise in this process.  Results come back in input order either way,
+    so callers merging them produce identical output in both modes.
+    """
+    if workers is None or workers <= 1:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(func, items)
@@ -0,0 +1,144 @@
+"""Precompiled per-task test plans for the evaluator."""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import marshal
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType
+from typing import Any, Dict, Mapping, Tuple
+
+
+@dataclass(frozen=True)
+class TestPlan:
+    """A problem's test suite split into one compiled program per assertion.
+
+    Each program defines the ``check`` function with a single assertion as its
+    body and then calls it with the problem's entry point, mirroring the
+    program ``check_correctness`` would build for that assertion alone.
+    ``digest`` identifies the test source the plan was built from.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    task_id: str
+    digest: str
+    sources: Tuple[str, ...]
+    codes: Tuple[CodeType, ...]
+
+    @property
+    def total(self) -> int:
+        return len(self.codes)
+
+    def marshalled(self) -> bytes:
+        """Return ``codes`` serialised for sending to another process."""
+        return marshal.dumps(self.codes)
+
+
+_PLANS: Dict[str, TestPlan] = {}
+_PLANS_LOCK = threading.Lock()
+
+
+def _digest(problem: Mapping[str, Any]) -> str:
+    payload = problem["test"] + "\0" + problem["entry_point"]
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _split_asserts(test: str, entry_point: str) -> Tuple[str, ...]:
+    module_ast = ast.parse(test)
+    check_func = next(
+        node for node in module_ast.body if isinstance(node, ast.FunctionDef)
+    )
+    programs = []
+    for stmt in check_func.body:
+        if not isinstance(stmt, ast.Assert):
+            continue
+        test_func = ast.FunctionDef(
+            name=check_func.name,
+            args=check_func.args,
+            body=[stmt],
+            decorator_list=[],
+            returns=None,
+            type_comment=None,
+        )
+        test_module = ast.Module(body=[test_func], type_ignores=[])
+        test_src = ast.unparse(ast.fix_missing_locations(test_module))
+        programs.append(test_src + "\n" + f"{check_func.name}({entry_point})")
+    return tuple(programs)
+
+
+def _compile(sources: Tuple[str, ...]) -> Tuple[CodeType, ...]:
+    return tuple(compile(src, "<test>", "exec") for src in sources)
+
+
+def build_test_plan(problem: Mapping[str, Any]) -> TestPlan:
+    """Parse ``problem["test"]`` and compile one program per assertion."""
+    sources = _split_asserts(problem["test"], problem["entry_point"])
+    return TestPlan(
+        task_id=problem["task_id"],
+        digest=_digest(problem),
+        sources=sources,
+        codes=_compile(sources),
+    )
+
+
+def _cache_path(cache_dir: Path, digest: str) -> Path:
+    # Code objects are only valid for the interpreter that produced them, so
+    # the file name carries the same tag ``__pycache__`` uses.
+    return cache_dir / f"{digest}.{sys.implementation.cache_tag}.marshal"
+
+
+def _load_cached(cache_dir: Path, problem: Mapping[str, Any], digest: str) -> TestPlan | None:
+    path = _cache_path(cache_dir, digest)
+    try:
+        sources, codes = marshal.loads(path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return TestPlan(
+        task_id=problem["task_id"], digest=digest, sources=sources, codes=codes
+    )
+
+
+def _store_cached(cache_dir: Path, plan: TestPlan) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = _cache_path(cache_dir, plan.digest)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(marshal.dumps((plan.sources, plan.codes)))
+    tmp.replace(path)
+
+
+def get_test_plan(problem: Mapping[str, Any], cache_dir: Path | None = None) -> TestPlan:
+    """Return the :class:`TestPlan` for ``problem``, building it at most once.
+
+    Plans are memoised in process by ``task_id`` and rebuilt only if the
+    problem's test source changes.  When ``cache_dir`` is given, plans are
+    also read from and written to files there keyed by a hash of the test
+    source, so later processes skip the AST work entirely.
+    """
+    digest = _digest(problem)
+    task_id = problem["task_id"]
+    with _PLANS_LOCK:
+        plan = _PLANS.get(task_id)
+    if plan is not None and plan.digest == digest:
+        return plan
+
+    plan = None
+    if cache_dir is not None:
+        plan = _load_cached(Path(cache_dir), problem, digest)
+    if plan is None:
+        plan = build_test_plan(problem)
+        if cache_dir is not None:
+            _store_cached(Path(cache_dir), plan)
+    with _PLANS_LOCK:
+        _PLANS[task_id] = plan
+    return plan
+
+
+def clear_test_plans() -> None:
+    """Forget all memoised plans."""
+    with _PLANS_LOCK:
+        _PLANS.clear()
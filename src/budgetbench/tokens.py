@@ -0,0 +1,140 @@
+"""Adaptive per-task ``max_tokens`` limits learned from attempt logs."""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Tuple
+
+from .attempt_log import ATTEMPTS_FILE, read_attempt_log
+
+# Finish reason reported when a response was cut off at ``max_tokens``.
+TRUNCATED = "length"
+
+
+def token_demand(usage: Mapping[str, Any]) -> int:
+    """Return the output tokens a response was charged for.
+
+    That is its completion plus reasoning tokens, the quantity a
+    ``max_tokens`` limit has to accommodate.
+    """
+    return int(usage.get("completion_tokens", 0) or 0) + int(
+        usage.get("reasoning_tokens", 0) or 0
+    )
+
+
+def _quantile(values: List[int], q: float) -> float:
+    """Return the ``q`` quantile of the sorted ``values``, interpolating linearly."""
+    pos = q * (len(values) - 1)
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+@dataclass
+class TokenPolicy:
+    """Choose each request's ``max_tokens`` from the tokens earlier responses used.
+
+    Complete responses are recorded per ``(model, task_id)`` with
+    :meth:`observe`.  :meth:`limit` then returns the ``quantile`` of the
+    task's token demand times ``headroom``, falling back to the model's demand
+    over all tasks while the task has fewer than ``min_samples`` responses,
+    and to the caller's ceiling while the model has too few as well.  Limits
+    never drop below ``floor``.
+
+    A truncated response (finish reason ``"length"``) only says the task
+    needed more than it was given, so it is not added to the distribution;
+    instead the task's next limit is at least ``growth`` times the demand of
+    its largest truncated response, until a complete response shows what the
+    task actually needs and lifts that floor.  Responses whose usage was ``estimated``
+    and streams that were stopped early are ``partial`` and ignored: their
+    count ends where the stream was cancelled, which says nothing about
+    what the full answer would have needed.  The policy may be shared
+    between threads.
+    """
+
+    quantile: float = 0.95
+    headroom: float = 1.25
+    min_samples: int = 3
+    floor: int = 256
+    growth: float = 2.0
+    _tasks: Dict[Tuple[str, str], List[int]] = field(default_factory=dict, repr=False)
+    _models: Dict[str, List[int]] = field(default_factory=dict, repr=False)
+    _truncated: Dict[Tuple[str, str], int] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.quantile <= 1.0:
+            raise ValueError("quantile must be in (0, 1]")
+        if self.headroom < 1.0 or self.growth <= 1.0:
+            raise ValueError("headroom must be at least 1 and growth above 1")
+        if self.min_samples < 1:
+            raise ValueError("min_samples must be positive")
+
+    def observe(
+        self,
+        model: str,
+        task_id: str,
+        usage: Mapping[str, Any],
+        finish_reason: str | None = None,
+        partial: bool = False,
+    ) -> None:
+        """Record the ``usage`` of one response of ``model`` to ``task_id``."""
+        if partial:
+            return
+        demand = token_demand(usage)
+        key = (model, task_id)
+        with self._lock:
+            if finish_reason == TRUNCATED:
+                self._truncated[key] = max(self._truncated.get(key, 0), demand)
+                return
+            self._truncated.pop(key, None)
+            bisect.insort(self._tasks.setdefault(key, []), demand)
+            bisect.insort(self._models.setdefault(model, []), demand)
+
+    def limit(self, model: str, task_id: str, ceiling: int) -> int:
+        """Return the ``max_tokens`` for the next request, at most ``ceiling``."""
+        key = (model, task_id)
+        with self._lock:
+            samples = self._tasks.get(key, [])
+            if len(samples) < self.min_samples:
+                samples = self._models.get(model, [])
+            if len(samples) < self.min_samples:
+                limit = ceiling
+            else:
+                limit = math.ceil(_quantile(samples, self.quantile) * self.headroom)
+            truncated = self._truncated.get(key)
+        if truncated is not None:
+            limit = max(limit, math.ceil(truncated * self.growth))
+        return max(min(limit, ceiling), min(self.floor, ceiling))
+
+    def observe_log(self, path: Path) -> int:
+        """Record every attempt in the log at ``path`` and return how many."""
+        count = 0
+        for record in read_attempt_log(path):
+            usage = record.get("usage")
+            if not usage or record.get("usage_estimated") or record.get("stopped_early"):
+                continue
+            self.observe(
+                record.get("model", ""),
+                record["task_id"],
+                usage,
+                record.get("finish_reason"),
+            )
+            count += 1
+        return count
+
+    @classmethod
+    def from_logs(cls, log_dir: Path, **kwargs: Any) -> TokenPolicy:
+        """Return a policy primed with every attempts log under ``log_dir``.
+
+        Attempts logged before usage was recorded are skipped.  ``kwargs``
+        configure the policy.
+        """
+        policy = cls(**kwargs)
+        for path in sorted(Path(log_dir).rglob(ATTEMPTS_FILE)):
+            policy.observe_log(path)
+        return policy
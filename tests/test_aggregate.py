@@ -3,7 +3,11 @@ from pathlib import Path
 
 import pytest
 
-from budgetbench.aggregate import collect_correct_milestones, write_milestones_csv
+from budgetbench.aggregate import (
+    collect_correct_milestones,
+    iter_correct_milestones,
+    write_milestones_csv,
+)
 
 
 def _write_attempts(path: Path, rows: list[dict]) -> None:
@@ -60,3 +64,59 @@ def test_collect_correct_milestones(tmp_path: Path) -> None:
     assert content[1] == "model-a,2,0.3000,1"
     assert content[2] == "model-a,4,1.0000,2"
     assert content[3] == "model-b,1,0.0500,1"
+
+
+def test_iter_correct_milestones_merges_files_in_order(tmp_path: Path) -> None:
+    log_dir = tmp_path / "logs"
+    for run, model, flags in [
+        ("z-run", "model-a", [True, False, True]),
+        ("a-run", "model-b", [True]),
+        ("m-run", "model-a", [False, True]),
+    ]:
+        run_dir = log_dir / run
+        run_dir.mkdir(parents=True)
+        _write_attempts(
+            run_dir / "attempts.jsonl",
+            [{"model": model, "correct": flag, "cost": {"total": 0.1}} for flag in flags],
+        )
+
+    milestones = iter_correct_milestones(log_dir)
+    assert not isinstance(milestones, list)
+    keys = [(m["model"], m["attempts"]) for m in milestones]
+    assert keys == [("model-a", 1), ("model-a", 2), ("model-a", 3), ("model-b", 1)]
+    assert write_milestones_csv(iter_correct_milestones(log_dir), tmp_path / "m.csv") == 4
+
+
+def test_milestones_hold_one_log_open_and_key_on_model(tmp_path: Path, monkeypatch) -> None:
+    import budgetbench.aggregate as aggregate
+
+    log_dir = tmp_path / "logs"
+    for n in range(5):
+        run_dir = log_dir / f"run-{n}"
+        run_dir.mkdir(parents=True)
+        # Each file interleaves two models' attempts.
+        _write_attempts(
+            run_dir / "attempts.jsonl",
+            [
+                {"model": "model-b", "correct": True, "cost": {"total": 0.1}},
+                {"model": "model-a", "correct": False, "cost": {"total": 0.1}},
+                {"model": "model-a", "correct": True, "cost": {"total": 0.1}},
+            ],
+        )
+    state = {"open": 0, "peak": 0}
+    read = aggregate.read_attempt_log
+
+    def counting_read(path):
+        state["open"] += 1
+        state["peak"] = max(state["peak"], state["open"])
+        try:
+            yield from read(path)
+        finally:
+            state["open"] -= 1
+
+    monkeypatch.setattr(aggregate, "read_attempt_log", counting_read)
+    milestones = list(iter_correct_milestones(log_dir))
+    assert state["peak"] == 1
+    assert [(m["model"], m["attempts"], m["correct"]) for m in milestones] == (
+        [("model-a", 2, 1)] * 5 + [("model-b", 1, 1)] * 5
+    )
@@ -0,0 +1,107 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import budgetbench.async_runner as async_runner
+from budgetbench.attempt_log import read_attempt_log
+from budgetbench.budget import BudgetLedger
+from budgetbench.llm_cost import LLM_COSTS, estimate_max_cost
+
+
+PROBLEMS = [
+    {
+        "task_id": f"Inline/{n}",
+        "prompt": f"def f{n}(x: int) -> int:\n    \"\"\"Return {n}.\"\"\"\n",
+        "entry_point": f"f{n}",
+        "test": f"def check(candidate):\n    assert candidate(1) == {n}\n",
+    }
+    for n in range(3)
+]
+
+
+def test_estimate_max_cost_bounds_prompt_and_completion():
+    info = LLM_COSTS["openai/gpt-5"]
+    estimate = estimate_max_cost("hello", "openai/gpt-5", 100)
+    assert estimate >= 5 * info.prompt + 100 * info.completion
+    assert estimate_max_cost("hello", "unknown/model", 100) == 0.0
+
+
+def test_budget_ledger_admits_one_request_past_the_ceiling():
+    ledger = BudgetLedger(1.0)
+    assert ledger.try_reserve(5.0)
+    assert not ledger.try_reserve(0.1)
+    ledger.settle(5.0, 0.4)
+    assert ledger.try_reserve(0.5)
+    assert not ledger.try_reserve(0.2)
+    ledger.settle(0.5, 0.7)
+    assert ledger.exhausted
+    assert not ledger.try_reserve(0.0)
+    assert ledger.spent == pytest.approx(1.1)
+
+
+def test_async_runner_solves_tasks_concurrently(tmp_path: Path, monkeypatch):
+    calls = {"active": 0, "peak": 0, "count": 0}
+
+    async def fake_completion(prompt, model=None, max_tokens=0, **kwargs):
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        calls["active"] -= 1
+        name = prompt.split("(")[0][len("def "):]
+        # Every task's first attempt is wrong, the second one is right.
+        value = int(name[1:]) if calls["count"] > len(PROBLEMS) else -1
+        return {
+            "message": f"```python\ndef {name}(x: int) -> int:\n    return {value}\n```",
+            "usage": {},
+            "cost": {"total": 0.01},
+        }
+
+    monkeypatch.setattr(async_runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(async_runner, "achat_completion", fake_completion)
+    summary = asyncio.run(
+        async_runner.run_humaneval_until_budget_async(
+            model="unknown/model", budget=1.0, log_dir=tmp_path, concurrency=3
+        )
+    )
+    assert summary["correct"] == 3
+    assert summary["attempts"] == 6
+    assert summary["total_cost"] == pytest.approx(0.06)
+    assert calls["peak"] == 3
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert [log["seq"] for log in logs] == list(range(6))
+    assert sum(log["correct"] for log in logs) == 3
+
+
+def test_async_runner_reserves_both_calls_of_a_hedged_request(tmp_path: Path, monkeypatch):
+    from budgetbench import llm
+    from budgetbench.hedge import HedgePolicy
+
+    model = "openai/gpt-5"
+    single = estimate_max_cost(PROBLEMS[0]["prompt"], model, 100)
+    calls = {"active": 0, "peak": 0}
+
+    async def hedged_completion(prompt, model=None, max_tokens=0, **kwargs):
+        # Every request is hedged and both of its calls are charged.
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        await asyncio.sleep(0.01)
+        calls["active"] -= 1
+        return {
+            "message": "```python\ndef nope():\n    pass\n```",
+            "usage": {},
+            "cost": {"total": 2 * estimate_max_cost(prompt, model, max_tokens)},
+        }
+
+    monkeypatch.setattr(async_runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(async_runner, "achat_completion", hedged_completion)
+    monkeypatch.setattr(llm, "HEDGE_POLICY", HedgePolicy())
+    summary = asyncio.run(
+        async_runner.run_humaneval_until_budget_async(
+            model=model, budget=2 * single, log_dir=tmp_path, max_tokens=100, concurrency=3
+        )
+    )
+    assert calls["peak"] == 1
+    assert summary["attempts"] == 1
+    assert summary["total_cost"] <= 2 * single
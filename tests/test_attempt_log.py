@@ -0,0 +1,45 @@
+import json
+import threading
+
+from budgetbench.attempt_log import AttemptLog, read_attempt_log
+
+
+def test_sequence_numbers_continue_after_reopen(tmp_path):
+    path = tmp_path / "attempts.jsonl"
+    with AttemptLog(path) as log:
+        assert log.append({"id": "a"}) == 0
+        assert log.append({"id": "b"}) == 1
+    with AttemptLog(path) as log:
+        assert log.append({"id": "c"}) == 2
+    records = list(read_attempt_log(path))
+    assert [(r["seq"], r["id"]) for r in records] == [(0, "a"), (1, "b"), (2, "c")]
+
+
+def test_partial_line_is_recovered(tmp_path):
+    path = tmp_path / "attempts.jsonl"
+    with AttemptLog(path) as log:
+        log.append({"id": "a"})
+    with path.open("ab") as fh:
+        fh.write(b'{"seq": 1, "id": "tru')  # crash mid-write
+    assert [r["id"] for r in read_attempt_log(path)] == ["a"]
+
+    with AttemptLog(path) as log:
+        assert log.append({"id": "b"}) == 1
+    assert path.read_text().splitlines()[1] == json.dumps({"seq": 1, "id": "b"})
+
+
+def test_buffering_and_legacy_files(tmp_path):
+    path = tmp_path / "attempts.jsonl"
+    log = AttemptLog(path, flush_every=0, fsync=True, legacy_dir=tmp_path)
+    threads = [
+        threading.Thread(target=log.append, args=({"id": str(n)},)) for n in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    records = list(read_attempt_log(path))
+    assert sorted(r["seq"] for r in records) == list(range(20))
+    assert len(list(tmp_path.glob("*.json"))) == 20
+    assert json.loads((tmp_path / "3.json").read_text())["id"] == "3"
@@ -0,0 +1,171 @@
+import json
+import types
+from pathlib import Path
+
+import pytest
+
+import budgetbench.batch_runner as batch_runner
+from budgetbench.attempt_log import read_attempt_log
+from budgetbench.batch import (
+    LocalBatchClient,
+    batch_price_factor,
+    batch_request,
+    batch_result,
+    iter_batch_results,
+    submit_batch,
+    wait_for_batch,
+)
+from budgetbench.cache import CompletionCache
+from budgetbench.llm_cost import LLM_COSTS
+
+
+PROBLEMS = [
+    {
+        "task_id": f"Inline/{n}",
+        "prompt": f"def f{n}(x: int) -> int:\n    \"\"\"Return {n}.\"\"\"\n",
+        "entry_point": f"f{n}",
+        "test": f"def check(candidate):\n    assert candidate(1) == {n}\n",
+    }
+    for n in range(3)
+]
+
+
+def _completion(content):
+    return {
+        "id": "chatcmpl-local",
+        "object": "chat.completion",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+    }
+
+
+def test_local_client_runs_a_batch_after_polling(tmp_path: Path):
+    def responder(body):
+        prompt = body["messages"][0]["content"]
+        if prompt == "fail":
+            raise ValueError("no answer")
+        return _completion(prompt.upper())
+
+    client = LocalBatchClient(tmp_path, responder=responder, polls=2)
+    batch_id = submit_batch(
+        client,
+        [batch_request("a", "m", "hello", 5), batch_request("b", "m", "fail", 5)],
+    )
+    assert client.batches.retrieve(batch_id).status == "in_progress"
+    batch = wait_for_batch(client, batch_id, poll_interval=0)
+    assert batch.status == "completed"
+    assert vars(batch.request_counts) == {"total": 2, "completed": 1, "failed": 1}
+    results = list(iter_batch_results(client, batch))
+    assert results[0][:2] == ("a", _completion("HELLO"))
+    assert results[1][0] == "b" and results[1][1] is None
+    assert results[1][2]["message"] == "no answer"
+    # The batch state lives on disk, so another client can pick it up.
+    assert LocalBatchClient(tmp_path).batches.retrieve(batch_id).status == "completed"
+
+
+def test_batch_result_applies_the_price_factor():
+    result = batch_result(_completion("hi"), "openai/gpt-5", 0.5)
+    info = LLM_COSTS["openai/gpt-5"]
+    assert result["message"] == "hi"
+    assert result["finish_reason"] == "stop"
+    assert result["cost"]["total"] == pytest.approx(0.5 * (10 * info.prompt + 5 * info.completion))
+
+
+def test_batch_discount_only_applies_to_providers_that_bill_it(tmp_path: Path):
+    openai = types.SimpleNamespace(base_url="https://api.openai.com/v1/")
+    openrouter = types.SimpleNamespace(base_url="https://openrouter.ai/api/v1")
+    assert batch_price_factor(openai) == 0.5
+    assert batch_price_factor(openrouter) == 1.0
+    assert batch_price_factor(LocalBatchClient(tmp_path)) == 1.0
+
+
+def test_batch_runner_gives_up_on_tasks_that_keep_failing(tmp_path: Path, monkeypatch):
+    def responder(body):
+        prompt = body["messages"][0]["content"]
+        name = prompt.split("(")[0][len("def "):]
+        if name == "f1":
+            raise RuntimeError("always rejected")
+        return _completion(f"```python\ndef {name}(x: int) -> int:\n    return {name[1:]}\n```")
+
+    monkeypatch.setattr(batch_runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    summary = batch_runner.run_humaneval_batches(
+        model="unknown/model",
+        budget=1.0,
+        log_dir=tmp_path / "logs",
+        client=LocalBatchClient(tmp_path / "batches", responder=responder),
+        poll_interval=0,
+        max_failures=2,
+    )
+    # The run ends with a summary once f1 has failed twice, budget to spare.
+    assert summary["correct"] == 2
+    assert summary["rounds"] == 2
+    assert summary["abandoned"] == ["Inline/1"]
+    assert summary["failed_requests"] == 2
+    assert summary["per_problem"]["Inline/1"]["attempts"] == 0
+
+
+def test_batch_runner_retries_unsolved_tasks_each_round(tmp_path: Path, monkeypatch):
+    seen = []
+
+    def responder(body):
+        prompt = body["messages"][0]["content"]
+        name = prompt.split("(")[0][len("def "):]
+        seen.append(name)
+        attempt = seen.count(name)
+        if name == "f2" and attempt == 1:
+            raise RuntimeError("overloaded")
+        # Every task's first answer is wrong, the second one is right.
+        value = int(name[1:]) if attempt >= 2 else -1
+        return _completion(f"```python\ndef {name}(x: int) -> int:\n    return {value}\n```")
+
+    monkeypatch.setattr(batch_runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    client = LocalBatchClient(tmp_path / "batches", responder=responder)
+    with CompletionCache(tmp_path / "cache.sqlite") as cache:
+        summary = batch_runner.run_humaneval_batches(
+            model="unknown/model",
+            budget=1.0,
+            log_dir=tmp_path / "logs",
+            client=client,
+            poll_interval=0,
+            cache=cache,
+        )
+    assert summary["correct"] == 3
+    assert summary["rounds"] == 2
+    assert summary["failed_requests"] == 1
+    assert summary["attempts"] == 5
+    logs = list(read_attempt_log(tmp_path / "logs" / "attempts.jsonl"))
+    assert [(log["task_id"], log["correct"]) for log in logs] == [
+        ("Inline/0", False),
+        ("Inline/1", False),
+        ("Inline/0", True),
+        ("Inline/1", True),
+        ("Inline/2", True),
+    ]
+    batches = sorted((tmp_path / "batches" / "batches").glob("*.json"))
+    assert len(batches) == 2
+    assert all(json.loads(p.read_text())["status"] == "completed" for p in batches)
+
+    # A second run replays every response from the cache without a batch.
+    def no_responder(body):
+        raise AssertionError("unexpected request")
+
+    replay_client = LocalBatchClient(tmp_path / "replay", responder=no_responder)
+    with CompletionCache(tmp_path / "cache.sqlite", mode="replay") as cache:
+        replay = batch_runner.run_humaneval_batches(
+            model="unknown/model",
+            budget=1.0,
+            log_dir=tmp_path / "replay-logs",
+            client=replay_client,
+            poll_interval=0,
+            cache=cache,
+        )
+    assert replay["correct"] == 3
+    assert replay["attempts"] == 5
+    assert replay["total_cost"] == pytest.approx(summary["total_cost"])
+    assert not list((tmp_path / "replay" / "batches").glob("*.json"))
@@ -1,11 +1,11 @@
 """Integration test for running tasks within a budget."""
 from __future__ import annotations
 
-import json
 from pathlib import Path
 
 import pytest
 
+from budgetbench.attempt_log import read_attempt_log
 from budgetbench.runner import run_humaneval_until_budget
 
 
@@ -20,8 +20,7 @@ def test_run_humaneval_until_budget(tmp_path: Path) -> None:
     assert "per_problem" in result
     assert any(s["attempts"] > 0 for s in result["per_problem"].values())
 
-    logs = list(tmp_path.glob("*.json"))
-    assert logs, "no log files written"
-    with logs[0].open() as fh:
-        data = json.load(fh)
-    assert {"task_id", "model", "response", "correct", "cost"} <= data.keys()
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert logs, "no attempts logged"
+    data = logs[0]
+    assert {"seq", "task_id", "model", "response", "correct", "cost"} <= data.keys()
@@ -0,0 +1,62 @@
+import types
+from pathlib import Path
+
+import pytest
+
+from budgetbench import llm
+from budgetbench.cache import CacheMissError, CompletionCache, cache_key
+
+
+def _fake_client(calls: list):
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = types.SimpleNamespace(content=f"answer {len(calls)}")
+        usage = types.SimpleNamespace(prompt_tokens=10, completion_tokens=20)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=message)], usage=usage
+        )
+
+    completions = types.SimpleNamespace(create=create)
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+
+
+def test_chat_completion_replays_from_cache(tmp_path: Path, monkeypatch):
+    calls: list = []
+    monkeypatch.setattr(llm, "get_client", lambda: _fake_client(calls))
+    model = "openai/gpt-5"
+
+    with CompletionCache(tmp_path / "cache.sqlite") as cache:
+        first = llm.chat_completion("p", model=model, cache=cache)
+        again = llm.chat_completion("p", model=model, cache=cache)
+        retry = llm.chat_completion("p", model=model, cache=cache, sample=1)
+        assert len(calls) == 2
+        assert first["cached"] is False and again["cached"] is True
+        assert again["message"] == first["message"] == "answer 1"
+        assert retry["message"] == "answer 2"
+        assert cache.stats.hits == 1 and cache.stats.misses == 2
+        assert cache.stats.replayed_cost == pytest.approx(first["cost"]["total"])
+        assert cache.stats.actual_spend == pytest.approx(2 * first["cost"]["total"])
+
+    with CompletionCache(tmp_path / "cache.sqlite", mode="replay") as cache:
+        assert llm.chat_completion("p", model=model, cache=cache, sample=1)["cached"]
+        with pytest.raises(CacheMissError):
+            llm.chat_completion("p", model=model, cache=cache, sample=2)
+    assert len(calls) == 2
+
+    with CompletionCache(tmp_path / "cache.sqlite", mode="record") as cache:
+        assert llm.chat_completion("p", model=model, cache=cache)["message"] == "answer 3"
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    with CompletionCache(tmp_path / "cache.sqlite", max_entries=2) as cache:
+        keys = [cache_key("m", str(n), 1) for n in range(3)]
+        cache.put(keys[0], {"message": "0"})
+        cache.put(keys[1], {"message": "1"})
+        assert cache.get(keys[0]) is not None
+        cache.put(keys[2], {"message": "2"})
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == {"message": "0"}
+
+    with CompletionCache(tmp_path / "ttl.sqlite", ttl=-1) as cache:
+        cache.put(keys[0], {"message": "0"})
+        assert cache.get(keys[0]) is None
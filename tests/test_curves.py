@@ -0,0 +1,100 @@
+import csv
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from budgetbench.curves import (
+    budget_grid,
+    iter_budget_curves,
+    run_arrays,
+    solved_at,
+    write_budget_curves_csv,
+)
+from budgetbench.reports import BUDGETS, aggregate
+
+
+def _reference(costs, tasks, correct, budget):
+    solved = set()
+    cumulative = 0.0
+    for cost, task, ok in zip(costs, tasks, correct):
+        cumulative += cost
+        if ok:
+            solved.add(task)
+        if cumulative >= budget:
+            return len(solved)
+    return len(solved)
+
+
+def test_solved_at_matches_loop():
+    rng = random.Random(0)
+    costs = [rng.uniform(0, 0.01) for _ in range(500)]
+    tasks = [f"T/{rng.randrange(40)}" for _ in range(500)]
+    correct = [rng.random() < 0.3 for _ in range(500)]
+    grid = budget_grid(1e-4, 10.0, points=300)
+    solved = solved_at(*run_arrays(costs, tasks, correct), grid)
+    expected = [_reference(costs, tasks, correct, b) for b in grid]
+    assert solved.tolist() == expected
+    assert solved_at(np.array([]), np.array([], dtype=bool), grid).tolist() == [0] * 300
+
+
+def test_budget_grid_spacing():
+    grid = budget_grid(0.001, 10, points=5)
+    assert grid == pytest.approx([0.001, 0.01, 0.1, 1, 10])
+    assert budget_grid(0, 1, points=3, log=False).tolist() == [0, 0.5, 1]
+
+
+def test_curves_agree_with_budget_table(tmp_path: Path):
+    run_dir = tmp_path / "logs" / "run-1"
+    run_dir.mkdir(parents=True)
+    rows = [
+        {"model": "m", "task_id": "T/0", "correct": True, "cost": {"total": 0.0005}},
+        {"model": "m", "task_id": "T/1", "correct": False, "cost": {"total": 0.004}},
+        {"model": "m", "task_id": "T/1", "correct": True, "cost": {"total": 0.2}},
+        {"model": "m", "task_id": "T/1", "correct": True, "cost": {"total": 0.9}},
+    ]
+    with (run_dir / "attempts.jsonl").open("w") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+    (run_dir / "summary.json").write_text(json.dumps({"per_problem": {"T/0": {}, "T/1": {}}}))
+
+    aggregate(tmp_path / "logs", tmp_path / "out")
+    with (tmp_path / "out" / "aggregate_by_budget.csv").open() as fh:
+        table = [int(row["solved"]) for row in csv.DictReader(fh)]
+
+    (curve,) = iter_budget_curves(tmp_path / "logs", BUDGETS)
+    assert curve["solved"].tolist() == table
+    assert curve["pass_rate"].tolist() == [s / 2 for s in table]
+
+    write_budget_curves_csv([curve], tmp_path / "curves.csv")
+    lines = (tmp_path / "curves.csv").read_text().splitlines()
+    assert lines[0] == "model,run_id,budget,solved,pass_rate"
+    assert lines[1] == "m,run-1,0.001,1,0.5"
+
+
+def test_curves_from_parquet_per_call(tmp_path: Path):
+    pytest.importorskip("pyarrow")
+    from budgetbench.curves import curves_from_per_call
+    from budgetbench.reports import load_per_call
+
+    # Two runs of the same model share a directory name under different parents.
+    for run, flags in [("a/run-1", [False, True]), ("b/run-1", [True, True])]:
+        run_dir = tmp_path / "logs" / run
+        run_dir.mkdir(parents=True)
+        with (run_dir / "attempts.jsonl").open("w") as fh:
+            for n, flag in enumerate(flags):
+                row = {"model": "m", "task_id": f"T/{n}", "correct": flag, "cost": {"total": 0.1}}
+                fh.write(json.dumps(row) + "\n")
+    aggregate(tmp_path / "logs", tmp_path / "out", per_call_format="parquet")
+
+    curves = curves_from_per_call(load_per_call(tmp_path / "out"), [0.05, 0.15, 1.0])
+    assert [(c["run_id"], c["solved"].tolist()) for c in curves] == [
+        ("a/run-1", [0, 1, 1]),
+        ("b/run-1", [1, 2, 2]),
+    ]
+    from_logs = iter_budget_curves(tmp_path / "logs", [0.05, 0.15, 1.0])
+    assert [(c["run_id"], c["solved"].tolist()) for c in from_logs] == [
+        (c["run_id"], c["solved"].tolist()) for c in curves
+    ]
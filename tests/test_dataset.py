@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import pytest
+
+import budgetbench.dataset as dataset
+import budgetbench.runner as runner
+from budgetbench.dataset import SnapshotError, read_snapshot, write_snapshot
+
+
+ROWS = [
+    {
+        "task_id": f"HumanEval/{n}",
+        "prompt": f"def f{n}():\n",
+        "canonical_solution": "    return 1\n",
+        "test": "def check(candidate):\n    assert candidate() == 1\n",
+        "entry_point": f"f{n}",
+        "extra": "dropped",
+    }
+    for n in (1, 151, 2)
+]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "humaneval.json.gz"
+    write_snapshot(ROWS, path)
+    rows = read_snapshot(path)
+    assert [r["task_id"] for r in rows] == ["HumanEval/1", "HumanEval/151", "HumanEval/2"]
+    assert "extra" not in rows[0]
+
+
+def test_snapshot_detects_corruption(tmp_path):
+    path = tmp_path / "humaneval.json.gz"
+    write_snapshot(ROWS, path)
+    with gzip.open(path, "rt") as fh:
+        snapshot = json.load(fh)
+    snapshot["rows"][0]["prompt"] = "tampered"
+    with gzip.open(path, "wt") as fh:
+        json.dump(snapshot, fh)
+    with pytest.raises(SnapshotError, match="checksum"):
+        read_snapshot(path)
+
+    path.write_bytes(b"not gzip")
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+def test_runner_prefers_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "humaneval.json.gz"
+    write_snapshot(ROWS, path)
+    monkeypatch.setenv("BUDGETBENCH_DATASET", str(path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the hub should not be used")
+
+    monkeypatch.setattr(dataset, "load_dataset", fail)
+    store = runner.load_humaneval_dataset()
+    assert store.task_ids == ("HumanEval/1", "HumanEval/2")
@@ -2,23 +2,16 @@
 
 import pytest
 
-from datasets import load_dataset
-from budgetbench.evaluator import evaluate
+from budgetbench.evaluator import evaluate, evaluate_suite
+from budgetbench.runner import load_humaneval_dataset
 
 
 @pytest.fixture(scope="session")
 def problems():
-    ds = load_dataset("openai/openai_humaneval", split="test")
-
-    def by_task(task_id: str):
-        for prob in ds:
-            if prob["task_id"] == task_id:
-                return prob
-        raise ValueError(f"problem {task_id!r} not found")
-
+    store = load_humaneval_dataset()
     return {
-        "palindrome": by_task("HumanEval/10"),
-        "fizz_buzz": by_task("HumanEval/36"),
+        "palindrome": store["HumanEval/10"],
+        "fizz_buzz": store["HumanEval/36"],
     }
 
 
@@ -74,3 +67,56 @@ def fizz_buzz(n: int) -> int:
     assert 0 < passed < total
     passed, total = evaluate(problem, wrong)
     assert passed == 0
+
+
+INLINE_PROBLEM = {
+    "task_id": "Inline/0",
+    "prompt": "def add(a: int, b: int) -> int:\n",
+    "entry_point": "add",
+    "test": """
+
+METADATA = {}
+
+
+def check(candidate):
+    assert candidate(1, 2) == 3
+    assert candidate(2, 2) == 4
+    assert candidate(0, 0) == 0
+""",
+}
+
+
+def test_evaluate_suite_outcome_vector():
+    wrong = """
+    if a == 2:
+        while True:
+            pass
+    if a == 0:
+        raise ValueError("boom")
+    return a + b
+"""
+    result = evaluate_suite(INLINE_PROBLEM, wrong, timeout=0.5)
+    assert result.outcomes == ["passed", "timed out", "failed: boom"]
+    assert (result.passed, result.total) == (1, 3)
+    assert evaluate(INLINE_PROBLEM, "    return a + b\n") == (3, 3)
+
+
+def test_evaluate_suite_load_failure_fails_every_assert():
+    result = evaluate_suite(INLINE_PROBLEM, "    return a +\n")
+    assert result.total == 3
+    assert result.passed == 0
+    assert all(outcome.startswith("failed:") for outcome in result.outcomes)
+
+
+def test_evaluate_suite_fail_fast_stops_at_first_failure():
+    hangs_after_first = """
+    if a == 1:
+        return 0
+    while True:
+        pass
+"""
+    result = evaluate_suite(INLINE_PROBLEM, hangs_after_first, timeout=5, fail_fast=True)
+    assert result.outcomes[0].startswith("failed:")
+    assert result.outcomes[1:] == ["skipped", "skipped"]
+    assert result.failed_at == 0
+    assert evaluate_suite(INLINE_PROBLEM, "    return a + b\n", fail_fast=True).failed_at is None
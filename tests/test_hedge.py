@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+
+from budgetbench import llm
+from budgetbench.hedge import HedgePolicy, LatencyHistogram
+
+
+def _primed(model="m", latency=0.02, **kwargs):
+    kwargs = {"min_samples": 5, "min_delay": 0.0, "max_hedge_rate": 1.0, **kwargs}
+    policy = HedgePolicy(**kwargs)
+    for _ in range(5):
+        policy.record(model, latency)
+    return policy
+
+
+def _result(label, cost):
+    return {"message": label, "usage": {"completion_tokens": 1}, "cost": {"total": cost}}
+
+
+def test_histogram_quantiles_are_bucket_upper_edges():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    for seconds in [0.1] * 90 + [5.0] * 10:
+        histogram.record(seconds)
+    assert 0.1 <= histogram.quantile(0.9) < 0.11
+    assert 5.0 <= histogram.quantile(0.95) < 5.5
+    assert histogram.quantile(1.0) == histogram.quantile(0.95)
+
+
+def test_policy_waits_for_samples_and_caps_the_hedge_rate():
+    policy = HedgePolicy(min_samples=2, min_delay=0.5, max_hedge_rate=0.25)
+    assert policy.begin("m") is None
+    policy.record("m", 0.1)
+    policy.record("m", 0.1)
+    assert policy.begin("m") == 0.5
+    assert not policy.try_hedge("m")
+    policy.begin("m")
+    policy.begin("m")
+    assert policy.try_hedge("m")
+    assert not policy.try_hedge("m")
+    assert policy.hedge_rate("m") == 0.25
+
+
+def test_fast_requests_are_not_hedged():
+    policy = _primed(latency=1.0)
+    result = llm._hedged(lambda: _result("a", 1.0), "m", policy)
+    assert result == _result("a", 1.0)
+    assert policy.hedges == {}
+    assert policy.histograms["m"].count == 6
+
+
+def test_slow_request_is_hedged_and_both_calls_are_charged():
+    policy = _primed()
+    release = threading.Event()
+    calls = itertools.count()
+
+    def call():
+        if next(calls) == 0:
+            release.wait(5)
+            return _result("slow", 1.0)
+        return _result("fast", 2.0)
+
+    try:
+        result = llm._hedged(call, "m", policy)
+    finally:
+        release.set()
+    assert result["message"] == "fast"
+    assert result["cost"]["total"] == pytest.approx(4.0)
+    assert result["hedge"] == {"winner": "hedge", "loser_cost": 2.0, "loser_estimated": True}
+    assert policy.hedges == {"m": 1}
+
+
+def test_hedge_rate_cap_waits_for_the_primary():
+    policy = _primed(max_hedge_rate=0.0)
+
+    def call():
+        time.sleep(0.1)
+        return _result("slow", 1.0)
+
+    result = llm._hedged(call, "m", policy)
+    assert result == _result("slow", 1.0)
+
+
+def test_failed_hedge_falls_back_to_the_other_call():
+    policy = _primed()
+    calls = itertools.count()
+
+    def call():
+        if next(calls) == 0:
+            time.sleep(0.1)
+            return _result("slow", 1.0)
+        raise RuntimeError("boom")
+
+    result = llm._hedged(call, "m", policy)
+    assert result["message"] == "slow"
+    assert result["cost"]["total"] == 1.0 * 2
+    assert result["hedge"]["winner"] == "primary"
+
+
+def test_async_hedge_cancels_the_loser():
+    policy = _primed()
+    state = {"calls": 0, "cancelled": False}
+
+    async def call():
+        state["calls"] += 1
+        if state["calls"] == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+        return _result("fast", 2.0)
+
+    result = asyncio.run(llm._ahedged(call, "m", policy))
+    assert result["message"] == "fast"
+    assert result["cost"]["total"] == pytest.approx(4.0)
+    assert result["hedge"]["loser_estimated"]
+    assert state["cancelled"]
@@ -0,0 +1,91 @@
+"""Guard against import-time regressions of the package and its CLIs."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["datasets", "openai", "httpx", "tqdm", "human_eval"]
+
+# Generous ceiling (cumulative microseconds reported by ``-X importtime``);
+# pulling in any of ``HEAVY_MODULES`` alone costs more than this.
+IMPORT_BUDGET_US = 150_000
+
+
+def _import(module: str) -> tuple[int, list[str]]:
+    code = (
+        f"import json, sys; import {module}; "
+        f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    return cumulative, json.loads(proc.stdout)
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "budgetbench",
+        "budgetbench.aggregate",
+        "budgetbench.cli",
+        "budgetbench.debug",
+        "budgetbench.reeval",
+    ],
+)
+def test_import_is_cheap(module):
+    cumulative, heavy = _import(module)
+    assert heavy == []
+    assert cumulative < IMPORT_BUDGET_US
+
+
+def test_cli_help_skips_heavy_imports():
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "budgetbench.cli", "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {
+        line.split("|")[2].strip()
+        for line in proc.stderr.splitlines()
+        if line.count("|") == 2
+    }
+    assert not imported & set(HEAVY_MODULES)
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [
+        ["--pipeline", "--sandbox-workers", "2"],
+        ["--batch", "--stream"],
+        ["--batch-local", "dir", "--pipeline"],
+        ["--batch", "--concurrency", "4"],
+    ],
+)
+def test_cli_rejects_ignored_flag_combinations(flags):
+    proc = subprocess.run(
+        [sys.executable, "-m", "budgetbench.cli", "m", "1", *flags],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 2
+    assert "cannot be combined" in proc.stderr or "drop --sandbox-workers" in proc.stderr
+
+
+def test_lazy_public_api():
+    import budgetbench
+    from budgetbench.runner import run_humaneval_until_budget
+
+    assert budgetbench.run_humaneval_until_budget is run_humaneval_until_budget
+    with pytest.raises(AttributeError):
+        budgetbench.missing
@@ -1,5 +1,6 @@
 import types
 
+import httpx
 import pytest
 
 from budgetbench.llm import chat_completion
@@ -30,6 +31,7 @@ def test_chat_completion_usage_and_cost(monkeypatch):
                     return DummyCompletion()
 
     monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr("budgetbench.llm._CLIENTS", {})
     monkeypatch.setattr("budgetbench.llm.OpenAI", lambda **kwargs: DummyClient())
     result = chat_completion("prompt", model="openai/gpt-5")
     assert result["message"] == "hello"
@@ -50,3 +52,310 @@ def test_chat_completion_usage_and_cost(monkeypatch):
         + result["cost"]["reasoning"]
         + result["cost"]["completion"]
     )
+
+
+def test_get_client_reuses_clients_per_key(monkeypatch):
+    from budgetbench import llm
+
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    monkeypatch.setattr(llm, "_DOTENV_LOADED", True)
+
+    client = llm.get_client()
+    assert llm.get_client() is client
+    assert llm.get_client(api_key="test") is client
+    other = llm.get_client(base_url="http://localhost:1234/v1")
+    assert other is not client
+
+    llm.configure_http(max_connections=5)
+    try:
+        assert llm.HTTP_SETTINGS.max_connections == 5
+        assert llm.get_client() is not client
+    finally:
+        llm.configure_http(max_connections=llm.HTTPSettings.max_connections)
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = next(self._chunks)
+        self.consumed += 1
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+def _chunk(text=None, usage=None, reasoning=None):
+    delta = types.SimpleNamespace(content=text, reasoning=reasoning)
+    choices = [] if text is None and reasoning is None else [types.SimpleNamespace(delta=delta)]
+    return types.SimpleNamespace(id="gen-1", choices=choices, usage=usage)
+
+
+def _streaming_client(monkeypatch, stream, base_url="https://api.openai.com/v1", stats=None):
+    requests = []
+
+    class DummyClient:
+        class chat:  # noqa: D401 - simple namespace
+            class completions:  # noqa: D401 - simple namespace
+                @staticmethod
+                def create(**kwargs):
+                    requests.append(kwargs)
+                    return stream
+
+        @staticmethod
+        def get(path, cast_to, options):
+            requests.append({"path": path, **options})
+            request = httpx.Request("GET", f"{base_url}{path}")
+            if stats is None:
+                return httpx.Response(404, request=request)
+            return httpx.Response(200, json={"data": stats}, request=request)
+
+    DummyClient.base_url = base_url
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr("budgetbench.llm._CLIENTS", {})
+    monkeypatch.setattr("budgetbench.llm.OpenAI", lambda **kwargs: DummyClient())
+    return requests
+
+
+def test_streaming_stops_once_code_block_is_complete(monkeypatch):
+    from budgetbench.runner import _code_complete
+
+    stream = _FakeStream(
+        [
+            _chunk("Here:\n```python\n"),
+            _chunk("def add(a, b):\n    return a + b\n"),
+            _chunk("```"),
+            _chunk("\nThis function adds two numbers."),
+            _chunk(usage=types.SimpleNamespace(prompt_tokens=7, completion_tokens=20)),
+        ]
+    )
+    requests = _streaming_client(monkeypatch, stream)
+    result = chat_completion(
+        "prompt",
+        model="openai/gpt-5",
+        stream=True,
+        stop_when=lambda text: _code_complete(text, "add"),
+    )
+    assert requests[0]["stream"] is True
+    assert stream.consumed == 3 and stream.closed
+    assert result["message"].endswith("return a + b\n```")
+    assert result["stopped_early"] and result["usage_estimated"]
+    assert result["ttft"] is not None and result["ttft"] <= result["latency"]
+    # Cancelled before the usage chunk: estimated from the bytes received.
+    assert result["usage"]["prompt_tokens"] == len("prompt") + 32
+    assert result["usage"]["completion_tokens"] == len(result["message"].encode())
+    assert result["cost"]["total"] > 0
+
+
+def test_streaming_uses_reported_usage_when_read_to_the_end(monkeypatch):
+    stream = _FakeStream(
+        [
+            _chunk("hel"),
+            _chunk("lo"),
+            _chunk(usage=types.SimpleNamespace(prompt_tokens=7, completion_tokens=2)),
+        ]
+    )
+    _streaming_client(monkeypatch, stream)
+    result = chat_completion("prompt", model="openai/gpt-5", stream=True)
+    assert result["message"] == "hello"
+    assert not result["stopped_early"] and not result["usage_estimated"]
+    assert result["usage"]["prompt_tokens"] == 7
+    assert result["usage"]["completion_tokens"] == 2
+    assert stream.closed
+
+
+def _reasoning_stream():
+    return _FakeStream(
+        [
+            _chunk(reasoning="The user wants addition. " * 40),
+            _chunk(reasoning="Write it."),
+            _chunk("```python\ndef add(a, b):\n    return a + b\n```"),
+            _chunk("\nDone."),
+            _chunk(usage=types.SimpleNamespace(prompt_tokens=7, completion_tokens=900)),
+        ]
+    )
+
+
+def test_cancelled_streams_charge_reasoning(monkeypatch):
+    from budgetbench.runner import _code_complete
+
+    stream = _reasoning_stream()
+    requests = _streaming_client(monkeypatch, stream)
+    result = chat_completion(
+        "prompt",
+        model="openai/gpt-oss-20b",
+        stream=True,
+        stop_when=lambda text: _code_complete(text, "add"),
+    )
+    assert stream.consumed == 3 and result["usage_estimated"]
+    assert result["message"].startswith("```python")
+    reasoning = len(("The user wants addition. " * 40 + "Write it.").encode())
+    assert result["usage"]["completion_tokens"] == reasoning + len(result["message"].encode())
+    assert result["usage"]["reasoning_tokens"] == reasoning
+    # Only OpenRouter is asked for the stats of a generation.
+    assert [r for r in requests if "path" in r] == []
+
+    _streaming_client(monkeypatch, _reasoning_stream())
+    small = chat_completion(
+        "prompt",
+        model="openai/gpt-oss-20b",
+        max_tokens=100,
+        stream=True,
+        stop_when=lambda text: _code_complete(text, "add"),
+    )
+    assert small["usage"]["completion_tokens"] == 100
+
+
+def test_cancelled_streams_read_back_provider_usage(monkeypatch):
+    from budgetbench.runner import _code_complete
+
+    stats = {
+        "native_tokens_prompt": 70,
+        "native_tokens_completion": 250,
+        "native_tokens_reasoning": 230,
+        "native_tokens_cached": 10,
+    }
+    requests = _streaming_client(
+        monkeypatch, _reasoning_stream(), "https://openrouter.ai/api/v1", stats
+    )
+    result = chat_completion(
+        "prompt",
+        model="openai/gpt-oss-20b",
+        stream=True,
+        stop_when=lambda text: _code_complete(text, "add"),
+    )
+    assert requests[-1] == {"path": "/generation", "params": {"id": "gen-1"}}
+    assert result["stopped_early"] and not result["usage_estimated"]
+    assert result["usage"]["prompt_tokens"] == 70
+    assert result["usage"]["completion_tokens"] == 250
+    assert result["usage"]["cache_tokens"] == 10
+
+    # Stats that are not available yet fall back to the estimate.
+    _streaming_client(monkeypatch, _reasoning_stream(), "https://openrouter.ai/api/v1")
+    result = chat_completion(
+        "prompt",
+        model="openai/gpt-oss-20b",
+        stream=True,
+        stop_when=lambda text: _code_complete(text, "add"),
+    )
+    assert result["usage_estimated"] and result["usage"]["completion_tokens"] > 1000
+
+
+def test_split_tokens_uses_largest_remainders():
+    from budgetbench.llm import _split_tokens
+
+    assert _split_tokens(10, [1, 1, 1]) == [4, 3, 3]
+    assert _split_tokens(7, [5, 0, 2]) == [5, 0, 2]
+    assert _split_tokens(0, [0, 0]) == [0, 0]
+    assert _split_tokens(5, [0, 0]) == [3, 2]
+
+
+def _choices_client(created, choices_per_call):
+    def create(**kwargs):
+        created.append(kwargs)
+        n = min(kwargs.get("n", 1), choices_per_call)
+        choices = [
+            types.SimpleNamespace(
+                message=types.SimpleNamespace(content="x" * (i + 1)), finish_reason="stop"
+            )
+            for i in range(n)
+        ]
+        usage = types.SimpleNamespace(prompt_tokens=9, completion_tokens=6)
+        return types.SimpleNamespace(choices=choices, usage=usage)
+
+    completions = types.SimpleNamespace(create=create)
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+
+
+def test_chat_samples_splits_one_request_across_samples(monkeypatch):
+    from budgetbench import llm
+
+    created = []
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setattr(llm, "_N_UNSUPPORTED", set())
+    monkeypatch.setattr(llm, "OpenAI", lambda **kwargs: _choices_client(created, 3))
+    results = llm.chat_samples("prompt", 3, model="openai/gpt-5")
+    assert [call["n"] for call in created] == [3]
+    assert [r["message"] for r in results] == ["x", "xx", "xxx"]
+    assert [r["usage"]["prompt_tokens"] for r in results] == [3, 3, 3]
+    assert [r["usage"]["completion_tokens"] for r in results] == [1, 2, 3]
+    assert all(r["shared_by"] == 3 for r in results)
+    info = LLM_COSTS["openai/gpt-5"]
+    assert sum(r["cost"]["total"] for r in results) == pytest.approx(
+        9 * info.prompt + 6 * info.completion
+    )
+
+
+def test_chat_samples_fans_out_when_n_is_ignored(monkeypatch):
+    from budgetbench import llm
+
+    created = []
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setattr(llm, "_N_UNSUPPORTED", set())
+    monkeypatch.setattr(llm, "OpenAI", lambda **kwargs: _choices_client(created, 1))
+    results = llm.chat_samples("prompt", 3, model="openai/gpt-5")
+    assert len(results) == 3
+    assert created[0]["n"] == 3
+    assert [call.get("n") for call in created[1:]] == [None, None]
+    assert [r["shared_by"] for r in results] == [1, 1, 1]
+    # The endpoint is remembered, so the next call fans out straight away.
+    created.clear()
+    llm.chat_samples("prompt", 2, model="openai/gpt-5")
+    assert [call.get("n") for call in created] == [None, None]
+
+
+def _bad_request(message, param=None):
+    import httpx
+    from openai import BadRequestError
+
+    response = httpx.Response(400, request=httpx.Request("POST", "http://test"))
+    return BadRequestError(message, response=response, body={"param": param})
+
+
+@pytest.mark.parametrize(
+    "error, fans_out",
+    [
+        (_bad_request("Unrecognized request argument supplied: n"), True),
+        (_bad_request("Invalid value", param="n"), True),
+        (_bad_request("This model's maximum context length is 8192 tokens"), False),
+    ],
+)
+def test_chat_samples_only_gives_up_on_n_for_errors_about_n(monkeypatch, error, fans_out):
+    from budgetbench import llm
+
+    created = []
+    client = _choices_client(created, 3)
+    create = client.chat.completions.create
+
+    def reject_n(**kwargs):
+        if "n" in kwargs:
+            created.append(kwargs)
+            raise error
+        return create(**kwargs)
+
+    client.chat.completions.create = reject_n
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setattr(llm, "_N_UNSUPPORTED", set())
+    monkeypatch.setattr(llm, "OpenAI", lambda **kwargs: client)
+    if fans_out:
+        results = llm.chat_samples("prompt", 2, model="openai/gpt-5")
+        assert [r["shared_by"] for r in results] == [1, 1]
+        assert llm._N_UNSUPPORTED
+    else:
+        with pytest.raises(type(error)):
+            llm.chat_samples("prompt", 2, model="openai/gpt-5")
+        assert not llm._N_UNSUPPORTED
+        assert len(created) == 1
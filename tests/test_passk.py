@@ -0,0 +1,131 @@
+import csv
+import json
+import math
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from budgetbench.passk import (
+    collect_pass_at_k,
+    group_samples,
+    log_factorials,
+    pass_at_budget,
+    pass_at_k,
+    pass_at_k_from_per_call,
+    summarise_pass_at_k,
+    write_pass_at_k_csv,
+)
+
+
+def _reference(n, c, k):
+    return 1 - math.comb(n - c, k) / math.comb(n, k)
+
+
+def test_log_factorials():
+    assert np.exp(log_factorials(5)) == pytest.approx([1, 1, 2, 6, 24, 120])
+    assert log_factorials(0).tolist() == [0.0]
+
+
+def test_pass_at_k_matches_exact_binomials():
+    rng = random.Random(0)
+    n = [rng.randint(1, 80) for _ in range(200)]
+    c = [rng.randint(0, x) for x in n]
+    ks = [1, 2, 5, 10, 50, 100]
+    estimates = pass_at_k(n, c, ks)
+    for i in range(len(n)):
+        for j, k in enumerate(ks):
+            if k > n[i]:
+                assert np.isnan(estimates[i, j])
+            else:
+                assert estimates[i, j] == pytest.approx(_reference(n[i], c[i], k), abs=1e-9)
+    with pytest.raises(ValueError):
+        pass_at_k([1], [0], [0])
+
+
+def test_pass_at_k_is_stable_for_huge_sample_counts():
+    # C(10**6, 1000) overflows any float, the log-space ratio does not.
+    estimate = pass_at_k([1_000_000], [10], [1, 1000])[0]
+    assert estimate[0] == pytest.approx(1e-5, rel=1e-3)
+    assert estimate[1] == pytest.approx(1 - (1 - 1e-5) ** 1000, rel=1e-3)
+
+
+def test_pass_at_k_is_exactly_zero_without_correct_samples():
+    estimates = pass_at_k([10, 5, 200, 1_000_000], [0] * 4, [1, 3, 5, 1000])
+    defined = estimates[~np.isnan(estimates)]
+    assert len(defined) == 13
+    assert (defined == 0.0).all() and not np.signbit(defined).any()
+    budgets = pass_at_budget([1_000_000], [0], [1.0], [1e-3, 1.0])
+    assert budgets.tolist() == [[0.0, 0.0]]
+
+
+def test_pass_at_budget_buys_samples_at_the_task_cost():
+    # Task 0: 10 samples at 0.1 each, 2 correct; task 1 is free; task 2 never passes.
+    n, c, cost = [10, 4, 5], [2, 1, 0], [1.0, 0.0, 0.5]
+    expected = pass_at_budget(n, c, cost, [0.05, 0.1, 0.3, 100.0])
+    assert expected[0].tolist() == pytest.approx(
+        [0.0, _reference(10, 2, 1), _reference(10, 2, 3), 1.0]
+    )
+    assert expected[1].tolist() == pytest.approx([1.0] * 4)
+    assert expected[2].tolist() == [0.0] * 4
+
+
+def test_summary_averages_tasks_per_model():
+    grouped = group_samples(
+        ["b", "a", "a", "a", "b", "a"],
+        ["T/0", "T/0", "T/0", "T/1", "T/0", "T/1"],
+        [True, True, False, False, False, False],
+        [0.1] * 6,
+    )
+    results = summarise_pass_at_k(*grouped, ks=[1, 2, 3], budgets=[0.1, 1.0])
+    assert [r["model"] for r in results] == ["a", "b"]
+    a, b = results
+    assert a["pass_at_k"][:2].tolist() == pytest.approx([0.25, 0.5])
+    assert np.isnan(a["pass_at_k"][2])
+    assert a["tasks"].tolist() == [2, 2, 0]
+    assert a["expected"].tolist() == pytest.approx([0.25, 0.5])
+    assert b["pass_at_k"][:2].tolist() == pytest.approx([0.5, 1.0])
+
+
+def test_logs_and_per_call_table_agree(tmp_path: Path):
+    pa = pytest.importorskip("pyarrow")
+    rng = random.Random(1)
+    rows = []
+    for run in range(3):
+        run_dir = tmp_path / "logs" / f"run-{run}"
+        run_dir.mkdir(parents=True)
+        with (run_dir / "attempts.jsonl").open("w") as fh:
+            for _ in range(300):
+                row = {
+                    "model": f"m{run % 2}",
+                    "task_id": f"T/{rng.randrange(20)}",
+                    "correct": rng.random() < 0.4,
+                    "cost": {"total": rng.uniform(0, 0.01)},
+                }
+                rows.append(row)
+                fh.write(json.dumps(row) + "\n")
+    ks, budgets = [1, 5, 20], [0.001, 0.01, 0.1]
+    from_logs = collect_pass_at_k(tmp_path / "logs", ks, budgets)
+    category = pa.dictionary(pa.int32(), pa.string())
+    table = pa.table(
+        {
+            "model": pa.array([r["model"] for r in rows]).dictionary_encode(),
+            "task_id": pa.array([r["task_id"] for r in rows], type=pa.string()).cast(category),
+            "correct": [r["correct"] for r in rows],
+            "cost_total": [r["cost"]["total"] for r in rows],
+        }
+    )
+    from_table = pass_at_k_from_per_call(table, ks, budgets)
+    assert [r["model"] for r in from_logs] == [r["model"] for r in from_table] == ["m0", "m1"]
+    for left, right in zip(from_logs, from_table):
+        np.testing.assert_allclose(left["pass_at_k"], right["pass_at_k"])
+        np.testing.assert_allclose(left["expected"], right["expected"])
+        assert left["tasks"].tolist() == right["tasks"].tolist()
+
+    write_pass_at_k_csv(from_logs, tmp_path / "out" / "pass_at_k.csv")
+    with (tmp_path / "out" / "pass_at_k.csv").open() as fh:
+        written = list(csv.DictReader(fh))
+    assert len(written) == 2 * (len(ks) + len(budgets))
+    assert written[0]["model"] == "m0" and written[0]["k"] == "1"
+    assert written[len(ks)]["budget"] == "0.001" and written[len(ks)]["tasks"] == ""
@@ -0,0 +1,73 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import budgetbench.pipeline as pipeline
+from budgetbench.attempt_log import read_attempt_log
+
+
+PROBLEMS = [
+    {
+        "task_id": f"Inline/{n}",
+        "prompt": f'def f{n}(x: int) -> int:\n    """Return {n}."""\n',
+        "entry_point": f"f{n}",
+        "test": f"def check(candidate):\n    assert candidate(1) == {n}\n",
+    }
+    for n in range(4)
+]
+
+
+def test_pipeline_solves_tasks(tmp_path: Path, monkeypatch):
+    seen: dict = {}
+    lock = threading.Lock()
+
+    def fake_completion(prompt, model=None, max_tokens=0, cache=None, sample=0):
+        time.sleep(0.01)
+        name = prompt.split("(")[0][len("def "):]
+        with lock:
+            seen[name] = seen.get(name, 0) + 1
+        # The first attempt at each task is wrong.
+        value = int(name[1:]) if sample else -1
+        return {
+            "message": f"```python\ndef {name}(x: int) -> int:\n    return {value}\n```",
+            "cost": {"total": 0.01},
+        }
+
+    monkeypatch.setattr(pipeline, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(pipeline, "chat_completion", fake_completion)
+    summary = pipeline.run_humaneval_pipeline(
+        model="unknown/model",
+        budget=1.0,
+        log_dir=tmp_path,
+        generation_workers=2,
+        evaluation_workers=2,
+        queue_size=2,
+    )
+    assert summary["correct"] == 4
+    assert summary["attempts"] == 8
+    assert summary["total_cost"] == pytest.approx(0.08)
+    assert all(count == 2 for count in seen.values())
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert len(logs) == 8
+
+
+def test_pipeline_stops_at_budget_and_surfaces_errors(tmp_path: Path, monkeypatch):
+    def fake_completion(prompt, **kwargs):
+        return {"message": "pass", "cost": {"total": 0.3}}
+
+    monkeypatch.setattr(pipeline, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(pipeline, "chat_completion", fake_completion)
+    summary = pipeline.run_humaneval_pipeline(
+        model="unknown/model", budget=1.0, log_dir=tmp_path, generation_workers=1
+    )
+    assert summary["attempts"] == 4
+    assert summary["correct"] == 0
+
+    def failing(prompt, **kwargs):
+        raise RuntimeError("Failed to retrieve completion")
+
+    monkeypatch.setattr(pipeline, "chat_completion", failing)
+    with pytest.raises(RuntimeError):
+        pipeline.run_humaneval_pipeline(model="unknown/model", budget=1.0, log_dir=tmp_path)
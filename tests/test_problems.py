@@ -0,0 +1,73 @@
+import pickle
+
+import pytest
+
+from budgetbench.problems import ProblemRecord, ProblemStore, as_problem_store
+from budgetbench.runner import _has_valid_signature, run_humaneval_task
+import budgetbench.runner as runner
+
+
+ROWS = [
+    {
+        "task_id": f"HumanEval/{n}",
+        "prompt": f'def f{n}(a, b):\n    """Doc."""\n',
+        "entry_point": f"f{n}",
+        "test": "def check(candidate):\n    assert candidate(1, 2) == 3\n",
+        "canonical_solution": "    return a + b\n",
+    }
+    for n in range(3)
+]
+
+
+def test_store_indexes_problems():
+    store = ProblemStore(ROWS, exclude={"HumanEval/1"})
+    assert len(store) == 2
+    assert store.task_ids == ("HumanEval/0", "HumanEval/2")
+    assert "HumanEval/1" not in store
+    record = store["HumanEval/2"]
+    assert store.by_number(2) is record
+    assert record["prompt"] == ROWS[2]["prompt"]
+    assert record.get("missing", 7) == 7
+    assert record.arg_names == ("a", "b")
+    assert [p["task_id"] for p in store] == ["HumanEval/0", "HumanEval/2"]
+    with pytest.raises(KeyError):
+        store["HumanEval/1"]
+    assert as_problem_store(store) is store
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_signature_check_uses_precomputed_arguments():
+    record = ProblemRecord.from_row(ROWS[0])
+    code = "def f0(a, b):\n    return a + b\n"
+    assert _has_valid_signature(code, "", "f0", record.arg_names)
+    assert not _has_valid_signature(code, "", "f0", ("x",))
+
+
+def test_signature_check_has_one_rule_for_dicts_and_records():
+    # Like HumanEval/32: a helper precedes the entry point.
+    row = {
+        "task_id": "HumanEval/32",
+        "prompt": (
+            "def poly(xs: list, x: float):\n    pass\n\n\n"
+            "def find_zero(xs: list):\n    pass\n"
+        ),
+        "entry_point": "find_zero",
+        "test": "",
+    }
+    record = ProblemRecord.from_row(row)
+    code = "def find_zero(xs: list):\n    return 0.0\n"
+    assert _has_valid_signature(code, row["prompt"], row["entry_point"])
+    assert _has_valid_signature(code, record.prompt, record.entry_point, record.arg_names)
+    wrong = "def find_zero(xs: list, x: float):\n    return 0.0\n"
+    assert not _has_valid_signature(wrong, row["prompt"], row["entry_point"])
+    assert not _has_valid_signature(wrong, record.prompt, record.entry_point, record.arg_names)
+
+
+def test_run_task_looks_up_problem_in_store(monkeypatch):
+    def fake_completion(prompt, **kwargs):
+        return {"message": "```python\ndef f1(a, b):\n    return a + b\n```", "cost": {}}
+
+    monkeypatch.setattr(runner, "chat_completion", fake_completion)
+    result = run_humaneval_task("HumanEval/1", model="m", dataset=ProblemStore(ROWS))
+    assert result["has_valid_signature"]
+    assert result["passed"] == result["total"] == 1
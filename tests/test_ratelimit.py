@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+import types
+
+import httpx
+import openai
+import pytest
+
+from budgetbench import llm, ratelimit
+from budgetbench.ratelimit import (
+    ProviderLimiter,
+    RateLimits,
+    TokenBucket,
+    configure_rate_limits,
+    get_limiter,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def _no_limits(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_LIMITS", {})
+    monkeypatch.setattr(ratelimit, "_LIMITERS", {})
+
+
+def test_token_bucket_overdraws_and_reports_the_wait():
+    bucket = TokenBucket(rate=2.0, capacity=2.0, now=0.0)
+    assert bucket.take(2, 0.0) == 0.0
+    assert bucket.take(1, 0.0) == pytest.approx(0.5)
+    assert bucket.take(1, 0.0) == pytest.approx(1.0)
+    bucket.refund(2, 0.0)
+    assert bucket.take(1, 1.0) == 0.0
+
+
+def test_requests_and_tokens_per_minute_pace_requests():
+    clock = FakeClock()
+    limiter = ProviderLimiter(
+        RateLimits(requests_per_minute=60, tokens_per_minute=600), clock=clock
+    )
+    assert limiter._reserve(5) == 0.0
+    # One request per second; the token bucket holds 10 tokens.
+    assert limiter._reserve(5) == pytest.approx(1.0)
+    assert limiter._reserve(20) == pytest.approx(2.0)
+    clock.now = 10.0
+    assert limiter._reserve(0) == 0.0
+
+
+def test_window_grows_additively_and_halves_on_429():
+    clock = FakeClock()
+    limiter = ProviderLimiter(RateLimits(initial_in_flight=4, backoff=3.0), clock=clock)
+    permits = [limiter.acquire() for _ in range(4)]
+    assert not limiter._has_slot()
+    for permit in permits:
+        limiter.release(permit)
+    assert limiter.window == pytest.approx(5.0, rel=0.05)
+    assert limiter.in_flight == 0
+
+    permits = [limiter.acquire() for _ in range(3)]
+    clock.now = 1.0
+    window = limiter.window
+    for permit in permits:
+        limiter.throttle(permit)
+    # Only the first 429 of a burst sent under the old window shrinks it.
+    assert limiter.window == pytest.approx(window / 2)
+    assert limiter.throttled == 3
+    assert limiter._reserve(0) == pytest.approx(3.0)
+
+
+def test_slow_responses_shrink_the_window():
+    clock = FakeClock()
+    limiter = ProviderLimiter(RateLimits(initial_in_flight=8, latency_target=2.0), clock=clock)
+    permit = limiter.acquire()
+    clock.now = 5.0
+    limiter.release(permit)
+    assert limiter.window == 4.0
+
+
+def test_tokens_used_replaces_the_estimate():
+    clock = FakeClock()
+    limiter = ProviderLimiter(RateLimits(tokens_per_minute=6000), clock=clock)
+    permit = limiter.acquire(100)
+    assert limiter._tokens.level == 0.0
+    limiter.release(permit, tokens_used=10)
+    assert limiter._tokens.level == pytest.approx(90.0)
+
+
+def test_threads_never_exceed_the_window():
+    limiter = ProviderLimiter(RateLimits(initial_in_flight=3, max_in_flight=3))
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def work():
+        permit = limiter.acquire()
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        limiter.release(permit)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["peak"] == 3
+    assert limiter.in_flight == 0
+
+
+def test_async_waiters_share_the_window_and_can_be_cancelled():
+    limiter = ProviderLimiter(RateLimits(initial_in_flight=2, max_in_flight=2))
+
+    async def main():
+        active = peak = 0
+
+        async def work():
+            nonlocal active, peak
+            permit = await limiter.acquire_async()
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            limiter.release(permit)
+
+        await asyncio.gather(*(work() for _ in range(6)))
+        blocked = [limiter.acquire(), limiter.acquire()]
+        cancelled = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        for permit in blocked:
+            limiter.release(permit)
+        return peak
+
+    assert asyncio.run(main()) == 2
+    assert limiter.in_flight == 0 and not limiter._waiters
+
+
+def test_get_limiter_prefers_the_most_specific_configuration():
+    assert get_limiter("m") is None
+    configure_rate_limits(RateLimits(requests_per_minute=10))
+    configure_rate_limits(RateLimits(requests_per_minute=99), model="m", base_url="u")
+    assert get_limiter("m", "u").limits.requests_per_minute == 99
+    assert get_limiter("m").limits.requests_per_minute == 10
+    assert get_limiter("m") is get_limiter("m")
+    assert get_limiter("other") is not get_limiter("m")
+    configure_rate_limits(RateLimits(per_model=False), base_url="shared")
+    assert get_limiter("a", "shared") is get_limiter("b", "shared")
+
+
+def _rate_limit_error(headers):
+    request = httpx.Request("POST", "http://provider/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_retry_after_headers_are_parsed():
+    assert llm._retry_after(_rate_limit_error({"retry-after": "2"})) == 2.0
+    assert llm._retry_after(_rate_limit_error({"retry-after-ms": "250"})) == 0.25
+    assert llm._retry_after(_rate_limit_error({})) is None
+    assert llm._retry_after(ValueError()) is None
+
+
+def test_chat_completion_retries_429_through_the_limiter(monkeypatch):
+    calls = []
+
+    class DummyClient:
+        class chat:  # noqa: D401 - simple namespace
+            class completions:  # noqa: D401 - simple namespace
+                @staticmethod
+                def create(**kwargs):
+                    calls.append(kwargs)
+                    if len(calls) == 1:
+                        raise _rate_limit_error({"retry-after": "0"})
+                    message = types.SimpleNamespace(content="hello")
+                    usage = types.SimpleNamespace(prompt_tokens=3, completion_tokens=2)
+                    return types.SimpleNamespace(
+                        choices=[types.SimpleNamespace(message=message)], usage=usage
+                    )
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setattr(llm, "OpenAI", lambda **kwargs: DummyClient())
+    configure_rate_limits(RateLimits(tokens_per_minute=1e6))
+    result = llm.chat_completion("prompt", model="openai/gpt-5", max_tokens=10)
+    assert result["message"] == "hello"
+    assert len(calls) == 2
+    limiter = get_limiter("openai/gpt-5")
+    assert limiter.throttled == 1
+    assert limiter.in_flight == 0
@@ -0,0 +1,81 @@
+import csv
+import json
+from pathlib import Path
+
+from budgetbench.reeval import reevaluate_logs
+
+
+PROBLEM = {
+    "task_id": "Inline/0",
+    "prompt": 'def add(a: int, b: int) -> int:\n    """Add two numbers."""\n',
+    "entry_point": "add",
+    "test": "def check(candidate):\n    assert candidate(1, 2) == 3\n",
+}
+
+RIGHT = "```python\ndef add(a: int, b: int) -> int:\n    return a + b\n```"
+WRONG = "```python\ndef add(a: int, b: int) -> int:\n    return a - b\n```"
+
+
+def test_reevaluate_logs_writes_new_column_and_diff(tmp_path: Path) -> None:
+    run_dir = tmp_path / "logs" / "model-a" / "run-1"
+    run_dir.mkdir(parents=True)
+    rows = [
+        {"id": "a", "model": "model-a", "task_id": "Inline/0", "response": WRONG, "correct": False},
+        # Logged as wrong, e.g. by an older extraction or evaluator.
+        {"id": "b", "model": "model-a", "task_id": "Inline/0", "response": RIGHT, "correct": False},
+        {"id": "c", "model": "model-a", "task_id": "Other/1", "response": RIGHT, "correct": True},
+    ]
+    with (run_dir / "attempts.jsonl").open("w") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+
+    legacy_dir = tmp_path / "logs" / "model-b" / "run-1"
+    legacy_dir.mkdir(parents=True)
+    (legacy_dir / "0b7f1c4e-5d1a-4c9e-9a8f-2f4b6c8d0e1a.json").write_text(
+        json.dumps({"id": "d", "model": "model-b", "task_id": "Inline/0", "response": RIGHT, "correct": True})
+    )
+    (legacy_dir / "summary.json").write_text("{}")
+    # JSON artefacts of other tools are not runs.
+    (tmp_path / "logs" / "aggregate_state.json").write_text('{"logs": {}}')
+    (tmp_path / "logs" / "model-b" / "plot-data.json").write_text("[]")
+
+    report = tmp_path / "diff.csv"
+    counts = reevaluate_logs(tmp_path / "logs", {"Inline/0": PROBLEM}, report=report, workers=2)
+    assert counts == {"attempts": 3, "changed": 1, "skipped": 1}
+
+    reeval = [json.loads(line) for line in (run_dir / "reeval.jsonl").read_text().splitlines()]
+    assert [r["id"] for r in reeval] == ["a", "b", "c"]
+    assert [r.get("reeval_correct") for r in reeval] == [False, True, None]
+    assert (legacy_dir / "reeval.jsonl").exists()
+    assert not (tmp_path / "logs" / "reeval.jsonl").exists()
+    assert not (tmp_path / "logs" / "model-b" / "reeval.jsonl").exists()
+
+    with report.open() as fh:
+        diff = list(csv.DictReader(fh))
+    assert [(d["id"], d["correct"], d["reeval_correct"]) for d in diff] == [("b", "False", "True")]
+
+
+def test_scored_reads_attempts_lazily_with_bounded_pending() -> None:
+    from concurrent.futures import Executor, Future
+
+    from budgetbench.reeval import _scored
+
+    class InlineExecutor(Executor):
+        submitted = 0
+
+        def submit(self, fn, *args):
+            self.submitted += 1
+            future = Future()
+            future.set_result({"passed": 1, "total": 1})
+            return future
+
+    executor = InlineExecutor()
+    problems = {"T/0": {}}
+    attempts = ({"task_id": "T/0" if n % 3 else "T/x", "n": n} for n in range(20))
+    yielded = 0
+    for attempt, result in _scored(attempts, problems, 1.0, executor, max_pending=4):
+        assert attempt["n"] == yielded
+        assert (result is None) == (yielded % 3 == 0)
+        yielded += 1
+        assert executor.submitted - sum(1 for n in range(yielded) if n % 3) <= 4
+    assert yielded == 20
@@ -0,0 +1,171 @@
+import csv
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import budgetbench.reports as reports
+from budgetbench.reports import STATE_FILE, aggregate, load_per_call
+
+
+def _append(path: Path, rows: list[dict]) -> None:
+    with path.open("a") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+
+
+def _read_csv(path: Path) -> list[dict]:
+    with path.open() as fh:
+        return list(csv.DictReader(fh))
+
+
+def _attempt(task: str, correct: bool, cost: float) -> dict:
+    return {"model": "m", "task_id": task, "correct": correct, "cost": {"total": cost}}
+
+
+def test_aggregate_reads_only_appended_attempts(tmp_path: Path) -> None:
+    run_dir = tmp_path / "logs" / "m" / "run-1"
+    run_dir.mkdir(parents=True)
+    log = run_dir / "attempts.jsonl"
+    (run_dir / "summary.json").write_text(
+        json.dumps({"per_problem": {"T/0": {}, "T/1": {}, "T/2": {}, "T/3": {}}})
+    )
+    out = tmp_path / "out"
+    _append(log, [_attempt("T/0", True, 0.0005), _attempt("T/1", False, 0.004)])
+
+    assert aggregate(tmp_path / "logs", out) == {"logs": 1, "read": 1, "attempts": 2}
+    assert (out / STATE_FILE).exists()
+    assert aggregate(tmp_path / "logs", out)["read"] == 0
+
+    # A partially written line is left for the next run.
+    _append(log, [_attempt("T/1", True, 0.01)])
+    with log.open("a") as fh:
+        fh.write('{"model": "m", "task_id": "T/2"')
+    assert aggregate(tmp_path / "logs", out)["attempts"] == 1
+
+    per_call = _read_csv(out / "per_call.csv")
+    assert [row["task_id"] for row in per_call] == ["T/0", "T/1", "T/1"]
+    solved = {
+        row["budget"]: (int(row["solved"]), float(row["pass_rate"]))
+        for row in _read_csv(out / "aggregate_by_budget.csv")
+    }
+    assert solved["0.001"] == (1, 0.25)
+    assert solved["0.01"] == (2, 0.5)
+    assert solved["10"] == (2, 0.5)
+
+    with log.open("a") as fh:
+        fh.write(', "correct": true, "cost": {"total": 0.0}}\n')
+    assert aggregate(tmp_path / "logs", out)["attempts"] == 1
+    incremental = _read_csv(out / "per_call.csv")
+    aggregate(tmp_path / "logs", out, full=True)
+    assert _read_csv(out / "per_call.csv") == incremental
+    assert len(incremental) == 4
+
+
+def test_incremental_rows_match_a_full_rebuild_per_run(tmp_path: Path) -> None:
+    logs = [tmp_path / "logs" / f"run-{n}" / "attempts.jsonl" for n in range(2)]
+    for log in logs:
+        log.parent.mkdir(parents=True)
+    out = tmp_path / "out"
+    for step in range(3):
+        for n, log in enumerate(logs):
+            _append(log, [_attempt(f"T/{n}{step}", step == 2, 0.01)])
+        aggregate(tmp_path / "logs", out)
+    incremental = _read_csv(out / "per_call.csv")
+    aggregate(tmp_path / "logs", out, full=True)
+    rebuilt = _read_csv(out / "per_call.csv")
+    # Both logs grew between reruns, so only the rebuild groups rows by run.
+    assert incremental != rebuilt
+    assert [row["run_id"] for row in rebuilt] == ["run-0"] * 3 + ["run-1"] * 3
+
+    def by_run(rows):
+        return sorted(rows, key=lambda row: row["run_id"])
+
+    assert by_run(incremental) == rebuilt == by_run(rebuilt)
+
+
+def test_aggregate_rebuilds_when_a_log_is_replaced(tmp_path: Path) -> None:
+    run_dir = tmp_path / "logs" / "run-1"
+    run_dir.mkdir(parents=True)
+    log = run_dir / "attempts.jsonl"
+    out = tmp_path / "out"
+    _append(log, [_attempt("T/0", False, 0.1), _attempt("T/0", True, 0.1)])
+    aggregate(tmp_path / "logs", out)
+
+    log.unlink()
+    _append(log, [_attempt("T/5", True, 0.1)])
+    counts = aggregate(tmp_path / "logs", out)
+    assert counts["attempts"] == 1
+    assert [row["task_id"] for row in _read_csv(out / "per_call.csv")] == ["T/5"]
+
+
+def test_parquet_per_call_is_typed_and_incremental(tmp_path: Path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    run_dir = tmp_path / "logs" / "run-1"
+    run_dir.mkdir(parents=True)
+    log = run_dir / "attempts.jsonl"
+    out = tmp_path / "out"
+    _append(log, [_attempt("T/0", False, 0.1), _attempt("T/0", True, 0.2)])
+    aggregate(tmp_path / "logs", out, per_call_format="parquet")
+    _append(log, [{"model": "m", "task_id": "T/1", "correct": True, "cost": {}}])
+    aggregate(tmp_path / "logs", out, per_call_format="parquet")
+    assert len(list((out / "per_call.parquet").glob("part-*.parquet"))) == 2
+    assert not (out / "per_call.csv").exists()
+
+    table = load_per_call(out)
+    assert table.schema.field("task_id").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("correct").type == pa.bool_()
+    assert table.schema.field("cost_total").type == pa.float64()
+    assert table.column("task_id").to_pylist() == ["T/0", "T/0", "T/1"]
+    assert table.column("correct").to_pylist() == [False, True, True]
+    assert table.column("cost_total").to_pylist() == [0.1, 0.2, None]
+    assert load_per_call(out, columns=["correct"]).num_columns == 1
+
+    # Switching format rebuilds from scratch.
+    aggregate(tmp_path / "logs", out)
+    assert not (out / "per_call.parquet").exists()
+    assert len(_read_csv(out / "per_call.csv")) == 3
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_logs_are_written_a_row_group_at_a_time(tmp_path: Path, monkeypatch, workers) -> None:
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(reports, "ROW_GROUP_SIZE", 2)
+    monkeypatch.setattr(reports, "MAX_PER_CALL_PARTS", 2)
+    batches = []
+    write_columns = reports._ParquetSink.write_columns
+
+    def spy(self, columns):
+        batches.append(len(columns["model"]))
+        write_columns(self, columns)
+
+    monkeypatch.setattr(reports._ParquetSink, "write_columns", spy)
+    logs = []
+    for run in range(2):
+        (tmp_path / "logs" / f"run-{run}").mkdir(parents=True)
+        logs.append(tmp_path / "logs" / f"run-{run}" / "attempts.jsonl")
+        _append(logs[-1], [_attempt(f"T/{run}.{i}", i == 4, 0.1) for i in range(5)])
+    out = tmp_path / "out"
+    assert aggregate(tmp_path / "logs", out, per_call_format="parquet", workers=workers) == {
+        "logs": 2,
+        "read": 2,
+        "attempts": 10,
+    }
+    assert batches == [2, 2, 1, 2, 2, 1]
+    for rerun in range(2):
+        _append(logs[0], [_attempt(f"T/new.{rerun}", True, 0.1)])
+        aggregate(tmp_path / "logs", out, per_call_format="parquet", workers=workers)
+    # The third part triggers a merge into one, in the original order.
+    assert [p.name for p in (out / "per_call.parquet").iterdir()] == ["part-00000.parquet"]
+    table = load_per_call(out)
+    assert table.column("task_id").to_pylist() == (
+        [f"T/0.{i}" for i in range(5)] + [f"T/1.{i}" for i in range(5)] + ["T/new.0", "T/new.1"]
+    )
+    assert table.column("run_id").to_pylist()[-1] == "run-0"
+
+
+def test_parquet_output_points_at_the_extra_without_pyarrow(tmp_path: Path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match=r"budgetbench\[parquet\]"):
+        aggregate(tmp_path / "logs", tmp_path / "out", per_call_format="parquet")
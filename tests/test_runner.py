@@ -1,8 +1,8 @@
-"""Integration tests for running HumanEval tasks end-to-end."""
+"""Tests for running HumanEval tasks, in parts and end-to-end."""
 
 import pytest
 
-from budgetbench.runner import run_humaneval_task
+from budgetbench.runner import _code_complete, run_humaneval_task
 
 
 @pytest.mark.integration
@@ -17,3 +17,12 @@ def test_run_humaneval_task(task_id):
     assert result["has_valid_signature"], "model did not follow required API"
     assert result["total"] > 0
     assert 0 <= result["passed"] <= result["total"]
+
+
+def test_code_complete_waits_for_the_extracted_fence():
+    text = "```python\ndef add(a, b):\n    return a + b\n"
+    assert not _code_complete(text, "add")
+    assert _code_complete(text + "```", "add")
+    assert not _code_complete("```python\nimport math\n```", "add")
+    assert not _code_complete("```python\ndef adder(a):\n```", "add")
+    assert _code_complete("```\nasync def add(a):\n    pass\n```\n```", "add")
@@ -1,4 +1,3 @@
-import pytest
 import budgetbench.runner as runner
 
 
@@ -9,9 +8,6 @@ def test_load_humaneval_dataset_skips_problem_151(monkeypatch):
         {"task_id": "HumanEval/2"},
     ]
 
-    def fake_load_dataset(*args, **kwargs):
-        return sample
-
-    monkeypatch.setattr(runner, "load_dataset", fake_load_dataset)
+    monkeypatch.setattr(runner, "load_humaneval_rows", lambda: sample)
     dataset = runner.load_humaneval_dataset()
     assert all(p["task_id"] != "HumanEval/151" for p in dataset)
@@ -0,0 +1,71 @@
+import pytest
+
+import budgetbench.runner as runner
+from budgetbench.attempt_log import read_attempt_log
+
+
+PROMPT = "def f(x: int) -> int:\n    \"\"\"Return 1.\"\"\"\n"
+SOLUTION = "```python\ndef f(x: int) -> int:\n    return 1\n```"
+
+
+def test_samples_skip_excluded_tasks_of_a_plain_dataset(monkeypatch):
+    dataset = [
+        {
+            "task_id": task_id,
+            "prompt": PROMPT,
+            "entry_point": "f",
+            "test": "def check(candidate):\n    assert candidate(0) == 1\n",
+        }
+        for task_id in ("HumanEval/1", "HumanEval/151")
+    ]
+
+    def fake_samples(prompt, n, **kwargs):
+        return [{"message": SOLUTION, "cost": {"total": 0.0}, "shared_by": n}] * n
+
+    monkeypatch.setattr(runner, "chat_samples", fake_samples)
+    results = runner.run_humaneval_samples("HumanEval/1", 2, "unknown/model", dataset=dataset)
+    assert [result["passed"] for result in results] == [1, 1]
+    with pytest.raises(KeyError):
+        runner.run_humaneval_samples("HumanEval/151", 2, "unknown/model", dataset=dataset)
+
+
+def test_samples_per_request_logs_every_sample(tmp_path, monkeypatch):
+    problems = [
+        {
+            "task_id": "Inline/0",
+            "prompt": "def f(x: int) -> int:\n    \"\"\"Return 1.\"\"\"\n",
+            "entry_point": "f",
+            "test": "def check(candidate):\n    assert candidate(0) == 1\n",
+        }
+    ]
+    calls = []
+
+    def fake_samples(prompt, n, model=None, max_tokens=0, cache=None, sample=0):
+        calls.append((n, sample))
+        # Only the last sample of the second request is right.
+        values = [0] * n if not sample else [0] * (n - 1) + [1]
+        return [
+            {
+                "message": f"```python\ndef f(x: int) -> int:\n    return {value}\n```",
+                "cost": {"total": 0.01},
+                "shared_by": n,
+            }
+            for value in values
+        ]
+
+    monkeypatch.setattr(runner, "load_humaneval_dataset", lambda: problems)
+    monkeypatch.setattr(runner, "chat_samples", fake_samples)
+    summary = runner.run_humaneval_until_budget(
+        model="unknown/model", budget=1.0, log_dir=tmp_path, samples_per_request=3
+    )
+    assert calls == [(3, 0), (3, 3)]
+    assert summary["attempts"] == 6
+    assert summary["correct"] == 1
+    assert summary["per_problem"]["Inline/0"] == {"attempts": 6, "correct": True}
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert [log["correct"] for log in logs] == [False] * 5 + [True]
+    assert all(log["shared_by"] == 3 for log in logs)
+    with pytest.raises(ValueError):
+        runner.run_humaneval_until_budget(
+            model="unknown/model", budget=1.0, log_dir=tmp_path, samples_per_request=2, stream=True
+        )
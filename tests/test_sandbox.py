@@ -0,0 +1,59 @@
+from budgetbench.evaluator import evaluate_suite
+from budgetbench.sandbox import SandboxPool
+
+
+PROBLEM = {
+    "task_id": "Inline/0",
+    "prompt": "def add(a: int, b: int) -> int:\n",
+    "entry_point": "add",
+    "test": """
+
+def check(candidate):
+    assert candidate(1, 2) == 3
+    assert candidate(2, 2) == 4
+""",
+}
+
+
+def test_pool_reuses_and_replaces_workers():
+    stubborn = """
+    if a == 2:
+        while True:
+            try:
+                while True:
+                    pass
+            except BaseException:
+                pass
+    return a + b
+"""
+    with SandboxPool(workers=1, max_runs=2) as pool:
+        correct = evaluate_suite(PROBLEM, "    return a + b\n", pool=pool)
+        assert correct.outcomes == ["passed", "passed"]
+
+        # The second assertion swallows the alarm, so the worker is killed.
+        hung = evaluate_suite(PROBLEM, stubborn, timeout=0.2, pool=pool)
+        assert hung.outcomes == ["passed", "timed out"]
+
+        for _ in range(3):
+            again = evaluate_suite(PROBLEM, "    return a - b\n", pool=pool)
+            assert again.passed == 0 and again.total == 2
+
+
+def test_pool_fail_fast():
+    with SandboxPool(workers=1) as pool:
+        result = evaluate_suite(PROBLEM, "    return 4\n", pool=pool, fail_fast=True)
+        assert result.outcomes == ["failed: ", "skipped"]
+        assert result.failed_at == 0
+
+
+def test_assertions_share_the_solution_but_not_their_names():
+    # Each assertion's globals are a shallow copy of the loaded solution.
+    problem = {
+        **PROBLEM,
+        "test": "def check(candidate):\n"
+        "    assert globals().setdefault('LEAK', SEEN.append(1) or 1) == 1\n"
+        "    assert 'LEAK' not in globals() and SEEN == [1]\n",
+    }
+    solution = "    return a + b\n\nSEEN = []\n"
+    result = evaluate_suite(problem, solution)
+    assert result.outcomes == ["passed", "passed"]
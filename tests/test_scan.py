@@ -0,0 +1,49 @@
+import json
+import random
+from pathlib import Path
+
+from budgetbench.aggregate import collect_correct_milestones
+from budgetbench.curves import iter_budget_curves
+from budgetbench.reports import aggregate
+
+
+def _make_tree(log_dir: Path) -> None:
+    rng = random.Random(1)
+    for model in ("model-a", "model-b"):
+        for run in range(3):
+            run_dir = log_dir / model / f"run-{run}"
+            run_dir.mkdir(parents=True)
+            with (run_dir / "attempts.jsonl").open("w") as fh:
+                for _ in range(rng.randrange(5, 40)):
+                    row = {
+                        "model": model,
+                        "task_id": f"T/{rng.randrange(10)}",
+                        "correct": rng.random() < 0.4,
+                        "cost": {"total": rng.uniform(0, 0.05), "prompt": 0.001},
+                    }
+                    fh.write(json.dumps(row) + "\n")
+
+
+def test_parallel_scan_matches_serial_output(tmp_path: Path) -> None:
+    log_dir = tmp_path / "logs"
+    _make_tree(log_dir)
+
+    aggregate(log_dir, tmp_path / "serial")
+    aggregate(log_dir, tmp_path / "parallel", workers=3)
+    for name in ("per_call.csv", "aggregate_by_budget.csv"):
+        assert (tmp_path / "serial" / name).read_bytes() == (
+            tmp_path / "parallel" / name
+        ).read_bytes()
+
+    assert collect_correct_milestones(log_dir) == collect_correct_milestones(
+        log_dir, workers=3
+    )
+
+    grid = [0.01, 0.1, 1.0]
+    serial = [(c["run_id"], c["solved"].tolist()) for c in iter_budget_curves(log_dir, grid)]
+    parallel = [
+        (c["run_id"], c["solved"].tolist())
+        for c in iter_budget_curves(log_dir, grid, workers=3)
+    ]
+    assert serial == parallel
+    assert len(serial) == 6
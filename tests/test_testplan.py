@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import budgetbench.testplan as testplan
+from budgetbench.evaluator import evaluate_suite
+from budgetbench.testplan import build_test_plan, clear_test_plans, get_test_plan
+
+
+PROBLEM = {
+    "task_id": "Inline/0",
+    "prompt": "def add(a: int, b: int) -> int:\n",
+    "entry_point": "add",
+    "test": """
+
+def check(candidate):
+    assert candidate(1, 2) == 3
+    x = 1
+    assert candidate(2, 2) == 4
+""",
+}
+
+
+def test_build_test_plan_splits_asserts():
+    plan = build_test_plan(PROBLEM)
+    assert plan.total == 2
+    assert plan.sources[0].endswith("check(add)")
+    assert "candidate(2, 2) == 4" in plan.sources[1]
+    result = evaluate_suite(PROBLEM, "    return a + b\n", plan=plan)
+    assert result.outcomes == ["passed", "passed"]
+
+
+def test_get_test_plan_memoizes_and_tracks_source():
+    clear_test_plans()
+    first = get_test_plan(PROBLEM)
+    assert get_test_plan(PROBLEM) is first
+
+    changed = {**PROBLEM, "test": "def check(candidate):\n    assert candidate(0, 0) == 0\n"}
+    assert get_test_plan(changed).total == 1
+    clear_test_plans()
+
+
+def test_get_test_plan_disk_cache(tmp_path: Path, monkeypatch):
+    clear_test_plans()
+    built = get_test_plan(PROBLEM, cache_dir=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 1
+    clear_test_plans()
+
+    def fail(problem):
+        raise AssertionError("plan should come from the disk cache")
+
+    monkeypatch.setattr(testplan, "build_test_plan", fail)
+    cached = get_test_plan(PROBLEM, cache_dir=tmp_path)
+    assert cached.sources == built.sources
+    assert evaluate_suite(PROBLEM, "    return a * b\n", plan=cached).passed == 1
+    clear_test_plans()
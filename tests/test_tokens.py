@@ -0,0 +1,161 @@
+from pathlib import Path
+
+import pytest
+
+import budgetbench.runner as runner
+from budgetbench.attempt_log import AttemptLog, read_attempt_log
+from budgetbench.tokens import TokenPolicy, token_demand
+
+
+PROBLEMS = [
+    {
+        "task_id": f"Inline/{n}",
+        "prompt": f"def f{n}(x: int) -> int:\n    \"\"\"Return {n}.\"\"\"\n",
+        "entry_point": f"f{n}",
+        "test": f"def check(candidate):\n    assert candidate(1) == {n}\n",
+    }
+    for n in range(2)
+]
+
+
+def test_token_demand_counts_completion_and_reasoning():
+    assert token_demand({"completion_tokens": 10, "reasoning_tokens": 5}) == 15
+    assert token_demand({}) == 0
+
+
+def test_limit_falls_back_from_task_to_model_to_ceiling():
+    policy = TokenPolicy(quantile=0.5, headroom=1.0, min_samples=2, floor=10)
+    assert policy.limit("m", "t1", 1000) == 1000
+    policy.observe("m", "t1", {"completion_tokens": 100})
+    policy.observe("m", "t2", {"completion_tokens": 300})
+    # Too few samples for t1 alone, enough for the model.
+    assert policy.limit("m", "t1", 1000) == 200
+    policy.observe("m", "t1", {"completion_tokens": 120})
+    assert policy.limit("m", "t1", 1000) == 110
+    assert policy.limit("other", "t1", 1000) == 1000
+    assert policy.limit("m", "t1", 50) == 50
+
+
+def test_limit_respects_floor_and_headroom():
+    policy = TokenPolicy(quantile=1.0, headroom=1.5, min_samples=1, floor=64)
+    policy.observe("m", "t", {"completion_tokens": 10})
+    assert policy.limit("m", "t", 1000) == 64
+    policy.observe("m", "t", {"completion_tokens": 100})
+    assert policy.limit("m", "t", 1000) == 150
+    assert policy.limit("m", "t", 32) == 32
+
+
+def test_truncated_responses_raise_the_limit():
+    policy = TokenPolicy(quantile=1.0, headroom=1.0, min_samples=1, floor=1)
+    policy.observe("m", "t", {"completion_tokens": 100})
+    policy.observe("m", "t", {"completion_tokens": 100}, finish_reason="length")
+    assert policy.limit("m", "t", 1000) == 200
+    policy.observe("m", "t", {"completion_tokens": 200}, finish_reason="length")
+    assert policy.limit("m", "t", 1000) == 400
+    assert policy.limit("m", "t", 300) == 300
+    # Truncations are not part of the distribution of other tasks.
+    assert policy.limit("m", "u", 1000) == 100
+
+
+def test_complete_responses_lift_the_truncation_floor():
+    policy = TokenPolicy(quantile=1.0, headroom=1.0, min_samples=1, floor=1)
+    policy.observe("m", "t", {"completion_tokens": 100}, finish_reason="stop")
+    policy.observe("m", "t", {"completion_tokens": 1000}, finish_reason="length")
+    assert policy.limit("m", "t", 5000) == 2000
+    policy.observe("m", "t", {"completion_tokens": 120}, finish_reason="stop")
+    assert policy.limit("m", "t", 5000) == 120
+    # Partial responses say nothing about the need, so the floor stays.
+    policy.observe("m", "t", {"completion_tokens": 900}, finish_reason="length")
+    policy.observe("m", "t", {"completion_tokens": 10}, partial=True)
+    assert policy.limit("m", "t", 5000) == 1800
+
+
+def test_invalid_policy_settings_are_rejected():
+    with pytest.raises(ValueError):
+        TokenPolicy(quantile=0.0)
+    with pytest.raises(ValueError):
+        TokenPolicy(growth=1.0)
+
+
+def test_from_logs_reads_usage_of_every_run(tmp_path: Path):
+    for run, tokens in (("a", 100), ("b", 300)):
+        with AttemptLog(tmp_path / run / "attempts.jsonl") as log:
+            log.append({"model": "m", "task_id": "t", "usage": {"completion_tokens": tokens}})
+            log.append({"model": "m", "task_id": "t"})
+    policy = TokenPolicy.from_logs(tmp_path, quantile=1.0, headroom=1.0, min_samples=2)
+    assert policy.limit("m", "t", 1000) == 300
+
+
+def test_runner_uses_and_updates_the_policy(tmp_path: Path, monkeypatch):
+    requested = []
+
+    def fake_completion(prompt, model=None, max_tokens=0, **kwargs):
+        requested.append(max_tokens)
+        name = prompt.split("(")[0][len("def "):]
+        # The first attempt at each task is cut off, the next one is right.
+        truncated = len(requested) <= len(PROBLEMS)
+        body = "    return" if truncated else f"    return {name[1:]}\n```"
+        return {
+            "message": f"```python\ndef {name}(x: int) -> int:\n{body}",
+            "usage": {"completion_tokens": 40 if truncated else 30},
+            "cost": {"total": 0.01},
+            "finish_reason": "length" if truncated else "stop",
+        }
+
+    monkeypatch.setattr(runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(runner, "chat_completion", fake_completion)
+    policy = TokenPolicy(min_samples=1, floor=1)
+    policy.observe("unknown/model", "Inline/0", {"completion_tokens": 40})
+    policy.observe("unknown/model", "Inline/1", {"completion_tokens": 40})
+    summary = runner.run_humaneval_until_budget(
+        model="unknown/model",
+        budget=1.0,
+        log_dir=tmp_path,
+        max_tokens=1000,
+        token_policy=policy,
+    )
+    assert summary["correct"] == 2
+    assert requested == [50, 50, 80, 80]
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert [log["finish_reason"] for log in logs] == ["length", "length", "stop", "stop"]
+    assert logs[0]["usage"] == {"completion_tokens": 40}
+
+
+@pytest.mark.parametrize("estimated", [True, False])
+def test_streams_stopped_early_do_not_teach_the_policy(
+    tmp_path: Path, monkeypatch, estimated
+):
+    requested = []
+
+    def fake_completion(prompt, model=None, max_tokens=0, stream=False, **kwargs):
+        assert stream
+        requested.append(max_tokens)
+        name = prompt.split("(")[0][len("def "):]
+        # Cancelled once the code block closed: estimated or read back from
+        # the provider, the count ends where the stream was stopped.
+        return {
+            "message": f"```python\ndef {name}(x: int) -> int:\n    return -1\n```",
+            "usage": {"completion_tokens": 12},
+            "usage_estimated": estimated,
+            "stopped_early": True,
+            "cost": {"total": 0.4},
+            "finish_reason": None,
+        }
+
+    monkeypatch.setattr(runner, "load_humaneval_dataset", lambda: PROBLEMS)
+    monkeypatch.setattr(runner, "chat_completion", fake_completion)
+    policy = TokenPolicy(min_samples=1, floor=1)
+    runner.run_humaneval_until_budget(
+        model="unknown/model",
+        budget=1.0,
+        log_dir=tmp_path,
+        max_tokens=1000,
+        stream=True,
+        token_policy=policy,
+    )
+    assert requested == [1000, 1000, 1000]
+    logs = list(read_attempt_log(tmp_path / "attempts.jsonl"))
+    assert all(log["usage_estimated"] == estimated for log in logs)
+    assert TokenPolicy.from_logs(tmp_path, min_samples=1, floor=1).limit(
+        "unknown/model", "Inline/0", 1000
+    ) == 1000